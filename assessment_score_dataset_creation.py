@@ -1,172 +1,77 @@
 # ___________________________________________ Code to generate dataset ____________________________________________________________________
 
-import random
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from faker import Faker
+import argparse
+import os
+from functools import partial
 import numpy as np
-
-fake = Faker()
-
-# --- Configuration ---
-genders = ['Male', 'Female']
-earning_classes = ['Low', 'Middle', 'High']
-parent_occupations = ['Engineer', 'Doctor', 'Teacher', 'Farmer', 'Business Owner', 'Government Employee', 'Artist', 'Unemployed', 'Other']
-levels_map = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3}
-levels_list = list(levels_map.keys())
-courses = ['Math', 'Science', 'History', 'Computer Science', 'Physics', 'Chemistry', 'Biology', 'English', 'Art', 'Geography']
-material_types = ['pdf', 'pptx', 'txt', 'docx', 'video', 'interactive_module']
-consistencies_map = {'Regular': 1, 'Irregular': 0}
-consistencies_list = list(consistencies_map.keys())
-health_levels_map = {'Very Poor': 1, 'Poor': 2, 'Average': 3, 'Good': 4, 'Excellent': 5}
-health_levels_list = list(health_levels_map.keys())
-
-num_records = 1000
-num_rare_cases = 20
-
-# --- Helper Functions ---
-
-def get_level_from_value(value, level_map):
-    """Finds the level name corresponding to a numeric value."""
-    for name, val in level_map.items():
-        if val == value:
-            return name
-    return None
-
-# --- Main Generation Function ---
-
-def generate_student():
-    age = random.randint(3, 18)
-    gender = random.choice(genders)
-    parent_occupation = random.choice(parent_occupations)
-    earning_class = random.choice(earning_classes)
-    country = fake.country()
-
-
-    if age <= 7:
-        student_level_val = 1
-    elif age <= 13:
-        student_level_val = random.choice([1, 2])
-    else:
-        student_level_val = random.choice([2, 3])
-    student_level = get_level_from_value(student_level_val, levels_map)
-
-    # --- Decouple Course and Material Level ---
-    course_level_val = student_level_val + random.choice([-1, 0, 0, 0, 1])
-    course_level_val = max(1, min(course_level_val, 3))
-    course_level = get_level_from_value(course_level_val, levels_map)
-
-    material_level_val = course_level_val + random.choice([-1, 0, 0, 1])
-    material_level_val = max(1, min(material_level_val, 3))
-    material_level = get_level_from_value(material_level_val, levels_map)
-
-    course_name = random.choice(courses)
-    material_type = random.choice(material_types)
-
-    # --- Refine other features ---
-    base_study_time = {1: (0.5, 2.5), 2: (1.0, 4.0), 3: (1.5, 6.0)}
-    study_time = round(random.uniform(*base_study_time[course_level_val]) + random.gauss(0, 0.5), 1)
-    study_time = max(0.1, study_time)
-
-    # IQ with slightly wider range and less strict level dependence
-    iq = random.randint(70, 135) + random.choice([-5, 0, 5])
-
-    consistency = random.choice(consistencies_list)
-    health_desc = random.choice(health_levels_list)
-    health = health_levels_map[health_desc]
-    # --- More Nuanced Assessment Score Calculation ---
-    base_score = 50 + (iq - 100) * 0.3 + (course_level_val - 1.5) * 5
-
-    # Multiplicative effect of consistency on study time effectiveness
-    consistency_factor = 1.0 if consistency == 'Regular' else 0.6
-    effective_study_time = study_time * consistency_factor
-    # Apply diminishing returns to study time
-    study_benefit = 15 * np.log1p(effective_study_time)
-
-    # Health impact (more significant at extremes)
-    health_impact = 0
-    if health <= 2:
-        health_impact = -10 * (3 - health)
-    elif health >= 4:
-        health_impact = 5 * (health - 3)
-
-    # Level Mismatch Penalty (if student level is much lower than course level)
-    level_mismatch_penalty = -10 * max(0, course_level_val - student_level_val - 1)
-
-    # Combine factors and add noise
-    calculated_score = base_score + study_benefit + health_impact + level_mismatch_penalty
-    noise = random.gauss(0, 8)
-    assessment_score = round(calculated_score + noise)
-
-    # Clamp score to 0-100 range
-    assessment_score = max(0, min(assessment_score, 100))
-
-    return {
-        'Age': age,
-        'Gender': gender,
-        'Parent Occupation': parent_occupation,
-        'Earning Class': earning_class,
-        'Level of Student': student_level,
-        'Level of Course': course_level,
-        'Course Name': course_name,
-        'Time per Day (hrs)': study_time,
-        'Material Level': material_level,
-        'IQ': iq,
-        'Consistency': consistency,
-        'Health': health,
-        'Assessment Score': assessment_score,
-        'Health Description': health_desc
-    }
-
-# --- Generate Rare/Edge Cases ---
-def generate_rare_case():
-    """ Generates more diverse and potentially challenging edge cases """
-    student = generate_student()
-
-    # Apply a specific modification to make it a rare case
-    case_type = random.randint(1, 7)
-
-    if case_type == 1: # Very High IQ, Poor Health/Consistency
-        student.update({'IQ': random.randint(135, 150), 'Consistency': 'Irregular', 'Health': random.choice([1, 2])})
-    elif case_type == 2: # Lower IQ, Excellent Health/Consistency
-        student.update({'IQ': random.randint(70, 85), 'Consistency': 'Regular', 'Health': random.choice([4, 5])})
-    elif case_type == 3: # Significant Level Mismatch (Student < Course)
-        student.update({'Level of Student': 'Beginner', 'Level of Course': 'Advanced'})
-        student['Material Level'] = random.choice(['Advanced', 'Intermediate']) # Material likely matches course
-    elif case_type == 4: # High Performing Beginner
-        student.update({'Level of Student': 'Beginner', 'Level of Course': 'Beginner', 'Assessment Score': random.randint(85, 98)})
-        student['Consistency'] = 'Regular'
-        student['Health'] = random.choice([4, 5])
-    elif case_type == 5: # Very High Study Time, Low Score
-        student.update({'Time per Day (hrs)': round(random.uniform(6.0, 8.0), 1), 'Assessment Score': random.randint(30, 55)})
-        student['Consistency'] = 'Irregular' # Possible reason for low score despite time
-        student['IQ'] = random.randint(80, 100)
-    elif case_type == 6: # Very Low Study Time, High Score
-        student.update({'Time per Day (hrs)': round(random.uniform(0.1, 0.8), 1), 'Assessment Score': random.randint(80, 95)})
-        student['IQ'] = random.randint(120, 140) # Possible reason: High IQ
-        student['Consistency'] = 'Regular'
-    elif case_type == 7: # Advanced Student taking Beginner Course
-        student.update({'Level of Student': 'Advanced', 'Level of Course': 'Beginner'})
-        student['Material Level'] = 'Beginner'
-
-
-
-    return student
-
+from assessment_score_generation import (
+    levels_map, levels_list, consistencies_list, health_levels_list, num_records, num_rare_cases,
+    generate_students_loop, generate_students, add_numeric_columns, iter_student_chunks
+)
+from dataset_io import DatasetWriter, output_formats
+from sharded_generation import generate_sharded
+from reporting import add_report_arguments, report_from_args
+from instrumentation import add_instrumentation_arguments, stages_from_args
+
+parser = argparse.ArgumentParser(description="Generate the assessment score dataset.")
+parser.add_argument('--engine', choices=['loop', 'vectorized'], default='loop',
+                    help="'loop' builds one dict per student, 'vectorized' draws whole NumPy columns.")
+parser.add_argument('--num-records', type=int, default=num_records)
+parser.add_argument('--num-rare-cases', type=int, default=num_rare_cases)
+parser.add_argument('--seed', type=int, default=None, help="Seed for the vectorized engine.")
+parser.add_argument('--include-country', action='store_true', help="Add a 'Country' column to the dataset.")
+parser.add_argument('--country-source', choices=['table', 'faker'], default='table',
+                    help="'table' samples the built-in country list, 'faker' calls fake.country() per row (slow).")
+parser.add_argument('--output-format', choices=output_formats, default='csv')
+parser.add_argument('--output', default=None,
+                    help="CSV file, or directory of partitions for parquet/arrow (default: Assessment_Score[.csv]).")
+parser.add_argument('--chunk-size', type=int, default=None,
+                    help="Stream the dataset to disk in chunks of this many rows (skips visualizations).")
+parser.add_argument('--shards', type=int, default=None,
+                    help="Split generation into this many independently seeded shards (vectorized engine, skips visualizations).")
+parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes for --shards.")
+add_report_arguments(parser)
+add_instrumentation_arguments(parser)
+args = parser.parse_args()
+stages = stages_from_args(args, 'assessment_score_dataset_creation')
+output_path = args.output or ('Assessment_Score.csv' if args.output_format == 'csv' else 'Assessment_Score')
+
+# --- Sharded Mode: shards run on a process pool, output depends only on --seed and --shards ---
+if args.shards:
+    stages.start('sharded_generation')
+    seed_seq, rows, parts = generate_sharded(
+        partial(iter_student_chunks, num_records=args.num_records, num_rare_cases=args.num_rare_cases,
+                include_country=args.include_country, country_source=args.country_source),
+        args.num_records, args.shards, args.workers, args.seed, output_path, args.output_format,
+        chunk_size=args.chunk_size or 100_000
+    )
+    print(f"Wrote {rows} rows from {args.shards} shards ({parts} chunks, {args.workers} workers) to {output_path}")
+    print(f"Seed entropy: {seed_seq.entropy}")
+    exit()
+
+# --- Streaming Mode: peak memory is bounded by the chunk size ---
+if args.chunk_size:
+    stages.start('streaming_generation')
+    writer = DatasetWriter(output_path, args.output_format)
+    for chunk in iter_student_chunks(args.num_records, args.num_rare_cases, args.chunk_size,
+                                     rng=np.random.default_rng(args.seed), engine=args.engine,
+                                     include_country=args.include_country, country_source=args.country_source):
+        writer.write(chunk)
+    print(f"Wrote {writer.rows_written} rows in {writer.parts_written} chunks to {output_path}")
+    print("Streaming mode: visualizations skipped.")
+    exit()
 
 # --- Generate Dataset ---
-students = [generate_student() for _ in range(num_records - num_rare_cases)]
-students += [generate_rare_case() for _ in range(num_rare_cases)]
-
-df = pd.DataFrame(students)
+stages.start('generate')
+if args.engine == 'vectorized':
+    df = generate_students(args.num_records, args.num_rare_cases, rng=np.random.default_rng(args.seed),
+                           include_country=args.include_country, country_source=args.country_source)
+else:
+    df = generate_students_loop(args.num_records, args.num_rare_cases, args.include_country, args.country_source)
 
 # --- Map Categorical to Numerical for Correlation ---
-# Use the maps defined earlier
-df['Consistency_Num'] = df['Consistency'].map(consistencies_map)
-df['Material_Level_Num'] = df['Material Level'].map(levels_map)
-df['Student_Level_Num'] = df['Level of Student'].map(levels_map)
-df['Course_Level_Num'] = df['Level of Course'].map(levels_map)
+stages.start('prepare')
+df = add_numeric_columns(df)
 
 # Select only relevant numeric columns for the heatmap
 numeric_cols_for_corr = [
@@ -182,63 +87,48 @@ numeric_df.columns = [
     ]
 
 # Save the full dataset (including categorical)
-df.to_csv('Assessment_Score.csv', index=False)
-print("Assessment_Score.csv")
+stages.start('write')
+DatasetWriter(output_path, args.output_format).write(df)
+print(output_path)
 
 # --- Visualizations ---
+stages.start('plots')
+report = report_from_args(args)
 
 # Correlation Heatmap
-plt.figure(figsize=(12, 10))
-sns.heatmap(numeric_df.corr(), annot=True, cmap='coolwarm', fmt='.2f', linewidths=.5)
-plt.title("Feature Correlation Heatmap (Improved Dataset)")
-plt.xticks(rotation=45, ha='right')
-plt.yticks(rotation=0)
-plt.tight_layout()
-plt.show()
+report.add('correlation_heatmap', 'heatmap', numeric_df.corr(), "Feature Correlation Heatmap (Improved Dataset)",
+           figsize=(12, 10), xticks=dict(rotation=45, ha='right'), yticks=dict(rotation=0), tight_layout=True,
+           annot=True, cmap='coolwarm', fmt='.2f', linewidths=.5)
 
 # IQ vs Assessment Score Scatter Plot (Hue by Consistency)
-plt.figure(figsize=(8, 6))
-sns.scatterplot(data=df, x='IQ', y='Assessment Score', hue='Consistency', alpha=0.7)
-plt.title("IQ vs Assessment Score (Colored by Consistency)")
-plt.xlabel("IQ")
-plt.ylabel("Assessment Score")
-plt.show()
+report.add('iq_vs_assessment_score', 'scatterplot', df[['IQ', 'Assessment Score', 'Consistency']],
+           "IQ vs Assessment Score (Colored by Consistency)", sample=True, sample_by='Consistency',
+           xlabel="IQ", ylabel="Assessment Score", x='IQ', y='Assessment Score', hue='Consistency', alpha=0.7)
 
 # Level of Student vs Assessment Score Boxplot
-plt.figure(figsize=(8, 6))
-sns.boxplot(data=df, x='Level of Student', y='Assessment Score', order=levels_list) # Ensure correct order
-plt.title("Student Level vs Assessment Score")
-plt.xlabel("Level of Student")
-plt.ylabel("Assessment Score")
-plt.show()
+report.add('student_level_vs_assessment_score', 'boxplot', df[['Level of Student', 'Assessment Score']],
+           "Student Level vs Assessment Score", xlabel="Level of Student", ylabel="Assessment Score",
+           x='Level of Student', y='Assessment Score', order=levels_list) # Ensure correct order
 
 # Consistency vs Assessment Score Boxplot
-plt.figure(figsize=(8, 6))
-sns.boxplot(data=df, x='Consistency', y='Assessment Score', order=consistencies_list)
-plt.title("Consistency vs Assessment Score")
-plt.xlabel("Consistency")
-plt.ylabel("Assessment Score")
-plt.show()
+report.add('consistency_vs_assessment_score', 'boxplot', df[['Consistency', 'Assessment Score']],
+           "Consistency vs Assessment Score", xlabel="Consistency", ylabel="Assessment Score",
+           x='Consistency', y='Assessment Score', order=consistencies_list)
 
 # Study Time vs Assessment Score Scatter Plot (Hue by Course Level)
-plt.figure(figsize=(8, 6))
 # Map Course Level numerical back to string for hue legend clarity if needed
 df['Course_Level_Str'] = df['Course_Level_Num'].map({v: k for k, v in levels_map.items()})
-sns.scatterplot(data=df, x='Time per Day (hrs)', y='Assessment Score', hue='Course_Level_Str', alpha=0.7, hue_order=levels_list)
-plt.title("Study Time vs Assessment Score (Colored by Course Level)")
-plt.xlabel("Time per Day (hrs)")
-plt.ylabel("Assessment Score")
-plt.show()
+report.add('study_time_vs_assessment_score', 'scatterplot', df[['Time per Day (hrs)', 'Assessment Score', 'Course_Level_Str']],
+           "Study Time vs Assessment Score (Colored by Course Level)", sample=True, sample_by='Course_Level_Str',
+           xlabel="Time per Day (hrs)", ylabel="Assessment Score",
+           x='Time per Day (hrs)', y='Assessment Score', hue='Course_Level_Str', alpha=0.7, hue_order=levels_list)
 
 # Health vs Assessment Score Boxplot
-plt.figure(figsize=(8, 6))
-sns.boxplot(data=df, x='Health Description', y='Assessment Score', order=health_levels_list)
-plt.title("Health vs Assessment Score")
-plt.xlabel("Health Description")
-plt.ylabel("Assessment Score")
-plt.xticks(rotation=30, ha='right')
-plt.tight_layout()
-plt.show()
-
+report.add('health_vs_assessment_score', 'boxplot', df[['Health Description', 'Assessment Score']],
+           "Health vs Assessment Score", xlabel="Health Description", ylabel="Assessment Score",
+           xticks=dict(rotation=30, ha='right'), tight_layout=True,
+           x='Health Description', y='Assessment Score', order=health_levels_list)
 
+report.close()
 print("Visualization complete!")
+stages.close()
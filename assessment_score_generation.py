@@ -0,0 +1,326 @@
+# ___________________________________________ Assessment score data generators ____________________________________________________________
+
+import random
+import pandas as pd
+import numpy as np
+from dataset_io import chunk_bounds
+from countries import sample_country, sample_countries
+from student_schema import (
+    genders, earning_classes, parent_occupations, levels_map, levels_list, consistencies_map, consistencies_list,
+    health_levels_map, health_levels_list, assessment_schema, apply_schema
+)
+from student_schema import assessment_courses as courses
+
+# --- Configuration (the category lists are declared in student_schema.py) ---
+material_types = ['pdf', 'pptx', 'txt', 'docx', 'video', 'interactive_module']
+
+num_records = 1000
+num_rare_cases = 20
+
+# --- Helper Functions ---
+
+def get_level_from_value(value, level_map):
+    """Finds the level name corresponding to a numeric value."""
+    for name, val in level_map.items():
+        if val == value:
+            return name
+    return None
+
+# --- Main Generation Function ---
+
+def generate_student(include_country=False, country_source='table'):
+    age = random.randint(3, 18)
+    gender = random.choice(genders)
+    parent_occupation = random.choice(parent_occupations)
+    earning_class = random.choice(earning_classes)
+    # Drawn from the in-memory country table; Faker is only imported for country_source='faker'
+    country = sample_country(country_source) if include_country else None
+
+
+    if age <= 7:
+        student_level_val = 1
+    elif age <= 13:
+        student_level_val = random.choice([1, 2])
+    else:
+        student_level_val = random.choice([2, 3])
+    student_level = get_level_from_value(student_level_val, levels_map)
+
+    # --- Decouple Course and Material Level ---
+    course_level_val = student_level_val + random.choice([-1, 0, 0, 0, 1])
+    course_level_val = max(1, min(course_level_val, 3))
+    course_level = get_level_from_value(course_level_val, levels_map)
+
+    material_level_val = course_level_val + random.choice([-1, 0, 0, 1])
+    material_level_val = max(1, min(material_level_val, 3))
+    material_level = get_level_from_value(material_level_val, levels_map)
+
+    course_name = random.choice(courses)
+    material_type = random.choice(material_types)
+
+    # --- Refine other features ---
+    base_study_time = {1: (0.5, 2.5), 2: (1.0, 4.0), 3: (1.5, 6.0)}
+    study_time = round(random.uniform(*base_study_time[course_level_val]) + random.gauss(0, 0.5), 1)
+    study_time = max(0.1, study_time)
+
+    # IQ with slightly wider range and less strict level dependence
+    iq = random.randint(70, 135) + random.choice([-5, 0, 5])
+
+    consistency = random.choice(consistencies_list)
+    health_desc = random.choice(health_levels_list)
+    health = health_levels_map[health_desc]
+    # --- More Nuanced Assessment Score Calculation ---
+    base_score = 50 + (iq - 100) * 0.3 + (course_level_val - 1.5) * 5
+
+    # Multiplicative effect of consistency on study time effectiveness
+    consistency_factor = 1.0 if consistency == 'Regular' else 0.6
+    effective_study_time = study_time * consistency_factor
+    # Apply diminishing returns to study time
+    study_benefit = 15 * np.log1p(effective_study_time)
+
+    # Health impact (more significant at extremes)
+    health_impact = 0
+    if health <= 2:
+        health_impact = -10 * (3 - health)
+    elif health >= 4:
+        health_impact = 5 * (health - 3)
+
+    # Level Mismatch Penalty (if student level is much lower than course level)
+    level_mismatch_penalty = -10 * max(0, course_level_val - student_level_val - 1)
+
+    # Combine factors and add noise
+    calculated_score = base_score + study_benefit + health_impact + level_mismatch_penalty
+    noise = random.gauss(0, 8)
+    assessment_score = round(calculated_score + noise)
+
+    # Clamp score to 0-100 range
+    assessment_score = max(0, min(assessment_score, 100))
+
+    student = {
+        'Age': age,
+        'Gender': gender,
+        'Parent Occupation': parent_occupation,
+        'Earning Class': earning_class,
+        'Level of Student': student_level,
+        'Level of Course': course_level,
+        'Course Name': course_name,
+        'Time per Day (hrs)': study_time,
+        'Material Level': material_level,
+        'IQ': iq,
+        'Consistency': consistency,
+        'Health': health,
+        'Assessment Score': assessment_score,
+        'Health Description': health_desc
+    }
+    if include_country:
+        student['Country'] = country
+    return student
+
+# --- Generate Rare/Edge Cases ---
+def generate_rare_case(include_country=False, country_source='table'):
+    """ Generates more diverse and potentially challenging edge cases """
+    student = generate_student(include_country, country_source)
+
+    # Apply a specific modification to make it a rare case
+    case_type = random.randint(1, 7)
+
+    if case_type == 1: # Very High IQ, Poor Health/Consistency
+        student.update({'IQ': random.randint(135, 150), 'Consistency': 'Irregular', 'Health': random.choice([1, 2])})
+    elif case_type == 2: # Lower IQ, Excellent Health/Consistency
+        student.update({'IQ': random.randint(70, 85), 'Consistency': 'Regular', 'Health': random.choice([4, 5])})
+    elif case_type == 3: # Significant Level Mismatch (Student < Course)
+        student.update({'Level of Student': 'Beginner', 'Level of Course': 'Advanced'})
+        student['Material Level'] = random.choice(['Advanced', 'Intermediate']) # Material likely matches course
+    elif case_type == 4: # High Performing Beginner
+        student.update({'Level of Student': 'Beginner', 'Level of Course': 'Beginner', 'Assessment Score': random.randint(85, 98)})
+        student['Consistency'] = 'Regular'
+        student['Health'] = random.choice([4, 5])
+    elif case_type == 5: # Very High Study Time, Low Score
+        student.update({'Time per Day (hrs)': round(random.uniform(6.0, 8.0), 1), 'Assessment Score': random.randint(30, 55)})
+        student['Consistency'] = 'Irregular' # Possible reason for low score despite time
+        student['IQ'] = random.randint(80, 100)
+    elif case_type == 6: # Very Low Study Time, High Score
+        student.update({'Time per Day (hrs)': round(random.uniform(0.1, 0.8), 1), 'Assessment Score': random.randint(80, 95)})
+        student['IQ'] = random.randint(120, 140) # Possible reason: High IQ
+        student['Consistency'] = 'Regular'
+    elif case_type == 7: # Advanced Student taking Beginner Course
+        student.update({'Level of Student': 'Advanced', 'Level of Course': 'Beginner'})
+        student['Material Level'] = 'Beginner'
+
+
+
+    return student
+
+
+def generate_students_loop(num_records=num_records, num_rare_cases=num_rare_cases, include_country=False, country_source='table'):
+    """Row-by-row reference generator (one dict per student)."""
+    students = [generate_student(include_country, country_source) for _ in range(num_records - num_rare_cases)]
+    students += [generate_rare_case(include_country, country_source) for _ in range(num_rare_cases)]
+    return apply_schema(pd.DataFrame(students), assessment_schema)
+
+# --- Vectorized (Batched) Generation ---
+
+def _categorical(codes, categories):
+    """Wraps integer codes as a pandas Categorical with a fixed category list."""
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def generate_students(num_records=num_records, num_rare_cases=num_rare_cases, rng=None, include_country=False, country_source='table'):
+    """
+    Generates a whole batch of students as NumPy arrays.
+
+    Same distributions as generate_student()/generate_rare_case(), but every
+    column is drawn at once from a np.random.Generator. The last
+    `num_rare_cases` rows receive the rare-case overrides. String columns are
+    returned as categoricals with fixed categories so that separate batches
+    always share the same category codes. With include_country=True a
+    'Country' column is sampled from the in-memory country table.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    n = num_records
+
+    age = rng.integers(3, 19, size=n)
+    gender = rng.integers(0, len(genders), size=n)
+    parent_occupation = rng.integers(0, len(parent_occupations), size=n)
+    earning_class = rng.integers(0, len(earning_classes), size=n)
+
+    # Student level: 1 up to age 7, 1-2 up to 13, 2-3 afterwards
+    student_level_val = np.where(age <= 7, 1, np.where(age <= 13, 1, 2) + rng.integers(0, 2, size=n))
+
+    # --- Decouple Course and Material Level ---
+    course_level_val = student_level_val + rng.choice(np.array([-1, 0, 0, 0, 1]), size=n)
+    course_level_val = np.clip(course_level_val, 1, 3)
+
+    material_level_val = course_level_val + rng.choice(np.array([-1, 0, 0, 1]), size=n)
+    material_level_val = np.clip(material_level_val, 1, 3)
+
+    course_name = rng.integers(0, len(courses), size=n)
+
+    # --- Refine other features ---
+    study_low = np.array([0.0, 0.5, 1.0, 1.5])[course_level_val]
+    study_high = np.array([0.0, 2.5, 4.0, 6.0])[course_level_val]
+    study_time = np.round(rng.uniform(study_low, study_high) + rng.normal(0, 0.5, size=n), 1)
+    study_time = np.maximum(0.1, study_time)
+
+    iq = rng.integers(70, 136, size=n) + rng.choice(np.array([-5, 0, 5]), size=n)
+
+    consistency = rng.integers(0, len(consistencies_list), size=n)
+    health_idx = rng.integers(0, len(health_levels_list), size=n)
+    health = health_idx + 1
+
+    # --- Assessment Score Calculation (same formula as generate_student) ---
+    base_score = 50 + (iq - 100) * 0.3 + (course_level_val - 1.5) * 5
+    consistency_factor = np.where(consistency == 0, 1.0, 0.6)
+    study_benefit = 15 * np.log1p(study_time * consistency_factor)
+    health_impact = np.where(health <= 2, -10 * (3 - health), np.where(health >= 4, 5 * (health - 3), 0))
+    level_mismatch_penalty = -10 * np.maximum(0, course_level_val - student_level_val - 1)
+
+    calculated_score = base_score + study_benefit + health_impact + level_mismatch_penalty
+    noise = rng.normal(0, 8, size=n)
+    assessment_score = np.clip(np.round(calculated_score + noise), 0, 100).astype(np.int64)
+
+    # --- Rare/Edge Case Overrides (applied to the last num_rare_cases rows) ---
+    num_rare_cases = min(num_rare_cases, n)
+    if num_rare_cases:
+        rare = np.zeros(n, dtype=bool)
+        rare[n - num_rare_cases:] = True
+        case_type = np.zeros(n, dtype=np.int64)
+        case_type[rare] = rng.integers(1, 8, size=num_rare_cases)
+
+        def draw(mask, fn):
+            return fn(int(mask.sum()))
+
+        # 1: Very High IQ, Poor Health/Consistency
+        m = case_type == 1
+        iq[m] = draw(m, lambda k: rng.integers(135, 151, size=k))
+        consistency[m] = 1
+        health[m] = draw(m, lambda k: rng.integers(1, 3, size=k))
+        # 2: Lower IQ, Excellent Health/Consistency
+        m = case_type == 2
+        iq[m] = draw(m, lambda k: rng.integers(70, 86, size=k))
+        consistency[m] = 0
+        health[m] = draw(m, lambda k: rng.integers(4, 6, size=k))
+        # 3: Significant Level Mismatch (Student < Course)
+        m = case_type == 3
+        student_level_val[m] = 1
+        course_level_val[m] = 3
+        material_level_val[m] = draw(m, lambda k: rng.integers(2, 4, size=k))
+        # 4: High Performing Beginner
+        m = case_type == 4
+        student_level_val[m] = 1
+        course_level_val[m] = 1
+        assessment_score[m] = draw(m, lambda k: rng.integers(85, 99, size=k))
+        consistency[m] = 0
+        health[m] = draw(m, lambda k: rng.integers(4, 6, size=k))
+        # 5: Very High Study Time, Low Score
+        m = case_type == 5
+        study_time[m] = np.round(draw(m, lambda k: rng.uniform(6.0, 8.0, size=k)), 1)
+        assessment_score[m] = draw(m, lambda k: rng.integers(30, 56, size=k))
+        consistency[m] = 1
+        iq[m] = draw(m, lambda k: rng.integers(80, 101, size=k))
+        # 6: Very Low Study Time, High Score
+        m = case_type == 6
+        study_time[m] = np.round(draw(m, lambda k: rng.uniform(0.1, 0.8, size=k)), 1)
+        assessment_score[m] = draw(m, lambda k: rng.integers(80, 96, size=k))
+        iq[m] = draw(m, lambda k: rng.integers(120, 141, size=k))
+        consistency[m] = 0
+        # 7: Advanced Student taking Beginner Course
+        m = case_type == 7
+        student_level_val[m] = 3
+        course_level_val[m] = 1
+        material_level_val[m] = 1
+
+    df = pd.DataFrame({
+        'Age': age,
+        'Gender': _categorical(gender, genders),
+        'Parent Occupation': _categorical(parent_occupation, parent_occupations),
+        'Earning Class': _categorical(earning_class, earning_classes),
+        'Level of Student': _categorical(student_level_val - 1, levels_list),
+        'Level of Course': _categorical(course_level_val - 1, levels_list),
+        'Course Name': _categorical(course_name, courses),
+        'Time per Day (hrs)': study_time,
+        'Material Level': _categorical(material_level_val - 1, levels_list),
+        'IQ': iq,
+        'Consistency': _categorical(consistency, consistencies_list),
+        'Health': health,
+        'Assessment Score': assessment_score,
+        'Health Description': _categorical(health_idx, health_levels_list)
+    })
+    if include_country:
+        df['Country'] = sample_countries(n, rng, country_source)
+    return apply_schema(df, assessment_schema)
+
+
+def add_numeric_columns(df):
+    """Adds the numeric '_Num' level/consistency columns used for correlations."""
+    df['Consistency_Num'] = df['Consistency'].map(consistencies_map).astype(int)
+    df['Material_Level_Num'] = df['Material Level'].map(levels_map).astype(int)
+    df['Student_Level_Num'] = df['Level of Student'].map(levels_map).astype(int)
+    df['Course_Level_Num'] = df['Level of Course'].map(levels_map).astype(int)
+    return apply_schema(df, assessment_schema)
+
+
+def rare_cases_in_range(start, stop, num_records=num_records, num_rare_cases=num_rare_cases):
+    """Number of rare-case rows (the last num_rare_cases of the dataset) inside rows [start, stop)."""
+    return max(0, stop - max(start, num_records - num_rare_cases))
+
+
+def iter_student_chunks(num_records=num_records, num_rare_cases=num_rare_cases, chunk_size=100_000, rng=None,
+                        engine='vectorized', start_row=0, stop_row=None, include_country=False, country_source='table'):
+    """
+    Yields the dataset as DataFrames of at most chunk_size rows, '_Num' columns included.
+
+    start_row/stop_row restrict generation to a slice of the dataset (used for
+    shards); rare cases still land on the last num_rare_cases rows overall.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if stop_row is None:
+        stop_row = num_records
+    for start, stop in chunk_bounds(stop_row, chunk_size, start_row):
+        rare = rare_cases_in_range(start, stop, num_records, num_rare_cases)
+        if engine == 'vectorized':
+            chunk = generate_students(stop - start, rare, rng=rng, include_country=include_country, country_source=country_source)
+        else:
+            chunk = generate_students_loop(stop - start, rare, include_country, country_source)
+        yield add_numeric_columns(chunk)
@@ -1,122 +1,264 @@
+import argparse
+import os
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, KFold
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, PowerTransformer, PolynomialFeatures
-from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from xgboost import XGBRegressor
+from sklearn.model_selection import train_test_split, KFold
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
+from dataset_io import read_dataset, iter_dataset
+from drift_monitor import build_reference, save_reference
+from model_artifacts import save_assessment_pipeline, assessment_spec, save_booster
+from external_memory import train_external_memory
+from cross_validation import cross_validate
+from incremental_training import continue_training, evaluate
+from inference import load_predictor
+from instrumentation import add_instrumentation_arguments, stages_from_args
+from student_schema import assessment_schema, assessment_unused_columns, read_options
+from feature_cache import (add_feature_cache_arguments, feature_cache_from_args, dataset_digest, transformer_spec,
+                           transformer_code)
+from model_pipelines import build_assessment_pipeline, build_crossed_assessment_pipeline, build_native_assessment_pipeline
 
 warnings.filterwarnings('ignore', category=FutureWarning)
 warnings.filterwarnings('ignore', category=UserWarning)
 
-# --- 1. Load Data ---
-file_path = 'Assessment_Score.csv'
-try:
-    df = pd.read_csv(file_path)
-    print(f"Successfully loaded dataset: {file_path}")
-    print("Original Dataset Shape:", df.shape)
-except FileNotFoundError:
-    print(f"Error: Dataset file not found at {file_path}")
-    print("Please ensure the file generated by the second script is in the correct directory.")
-    exit()
-except Exception as e:
-    print(f"An error occurred loading the CSV: {e}")
-    exit()
+parser = argparse.ArgumentParser(description="Train and evaluate the assessment score regressor.")
+parser.add_argument('--data', default='Assessment_Score.csv',
+                    help="CSV file or directory of Parquet/Arrow partitions written by the generator.")
+parser.add_argument('--save-model', default=None, metavar='DIR',
+                    help="Save the trained pipeline (XGBoost booster + preprocessing spec) for inference.py.")
+parser.add_argument('--interactions', choices=['pairwise', 'crossed'], default='pairwise',
+                    help="All pairwise products of the dense one-hot features, or sparse numeric x numeric and "
+                         "numeric x level crosses kept as CSR into XGBoost.")
+parser.add_argument('--categorical', choices=['onehot', 'native'], default='onehot',
+                    help="One-hot encode categorical features, or let XGBoost split on them natively "
+                         "(enable_categorical=True, hist; no interaction features).")
+parser.add_argument('--cv', type=int, default=0, metavar='K',
+                    help="Evaluate with K-fold cross-validation, folds running in parallel processes, instead of "
+                         "the single 80/20 split.")
+parser.add_argument('--cv-workers', type=int, default=-1,
+                    help="Processes for --cv (-1: one per fold, up to the core count).")
+parser.add_argument('--external-memory', action='store_true',
+                    help="Train out of core: stream the dataset in chunks into XGBoost external memory, with a "
+                         "hashed train/test split, instead of loading it into RAM.")
+parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows per chunk with --external-memory.")
+parser.add_argument('--fit-rows', type=int, default=200_000,
+                    help="Training rows the preprocessing is fitted on with --external-memory.")
+parser.add_argument('--cache-dir', default=None, help="Where XGBoost keeps its external memory pages (default: a temp dir).")
+parser.add_argument('--incremental-from', default=None, metavar='DIR',
+                    help="Update the model saved in DIR with --data as a batch of new rows (trees added by "
+                         "training continuation) instead of training from scratch. The result is "
+                         "saved to --save-model, or back to DIR.")
+parser.add_argument('--incremental-rounds', type=int, default=50, help="Trees added by --incremental-from.")
+parser.add_argument('--incremental-freeze-statistics', action='store_true',
+                    help="With --incremental-from, keep the saved scaling statistics instead of merging the batch "
+                         "into them.")
+add_feature_cache_arguments(parser)
+add_instrumentation_arguments(parser)
+args = parser.parse_args()
+if args.categorical == 'native' and args.interactions == 'crossed':
+    parser.error("--categorical native builds no interaction features; it cannot be combined with --interactions crossed.")
+stages = stages_from_args(args, 'assessment_score_prediction')
 
-# --- Remove Visualization-Specific '_Num' Columns ---
-print("\nChecking for and removing visualization-specific '_Num' columns...")
-num_cols_to_drop_viz = ['Student_Level_Num', 'Material_Level_Num', 'Course_Level_Num', 'Consistency_Num']
-cols_actually_dropped_viz = [col for col in num_cols_to_drop_viz if col in df.columns]
-if cols_actually_dropped_viz:
-    df = df.drop(columns=cols_actually_dropped_viz)
-    print(f"Removed visualization columns: {cols_actually_dropped_viz}")
+if args.categorical == 'native':
+    build_pipeline = build_native_assessment_pipeline
+elif args.interactions == 'crossed':
+    build_pipeline = build_crossed_assessment_pipeline
 else:
-    print("No visualization-specific '_Num' columns found to remove.")
-print("Dataset Shape after removing viz columns:", df.shape)
+    build_pipeline = build_assessment_pipeline
 
-# --- 2. Define Target and Features ---
-target = 'Assessment Score'
-potential_other_drop_cols = ['Health Description']
-cols_to_drop_total = [target] + [col for col in potential_other_drop_cols if col in df.columns]
+# --- Feature cache (--feature-cache): a hit skips loading, splitting and preprocessing ---
+feature_cache = feature_cache_from_args(args)
+cache_key = cached = None
+if (feature_cache is not None and os.path.exists(args.data)
+        and not (args.cv or args.external_memory or args.incremental_from)):
+    stages.start('feature_cache')
+    preprocessing = build_pipeline(['<numerical>'], ['<categorical>'])[:-1]
+    cache_key = feature_cache.key(args.data, {
+        'script': dataset_digest(__file__),
+        'interactions': args.interactions,
+        'categorical': args.categorical,
+        'preprocessing': transformer_spec(preprocessing),
+        'code': transformer_code(preprocessing),
+        'schema': repr(assessment_schema),
+        'split': {'test_size': 0.2, 'random_state': 42},
+    })
+    cached = feature_cache.load(cache_key)
 
-if target not in df.columns:
-    print(f"\nError: Target column '{target}' not found in the dataframe.")
-    exit()
+if cached is None:
+    # --- 1. Load Data ---
+    stages.start('load')
+    file_path = args.data
+    # Parsed straight into the declared dtypes (int8/float32/categoricals), skipping the columns never used
+    schema_options = read_options(assessment_schema, assessment_unused_columns)
+    try:
+        if args.external_memory:
+            # Only the first chunk is loaded here, to find the columns; training streams the whole dataset
+            _, df = next(iter_dataset(file_path, args.chunk_size, **schema_options))
+        else:
+            df = read_dataset(file_path, **schema_options)
+        print(f"Successfully loaded dataset: {file_path}")
+        print("Original Dataset Shape:", df.shape)
+    except FileNotFoundError:
+        print(f"Error: Dataset file not found at {file_path}")
+        print("Please ensure the file generated by the second script is in the correct directory.")
+        exit()
+    except Exception as e:
+        print(f"An error occurred loading the CSV: {e}")
+        exit()
 
-try:
-    y = df[target]
-    X = df.drop(columns=cols_to_drop_total)
-    print("\nTarget and features defined.")
-    print(f"Features ('X') Shape: {X.shape}")
-except KeyError as e:
-    print(f"\nError selecting features/target: Missing column - {e}")
-    exit()
-except Exception as e:
-    print(f"An unexpected error occurred defining X and y: {e}")
-    exit()
+    # --- Remove Visualization-Specific '_Num' Columns ---
+    stages.start('prepare')
+    print("\nChecking for and removing visualization-specific '_Num' columns...")
+    num_cols_to_drop_viz = ['Student_Level_Num', 'Material_Level_Num', 'Course_Level_Num', 'Consistency_Num']
+    cols_actually_dropped_viz = [col for col in num_cols_to_drop_viz if col in df.columns]
+    if cols_actually_dropped_viz:
+        df = df.drop(columns=cols_actually_dropped_viz)
+        print(f"Removed visualization columns: {cols_actually_dropped_viz}")
+    else:
+        print("No visualization-specific '_Num' columns found to remove.")
+    print("Dataset Shape after removing viz columns:", df.shape)
 
-# --- 3. Identify Feature Types ---
-try:
-    numerical_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
-    print("\nIdentified Numerical Features:", numerical_features)
-    print("Identified Categorical Features:", categorical_features)
-    if len(numerical_features) + len(categorical_features) != X.shape[1]:
-        print("\nWarning: Not all feature columns were identified as numerical or categorical.")
-except Exception as e:
-    print(f"An error occurred identifying feature types: {e}")
-    exit()
+    # --- 2. Define Target and Features ---
+    target = 'Assessment Score'
+    potential_other_drop_cols = ['Health Description']
+    cols_to_drop_total = [target] + [col for col in potential_other_drop_cols if col in df.columns]
 
-# --- 4. Split Data into Training and Testing Sets ---
-try:
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    print(f"\nData split into training ({X_train.shape[0]} samples) and testing ({X_test.shape[0]} samples).")
-except Exception as e:
-    print(f"An error occurred during data splitting: {e}")
+    if target not in df.columns:
+        print(f"\nError: Target column '{target}' not found in the dataframe.")
+        exit()
+
+    try:
+        y = df[target]
+        X = df.drop(columns=cols_to_drop_total)
+        feature_columns = X.columns.tolist()
+        print("\nTarget and features defined.")
+        print(f"Features ('X') Shape: {X.shape}")
+    except KeyError as e:
+        print(f"\nError selecting features/target: Missing column - {e}")
+        exit()
+    except Exception as e:
+        print(f"An unexpected error occurred defining X and y: {e}")
+        exit()
+
+    # --- 3. Identify Feature Types ---
+    try:
+        numerical_features = X.select_dtypes(include=np.number).columns.tolist()
+        categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
+        print("\nIdentified Numerical Features:", numerical_features)
+        print("Identified Categorical Features:", categorical_features)
+        if len(numerical_features) + len(categorical_features) != X.shape[1]:
+            print("\nWarning: Not all feature columns were identified as numerical or categorical.")
+    except Exception as e:
+        print(f"An error occurred identifying feature types: {e}")
+        exit()
+
+    # --- 4. Split Data into Training and Testing Sets ---
+    stages.start('split')
+    try:
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        print(f"\nData split into training ({X_train.shape[0]} samples) and testing ({X_test.shape[0]} samples).")
+    except Exception as e:
+        print(f"An error occurred during data splitting: {e}")
+        exit()
+    # Feature distributions the scoring traffic is compared with (drift_monitor.py), saved with the model
+    drift_reference = build_reference(X_train, numerical_features, categorical_features)
+else:
+    print(f"Loaded preprocessed features from the feature cache: {feature_cache.path(cache_key)}")
+    feature_columns = cached['meta']['feature_columns']
+    numerical_features = cached['meta']['numerical_features']
+    categorical_features = cached['meta']['categorical_features']
+    y_train, y_test = cached['y_train'], cached['y_test']
+    drift_reference = cached['drift_reference']
+    print(f"Training ({len(y_train)} samples) and testing ({len(y_test)} samples) features memory-mapped.")
+
+# --- Incremental update of a saved model (--incremental-from DIR) ---
+if args.incremental_from:
+    stages.start('incremental_update')
+    previous = load_predictor(args.incremental_from)
+    print(f"\nContinuing model {previous.model_version} from {args.incremental_from} on {len(X_train)} new rows...")
+    updated, info = continue_training(previous, X_train, y_train, rounds=args.incremental_rounds,
+                                      update_statistics=not args.incremental_freeze_statistics)
+    print(f"Added {info['rounds']} trees ({info['total_rounds']} in total) in {info['seconds']:.1f}s; "
+          f"scaling statistics {info['statistics']}.")
+    for name, model in (('Previous model', previous), ('Updated model', updated)):
+        metrics = evaluate(model, X_test, y_test)
+        print(f"{name}: MSE {metrics['mse']:.4f}  RMSE {metrics['rmse']:.4f}  R2 {metrics['r2']:.4f}")
+    model_dir = args.save_model or args.incremental_from
+    model_version = save_booster(updated.booster, updated.spec, model_dir)
+    print(f"\nSaved model artifacts to {model_dir} (version {model_version})")
     exit()
 
 # --- 5. Preprocessing and Model Pipeline (Improved XGBoost) ---
-numerical_transformer = Pipeline(steps=[
-    ('power', PowerTransformer(method='yeo-johnson')),
-    ('scaler', StandardScaler())
-])
-
-categorical_transformer = Pipeline(steps=[
-    ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=False))
-])
-
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', numerical_transformer, numerical_features),
-        ('cat', categorical_transformer, categorical_features)
-    ],
-    remainder='passthrough'
-)
-
-pipeline = Pipeline(steps=[
-    ('preprocessor', preprocessor),
-    ('poly_features', PolynomialFeatures(degree=2, interaction_only=True, include_bias=False)),
-    ('model', XGBRegressor(random_state=42, objective='reg:squarederror',
-                          n_estimators=400, learning_rate=0.02, max_depth=7,
-                          subsample=0.65, colsample_bytree=0.65, gamma=0.25,
-                          reg_alpha=0.1, reg_lambda=2.5, min_child_weight=3,
-                          colsample_bynode=0.8)) #added colsample_bynode.
-])
+pipeline = build_pipeline(numerical_features, categorical_features)
+if cached is not None:
+    # the preprocessing steps were fitted by the run that filled the cache
+    pipeline = Pipeline(cached['transformer'].steps + pipeline.steps[-1:])
+
+# --- Parallel K-fold cross-validation (--cv K) ---
+if args.cv:
+    stages.start('cross_validation')
+    print(f"\nRunning {args.cv}-fold cross-validation in parallel...")
+    cv_result = cross_validate(build_pipeline, X, y, numerical_features, categorical_features,
+                               n_splits=args.cv, n_jobs=args.cv_workers)
+    print(f"{cv_result['workers']} worker processes x {cv_result['nthread']} XGBoost threads")
+    for fold in cv_result['folds']:
+        print(f"  Fold {fold['fold'] + 1}: MSE {fold['mse']:.4f}  RMSE {fold['rmse']:.4f}  R2 {fold['r2']:.4f}  "
+              f"({fold['seconds']:.1f}s)")
+    for metric in ('mse', 'rmse', 'r2'):
+        values = [fold[metric] for fold in cv_result['folds']]
+        print(f"Mean {metric.upper()}: {sum(values) / len(values):.4f}")
+    fold_seconds = sum(fold['seconds'] for fold in cv_result['folds'])
+    print(f"Wall-clock time: {cv_result['wall_seconds']:.1f}s (sum of fold fit times: {fold_seconds:.1f}s)")
+    exit()
+
+# --- Out-of-core training (--external-memory) ---
+if args.external_memory:
+    stages.start('external_memory')
+    print("\nTraining the XGBoost model out of core (external memory)...")
+    result = train_external_memory(file_path, pipeline, target, X.columns, chunk_size=args.chunk_size,
+                                   fit_rows=args.fit_rows, cache_dir=args.cache_dir, dtype=assessment_schema)
+    print(f"Trained on {result['train_rows']} rows in {result['train_seconds']:.1f}s; "
+          f"evaluated on {result['test_rows']} hash-selected test rows.")
+    print(f"Mean Squared Error (MSE): {result['metrics']['mse']:.4f}")
+    print(f"Root Mean Squared Error (RMSE): {result['metrics']['rmse']:.4f}")
+    print(f"R-squared (R2): {result['metrics']['r2']:.4f}")
+    if args.save_model:
+        model_version = save_booster(result['booster'], assessment_spec(pipeline, X.columns), args.save_model)
+        save_reference(drift_reference, args.save_model)
+        print(f"\nSaved model artifacts to {args.save_model} (version {model_version})")
+    exit()
 
 # --- 6. Train the Model ---
 print("\nTraining the XGBoost model...")
 try:
-    pipeline.fit(X_train, y_train)
+    # Feature steps and model are fitted one after the other (as Pipeline.fit does) so they are timed separately
+    stages.start('preprocess')
+    if cached is None:
+        X_train_processed = pipeline[:-1].fit_transform(X_train, y_train)
+        X_test_processed = pipeline[:-1].transform(X_test)
+        if cache_key is not None:
+            path = feature_cache.save(
+                cache_key, {'X_train': X_train_processed, 'X_test': X_test_processed,
+                            'y_train': y_train.to_numpy(), 'y_test': y_test.to_numpy()},
+                {'transformer': pipeline[:-1], 'drift_reference': drift_reference},
+                {'feature_columns': X.columns.tolist(), 'numerical_features': numerical_features,
+                 'categorical_features': categorical_features})
+            print(f"Stored the preprocessed features in the feature cache: {path}")
+    else:
+        X_train_processed, X_test_processed = cached['X_train'], cached['X_test']
+    stages.start('train')
+    pipeline[-1].fit(X_train_processed, y_train)
     print("Model training completed.")
 except Exception as e:
     print(f"\nAn error occurred during model training: {e}")
     exit()
 
 # --- 7. Evaluate the Model on the Test Set ---
+stages.start('evaluate')
 print("\n--- Evaluating Model on Test Set ---")
 try:
-    y_pred = pipeline.predict(X_test)
+    y_pred = pipeline[-1].predict(X_test_processed)
     mse = mean_squared_error(y_test, y_pred)
     r2 = r2_score(y_test, y_pred)
     print(f"Mean Squared Error (MSE): {mse:.4f}")
@@ -126,7 +268,14 @@ except Exception as e:
     print(f"An error occurred during model evaluation: {e}")
     exit()
 
+if args.save_model:
+    stages.start('save')
+    model_version = save_assessment_pipeline(pipeline, feature_columns, args.save_model)
+    save_reference(drift_reference, args.save_model)
+    print(f"\nSaved model artifacts to {args.save_model} (version {model_version})")
+
 # --- 8. Predict on New Data ---
+stages.start('predict')
 new_student_data = {
     'Age': [16, 10, 22],
     'Gender': ['Male', 'Female', 'Male'],
@@ -159,3 +308,4 @@ except Exception as e:
     print(f"\nAn error occurred during prediction on new data: {e}")
 
 print("\n--- Prediction Script Completed ---")
+stages.close()
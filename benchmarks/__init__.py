@@ -0,0 +1,2 @@
+# Benchmarks for the dataset generators, training pipelines and prediction paths.
+# Run from the project root, e.g. `python -m benchmarks.assessment_generation`.
@@ -0,0 +1,31 @@
+# ___________________________________________ Benchmark: assessment score generation ______________________________________________________
+
+import argparse
+import time
+import numpy as np
+from assessment_score_generation import generate_students_loop, generate_students
+
+
+def rows_per_second(fn, rows, repeats):
+    """Best-of-`repeats` throughput of fn(rows) in rows/sec."""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return rows / best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the per-row loop with the vectorized generator.")
+    parser.add_argument('--loop-rows', type=int, default=20_000)
+    parser.add_argument('--vectorized-rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    loop_rate = rows_per_second(lambda n: generate_students_loop(n, n // 50), args.loop_rows, args.repeats)
+    print(f"loop        {args.loop_rows:>12,} rows  {loop_rate:>14,.0f} rows/sec")
+    for rows in args.vectorized_rows:
+        rate = rows_per_second(lambda n: generate_students(n, n // 50, rng=rng), rows, args.repeats)
+        print(f"vectorized  {rows:>12,} rows  {rate:>14,.0f} rows/sec  ({rate / loop_rate:.0f}x)")
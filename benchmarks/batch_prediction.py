@@ -0,0 +1,45 @@
+# ___________________________________________ Benchmark: single-row vs batch material prediction _________________________________________
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.common import train_material, material_frame
+
+
+def single_row_predict(rows, preprocessor, model, label_encoder_classes, feature_columns):
+    """What predict_material_level() used to do per student: one-row DataFrame, transform, predict, decode."""
+    labels = []
+    for record in rows.to_dict('records'):
+        input_df = pd.DataFrame([record], columns=feature_columns)
+        labels.append(label_encoder_classes[int(model.predict(preprocessor.transform(input_df))[0])])
+    return np.array(labels)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare per-row prediction with the batch API.")
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--single-rows', type=int, default=500)
+    parser.add_argument('--batch-rows', type=int, default=500_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    args = parser.parse_args()
+
+    preprocessor, model, predictor, X, _ = train_material(args.train_rows)
+    roster, _ = material_frame(args.batch_rows, seed=1)
+
+    start = time.perf_counter()
+    single = single_row_predict(roster.head(args.single_rows), preprocessor, model, predictor.classes, X.columns)
+    single_rate = args.single_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    labels, probabilities = predictor.predict_batch(roster, chunk_size=args.chunk_size)
+    batch_rate = args.batch_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.predict(preprocessor.transform(roster))
+    sklearn_rate = args.batch_rows / (time.perf_counter() - start)
+
+    assert np.array_equal(single, labels[:args.single_rows]), "batch labels differ from the single-row path"
+    print(f"single row       {single_rate:>12,.0f} rows/sec")
+    print(f"sklearn batch    {sklearn_rate:>12,.0f} rows/sec  (transform + XGBClassifier.predict, labels only)")
+    print(f"predict_batch    {batch_rate:>12,.0f} rows/sec  (labels + probabilities, {batch_rate / single_rate:.0f}x single row)")
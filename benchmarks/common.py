@@ -0,0 +1,56 @@
+# ___________________________________________ Shared benchmark fixtures ___________________________________________________________________
+
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+from assessment_score_generation import generate_students
+from material_level_generation import generate_material_dataset
+from model_artifacts import assessment_spec, material_spec
+from categorical_encoding import native_categorical_params
+from model_pipelines import build_assessment_pipeline, build_material_preprocessor, material_model_params
+from inference import AssessmentScorePredictor, MaterialLevelPredictor
+
+# Columns the prediction scripts drop before training
+assessment_drop_columns = ['Assessment Score', 'Health Description']
+material_drop_columns = ['Material Level', 'Consistency_Num', 'Student_Level_Num', 'Course_Level_Num',
+                         'Present_Material_Level_Num', 'Material_Level_Num']
+
+
+def assessment_frame(rows, seed=0):
+    """Features and target shaped like the assessment prediction script's X and y."""
+    df = generate_students(rows, rows // 50, rng=np.random.default_rng(seed))
+    return df.drop(columns=assessment_drop_columns), df['Assessment Score']
+
+
+def material_frame(rows, seed=0):
+    """Features and target shaped like the material prediction script's X and y."""
+    df = generate_material_dataset(rows, rng=np.random.default_rng(seed))
+    return df.drop(columns=material_drop_columns), df['Material Level']
+
+
+def split_features(X):
+    numerical_features = X.select_dtypes(include=np.number).columns.tolist()
+    categorical_features = [col for col in X.columns if col not in numerical_features]
+    return numerical_features, categorical_features
+
+
+def train_assessment(rows, seed=0, build=build_assessment_pipeline, **model_params):
+    """Fits an assessment pipeline (pairwise by default) on generated data; returns (pipeline, predictor, X, y)."""
+    X, y = assessment_frame(rows, seed)
+    pipeline = build(*split_features(X), **model_params).fit(X, y)
+    predictor = AssessmentScorePredictor(pipeline.named_steps['model'].get_booster(), assessment_spec(pipeline, X.columns))
+    return pipeline, predictor, X, y
+
+
+def train_material(rows, seed=0, categorical='onehot', **model_params):
+    """Fits the material preprocessor and classifier on generated data; returns (preprocessor, model, predictor, X, y)."""
+    X, y = material_frame(rows, seed)
+    preprocessor = build_material_preprocessor(*split_features(X), categorical=categorical)
+    label_encoder = LabelEncoder()
+    y_encoded = label_encoder.fit_transform(y)
+    params = {'n_estimators': 200, 'max_depth': 4, 'learning_rate': 0.1,
+              **(native_categorical_params if categorical == 'native' else {}), **model_params}
+    model = xgb.XGBClassifier(num_class=len(label_encoder.classes_), **material_model_params, **params)
+    model.fit(preprocessor.fit_transform(X), y_encoded)
+    predictor = MaterialLevelPredictor(model.get_booster(), material_spec(preprocessor, label_encoder, X.columns))
+    return preprocessor, model, predictor, X, y
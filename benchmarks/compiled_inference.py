@@ -0,0 +1,101 @@
+# ___________________________________________ Benchmark: compiled array-of-nodes inference _______________________________________________
+
+import argparse
+import time
+import numpy as np
+from benchmarks.common import assessment_frame, material_frame, split_features, train_assessment, train_material
+from compiled_inference import compile_predictor
+from model_pipelines import build_crossed_assessment_pipeline, build_native_assessment_pipeline
+
+
+def latency_ms(predict, data, repeats):
+    """Median wall time of predict(data) in milliseconds."""
+    predict(data)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict(data)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e3
+
+
+def check_parity(name, reference, compiled, data):
+    """Compiled and XGBoost predictions must agree (labels exactly, scores to float32 rounding)."""
+    if reference.spec['kind'] == 'material_level':
+        labels_equal = np.array_equal(reference.predict(data), compiled.predict(data))
+        difference = np.abs(reference.predict_proba(data) - compiled.predict_proba(data)).max()
+        assert labels_equal, "compiled material labels differ from XGBoost"
+        print(f"{name:<17} parity: labels identical, max |probability diff| {difference:.2e}")
+    else:
+        expected = reference.predict(data)
+        difference = np.abs(expected - compiled.predict(data)).max()
+        assert difference <= 1e-5 * max(1.0, np.abs(expected).max()), f"compiled scores differ by {difference}"
+        print(f"{name:<17} parity: max |score diff| {difference:.2e}")
+
+
+def with_unseen_categories(data, every=7):
+    """A copy of data in which every `every`-th row (shifted per column) holds a category no model was trained on."""
+    data = data.copy()
+    for k, column in enumerate(split_features(data)[1]):
+        values = data[column].astype(object)
+        values.iloc[k % every::every] = f'Unseen {column}'
+        data[column] = values
+    return data
+
+
+def parity_only(rows, n_estimators=50):
+    """Parity of the compiled backend for every model layout, on generated rows with unseen categories; no timing."""
+    models = {
+        'assessment_score (one-hot, pairwise)': train_assessment(rows, n_estimators=n_estimators)[1],
+        'assessment_score (one-hot, crossed)': train_assessment(rows, build=build_crossed_assessment_pipeline,
+                                                                n_estimators=n_estimators)[1],
+        'assessment_score (native)': train_assessment(rows, build=build_native_assessment_pipeline,
+                                                      n_estimators=n_estimators)[1],
+        'material_level (one-hot)': train_material(rows, n_estimators=n_estimators)[2],
+        'material_level (native)': train_material(rows, categorical='native', n_estimators=n_estimators)[2],
+    }
+    rosters = {'assessment_score': with_unseen_categories(assessment_frame(rows, seed=1)[0]),
+               'material_level': with_unseen_categories(material_frame(rows, seed=1)[0])}
+    for name, reference in models.items():
+        roster = rosters[reference.spec['kind']]
+        compiled = compile_predictor(reference)
+        check_parity(name, reference, compiled, roster)
+        check_parity('  (one row)', reference, compiled, roster.head(1))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parity and latency of the compiled backend vs sklearn and XGBoost.")
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 10_000])
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--parity-only', action='store_true',
+                        help="Only check parity, for the one-hot (pairwise and crossed) and native models on rows with "
+                             "unseen categories (--train-rows capped at 5,000, 50 trees); exits non-zero on a mismatch.")
+    args = parser.parse_args()
+
+    if args.parity_only:
+        parity_only(min(args.train_rows, 5_000))
+        exit()
+
+    pipeline, assessment, _, _ = train_assessment(args.train_rows)
+    preprocessor, model, material, _, _ = train_material(args.train_rows)
+    assessment_roster, _ = assessment_frame(max(args.batch_sizes), seed=1)
+    material_roster, _ = material_frame(max(args.batch_sizes), seed=1)
+
+    backends = {
+        'assessment_score': (assessment, assessment_roster, pipeline.predict),
+        'material_level': (material, material_roster, lambda data: model.predict(preprocessor.transform(data))),
+    }
+    for name, (reference, roster, sklearn_predict) in backends.items():
+        compiled = compile_predictor(reference)
+        check_parity(name, reference, compiled, roster)
+        forest = compiled.forest
+        print(f"{'':<17} {len(forest.roots)} trees, {forest.n_nodes:,} nodes, depth {forest.max_depth}, "
+              f"{len(forest.features)} of {reference.transform.n_features} input columns used")
+        for batch_size in args.batch_sizes:
+            batch = roster.head(batch_size)
+            repeats = max(3, args.repeats if batch_size < 1_000 else args.repeats // 10)
+            timings = [latency_ms(predict, batch, repeats)
+                       for predict in (sklearn_predict, reference.predict, compiled.predict)]
+            print(f"{'':<17} batch {batch_size:>6,}  sklearn {timings[0]:8.2f} ms  xgboost {timings[1]:8.2f} ms  "
+                  f"compiled {timings[2]:8.2f} ms")
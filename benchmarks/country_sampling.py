@@ -0,0 +1,51 @@
+# ___________________________________________ Benchmark: Faker vs country table __________________________________________________________
+
+import argparse
+import subprocess
+import sys
+import time
+import numpy as np
+
+
+def import_seconds(statement, repeats, baseline='import numpy, pandas'):
+    """
+    Best-of-`repeats` wall time of a fresh interpreter running `statement`.
+
+    The generators import NumPy and pandas anyway, so that baseline is subtracted.
+    """
+    def run(code):
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], check=True)
+            best = min(best, time.perf_counter() - start)
+        return best
+    return run(f'{baseline}; {statement}') - run(baseline)
+
+
+def per_row_seconds(fn, rows):
+    start = time.perf_counter()
+    fn(rows)
+    return (time.perf_counter() - start) / rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure what sampling countries without Faker saves.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    faker_import = import_seconds('from faker import Faker; Faker()', args.repeats)
+    table_import = import_seconds('import countries', args.repeats)
+    print(f"import + setup   Faker() {faker_import * 1e3:8.1f} ms   country table {table_import * 1e3:8.1f} ms"
+          f"   saved {(faker_import - table_import) * 1e3:.1f} ms")
+
+    from countries import get_faker, sample_country, sample_countries
+    fake = get_faker()
+    faker_row = per_row_seconds(lambda n: [fake.country() for _ in range(n)], args.rows)
+    table_row = per_row_seconds(lambda n: [sample_country() for _ in range(n)], args.rows)
+    rng = np.random.default_rng(0)
+    vector_row = per_row_seconds(lambda n: sample_countries(n, rng), args.rows)
+    print(f"per row          fake.country() {faker_row * 1e9:8.0f} ns   table {table_row * 1e9:8.0f} ns"
+          f"   vectorized {vector_row * 1e9:8.1f} ns")
+    print(f"saved per row    loop {(faker_row - table_row) * 1e9:.0f} ns   vectorized {(faker_row - vector_row) * 1e9:.0f} ns")
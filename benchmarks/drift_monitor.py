@@ -0,0 +1,59 @@
+# ___________________________________________ Benchmark: drift monitor overhead and sensitivity __________________________________________
+
+import argparse
+import time
+import numpy as np
+from benchmarks.common import assessment_frame, split_features, train_assessment
+from drift_monitor import DriftMonitor, build_reference
+
+
+def shifted(X, name, rng):
+    """A copy of X with one of the distribution shifts the monitor should catch."""
+    X = X.copy()
+    if name == 'IQ +10':
+        X['IQ'] = X['IQ'] + 10
+    elif name == 'study time x1.5':
+        X['Time per Day (hrs)'] = X['Time per Day (hrs)'] * 1.5
+    elif name == 'more Advanced students':
+        advanced = rng.random(len(X)) < 0.3
+        X.loc[advanced, 'Level of Student'] = 'Advanced'
+    return X
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-batch cost of DriftMonitor.observe and the PSI/KS it reports.")
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--traffic-rows', type=int, default=20_000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    _, predictor, X_train, _ = train_assessment(args.train_rows, n_estimators=100)
+    reference = build_reference(X_train, *split_features(X_train))
+    X, _ = assessment_frame(args.traffic_rows, seed=1)
+
+    print(f"{'rows':>7} {'observe ms':>11} {'predict ms':>11} {'overhead':>9}")
+    for batch_size in (1, 64, 10_000):
+        columns = {name: X[name].to_numpy()[:batch_size] for name in predictor.feature_columns}
+        monitor = DriftMonitor(reference)
+        repeats = max(3, args.repeats if batch_size < 10_000 else args.repeats // 20)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            monitor.observe(columns)
+        observe_seconds = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predictor.predict_batch(columns)
+        predict_seconds = (time.perf_counter() - start) / repeats
+        print(f"{batch_size:>7,} {observe_seconds * 1e3:>11.3f} {predict_seconds * 1e3:>11.3f} "
+              f"{observe_seconds / predict_seconds:>8.1%}")
+
+    rng = np.random.default_rng(0)
+    print(f"\n{'traffic':<24} {'status':<9} {'max PSI':>8}  feature (KS)")
+    for name in ('unchanged', 'IQ +10', 'study time x1.5', 'more Advanced students'):
+        monitor = DriftMonitor(reference)
+        monitor.observe(shifted(X, name, rng))
+        report = monitor.report()
+        feature = report['max_psi_feature']
+        ks = report['features'][feature].get('ks')
+        print(f"{name:<24} {report['status']:<9} {report['max_psi']:>8.3f}  {feature}"
+              + ('' if ks is None else f" ({ks:.3f})"))
@@ -0,0 +1,64 @@
+# ___________________________________________ Benchmark: dense pairwise interactions vs sparse crosses ___________________________________
+
+import argparse
+import time
+import tracemalloc
+import scipy.sparse as sp
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from benchmarks.common import assessment_frame, split_features
+from model_pipelines import build_assessment_pipeline, build_crossed_assessment_pipeline
+
+
+def matrix_bytes(matrix):
+    """Memory held by a dense array or a CSR matrix (data + indices + indptr)."""
+    if sp.issparse(matrix):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return matrix.nbytes
+
+
+def measure(pipeline, X_train, X_test, y_train, y_test):
+    """Fit time, model matrix size, peak traced memory while building it, and test R^2."""
+    start = time.perf_counter()
+    pipeline.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    features = pipeline[:-1]
+    tracemalloc.start()
+    matrix = features.transform(X_train)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'fit_seconds': fit_seconds,
+        'shape': matrix.shape,
+        'matrix_mb': matrix_bytes(matrix) / 2**20,
+        'peak_mb': peak / 2**20,
+        'r2': r2_score(y_test, pipeline.predict(X_test)),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memory and fit time of the dense and the crossed assessment pipelines.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 50_000])
+    parser.add_argument('--n-estimators', type=int, default=400)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        X, y = assessment_frame(rows)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        numerical_features, categorical_features = split_features(X)
+        results = {
+            'pairwise (dense)': measure(build_assessment_pipeline(
+                numerical_features, categorical_features, n_estimators=args.n_estimators),
+                X_train, X_test, y_train, y_test),
+            'crossed (CSR)': measure(build_crossed_assessment_pipeline(
+                numerical_features, categorical_features, n_estimators=args.n_estimators),
+                X_train, X_test, y_train, y_test),
+        }
+        print(f"{rows:,} rows")
+        for name, result in results.items():
+            print(f"  {name:<17} {result['shape'][1]:>5} features  matrix {result['matrix_mb']:8.1f} MB  "
+                  f"peak {result['peak_mb']:8.1f} MB  fit {result['fit_seconds']:7.1f} s  R2 {result['r2']:.4f}")
+        dense, crossed = results.values()
+        print(f"  reduction: matrix {dense['matrix_mb'] / crossed['matrix_mb']:.0f}x, "
+              f"peak {dense['peak_mb'] / crossed['peak_mb']:.0f}x, fit {dense['fit_seconds'] / crossed['fit_seconds']:.1f}x")
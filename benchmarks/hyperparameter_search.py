@@ -0,0 +1,67 @@
+# ___________________________________________ Benchmark: exhaustive grid vs successive halving ___________________________________________
+
+import argparse
+import time
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+from sklearn.preprocessing import LabelEncoder
+from benchmarks.common import material_frame, split_features
+from hyperparameter_search import CachedGridSearch, SuccessiveHalvingSearch
+from model_pipelines import build_material_preprocessor, material_model_params, material_param_grid
+
+
+def material_splits(rows, seed=0):
+    """Train/validation/test splits made the same way as material_level_prediction.py."""
+    X, y = material_frame(rows, seed)
+    X_processed = build_material_preprocessor(*split_features(X)).fit_transform(X)
+    y_encoded = LabelEncoder().fit_transform(y)
+    X_train_val, X_test, y_train_val, y_test = train_test_split(
+        X_processed, y_encoded, test_size=0.20, random_state=42, stratify=y_encoded)
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train_val, y_train_val, test_size=0.25, random_state=42, stratify=y_train_val)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def holdout_accuracy(params, splits, num_classes):
+    """Validation and test accuracy of a model refit on the training split with `params`."""
+    X_train, X_val, X_test, y_train, y_val, y_test = splits
+    model = xgb.XGBClassifier(num_class=num_classes, **material_model_params, **params).fit(X_train, y_train)
+    return accuracy_score(y_val, model.predict(X_val)), accuracy_score(y_test, model.predict(X_test))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time-to-best-accuracy of GridSearchCV vs the cached grid and successive halving.")
+    parser.add_argument('--rows', type=int, default=5_000)
+    parser.add_argument('--skip-grid', action='store_true', help="Skip the (slow) GridSearchCV baseline.")
+    args = parser.parse_args()
+
+    splits = material_splits(args.rows)
+    X_train, X_val, _, y_train, y_val, _ = splits
+    num_classes = len(np.unique(y_train))
+    results = []
+
+    if not args.skip_grid:
+        start = time.perf_counter()
+        grid = GridSearchCV(xgb.XGBClassifier(num_class=num_classes, **material_model_params), material_param_grid,
+                            scoring='accuracy', cv=3, n_jobs=-1).fit(X_train, y_train)
+        elapsed = time.perf_counter() - start
+        # the grid only knows its best configuration once every fit has finished
+        results.append(('grid (3-fold)', elapsed, elapsed, grid.best_params_))
+
+    cached = CachedGridSearch(material_param_grid, num_classes, cv=3).fit(X_train, y_train)
+    results.append(('cached grid (3-fold)', cached.elapsed_, cached.elapsed_, cached.best_params_))
+
+    search = SuccessiveHalvingSearch(material_param_grid, num_classes, verbose=False).fit(X_train, y_train, X_val, y_val)
+    results.append(('successive halving', search.elapsed_, search.time_to_best_, search.best_params_))
+
+    print(f"{args.rows:,} rows, {len(X_train):,} training rows")
+    print(f"{'search':<22} {'total s':>9} {'to best s':>10} {'val acc':>8} {'test acc':>9}")
+    for name, elapsed, to_best, params in results:
+        val_accuracy, test_accuracy = holdout_accuracy(params, splits, num_classes)
+        print(f"{name:<22} {elapsed:>9.1f} {to_best:>10.1f} {val_accuracy:>8.4f} {test_accuracy:>9.4f}")
+    if not args.skip_grid:
+        print(f"Cached grid speedup: {results[0][1] / cached.elapsed_:.1f}x, same best parameters: "
+              f"{grid.best_params_ == cached.best_params_}")
+    print(f"Boosting rounds: halving {search.rounds_trained_:,}, grid {search.grid_rounds(material_param_grid):,}")
@@ -0,0 +1,71 @@
+# ___________________________________________ Benchmark: daily incremental updates vs full retraining ___________________________________
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+from benchmarks.common import assessment_frame, material_frame, split_features
+from incremental_training import continue_training, evaluate
+from inference import AssessmentScorePredictor, MaterialLevelPredictor
+from model_artifacts import assessment_spec, material_spec
+from model_pipelines import (build_assessment_pipeline, build_native_assessment_pipeline, build_material_preprocessor,
+                             material_model_params)
+
+
+def train_full(model, X, y, n_estimators, categorical):
+    """Trains from scratch on all rows; returns a predictor with its spec (training parameters included)."""
+    if model == 'assessment':
+        build = build_native_assessment_pipeline if categorical == 'native' else build_assessment_pipeline
+        pipeline = build(*split_features(X), n_estimators=n_estimators).fit(X, y)
+        return AssessmentScorePredictor(pipeline.named_steps['model'].get_booster(), assessment_spec(pipeline, X.columns))
+    preprocessor = build_material_preprocessor(*split_features(X))
+    label_encoder = LabelEncoder().fit(y)
+    classifier = xgb.XGBClassifier(num_class=len(label_encoder.classes_), n_estimators=n_estimators, max_depth=4,
+                                   learning_rate=0.1, **material_model_params)
+    classifier.fit(preprocessor.fit_transform(X), label_encoder.transform(y))
+    return MaterialLevelPredictor(classifier.get_booster(), material_spec(preprocessor, label_encoder, X.columns, classifier))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Accuracy and time of daily incremental updates vs full retrains.")
+    parser.add_argument('--model', choices=['assessment', 'material'], default='assessment')
+    parser.add_argument('--categorical', choices=['onehot', 'native'], default='native',
+                        help="Assessment pipeline (native: no interaction features, so scaling statistics can be updated).")
+    parser.add_argument('--history-rows', type=int, default=20_000)
+    parser.add_argument('--batch-rows', type=int, default=2_000, help="New rows per simulated day.")
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=50, help="Trees added per day.")
+    parser.add_argument('--n-estimators', type=int, default=200, help="Trees of the initial and full models.")
+    parser.add_argument('--freeze-statistics', action='store_true', help="Keep the day-0 scaling statistics.")
+    args = parser.parse_args()
+
+    frame = assessment_frame if args.model == 'assessment' else material_frame
+    metric = 'r2' if args.model == 'assessment' else 'accuracy'
+    X_test, y_test = frame(10_000, seed=1_000)
+    X_all, y_all = frame(args.history_rows, seed=0)
+
+    start = time.perf_counter()
+    incremental = train_full(args.model, X_all, y_all, args.n_estimators, args.categorical)
+    print(f"day 0: {args.history_rows:,} rows, full training {time.perf_counter() - start:.1f}s, "
+          f"{metric} {evaluate(incremental, X_test, y_test)[metric]:.4f}")
+    # Continuing with no new trees must leave every prediction bit-identical (remapped thresholds included)
+    X_new, y_new = frame(args.batch_rows, seed=1)
+    unchanged, info = continue_training(incremental, X_new, y_new, rounds=0, update_statistics=not args.freeze_statistics)
+    before = incremental.predict_raw(X_test, predict_type='margin')
+    assert np.array_equal(unchanged.predict_raw(X_test, predict_type='margin'), before), "rounds=0 changed predictions"
+    print(f"rounds=0 parity: {len(before):,} margins bit-identical (scaling statistics {info['statistics']})")
+    print(f"{'day':>3} {'rows':>9} {'update s':>9} {'retrain s':>10} {'incremental':>12} {'full':>8} {'drift':>8}")
+    for day in range(1, args.days + 1):
+        X_new, y_new = frame(args.batch_rows, seed=day)
+        incremental, info = continue_training(incremental, X_new, y_new, rounds=args.rounds,
+                                              update_statistics=not args.freeze_statistics)
+        X_all, y_all = pd.concat([X_all, X_new], ignore_index=True), pd.concat([y_all, y_new], ignore_index=True)
+        start = time.perf_counter()
+        full = train_full(args.model, X_all, y_all, args.n_estimators, args.categorical)
+        retrain_seconds = time.perf_counter() - start
+        score, full_score = evaluate(incremental, X_test, y_test)[metric], evaluate(full, X_test, y_test)[metric]
+        print(f"{day:>3} {len(X_all):>9,} {info['seconds']:>9.2f} {retrain_seconds:>10.2f} {score:>12.4f} "
+              f"{full_score:>8.4f} {score - full_score:>+8.4f}")
+    print(f"scaling statistics {info['statistics']}; the incremental model has {info['total_rounds']} boosting rounds")
@@ -0,0 +1,61 @@
+# ___________________________________________ Benchmark: material level labeling __________________________________________________________
+
+import argparse
+import time
+import numpy as np
+from material_level_generation import (
+    generate_material_dataset, determine_material_level, label_material_level, levels_list
+)
+
+
+def vectorized_labels(df):
+    present = df['Present Material Level'].cat.codes.to_numpy() + 1
+    levels = label_material_level(
+        present, df['Relative Performance'].to_numpy(), df['IQ'].to_numpy(),
+        df['Consistency_Num'].to_numpy(), df['Time per Day (hrs)'].to_numpy(), df['Course Name'].values
+    )
+    return np.asarray(levels_list)[levels - 1]
+
+
+def check_parity(rows, seed):
+    """Asserts that the columnar rules match df.apply(determine_material_level) row for row."""
+    df = generate_material_dataset(rows, rng=np.random.default_rng(seed))
+    as_strings = df.astype({'Present Material Level': str, 'Course Name': str})
+    expected = as_strings.apply(determine_material_level, axis=1).to_numpy()
+    actual = vectorized_labels(df)
+    mismatches = int((expected != actual).sum())
+    assert mismatches == 0, f"{mismatches} of {rows} labels differ from the row-wise rules"
+
+    # Same seed, same dataset
+    again = generate_material_dataset(rows, rng=np.random.default_rng(seed))
+    first = generate_material_dataset(rows, rng=np.random.default_rng(seed))
+    assert first.equals(again), "generate_material_dataset is not deterministic for a fixed seed"
+    print(f"parity      {rows:>12,} rows  OK (labels identical, output deterministic)")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare row-wise labeling with the columnar rule engine.")
+    parser.add_argument('--apply-rows', type=int, default=100_000)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--parity-rows', type=int, default=200_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    check_parity(args.parity_rows, args.seed)
+
+    df = generate_material_dataset(args.apply_rows, rng=np.random.default_rng(args.seed))
+    apply_rate = args.apply_rows / timed(lambda: df.apply(determine_material_level, axis=1))
+    print(f"df.apply    {args.apply_rows:>12,} rows  {apply_rate:>14,.0f} rows/sec")
+
+    for rows in args.rows:
+        df = generate_material_dataset(rows, rng=np.random.default_rng(args.seed))
+        label_rate = rows / timed(lambda: vectorized_labels(df))
+        total_rate = rows / timed(lambda: generate_material_dataset(rows, rng=np.random.default_rng(args.seed)))
+        print(f"columnar    {rows:>12,} rows  {label_rate:>14,.0f} rows/sec labeling ({label_rate / apply_rate:.0f}x)"
+              f"  {total_rate:>12,.0f} rows/sec end-to-end")
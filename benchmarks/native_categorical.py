@@ -0,0 +1,67 @@
+# ___________________________________________ Benchmark: one-hot vs native categorical XGBoost ___________________________________________
+
+import argparse
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(model, categorical, rows, seed=0):
+    """Trains one model in a fresh process; returns fit time, RSS before/after and the test score."""
+    import xgboost as xgb
+    from sklearn.metrics import accuracy_score, r2_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+    from benchmarks.common import assessment_frame, material_frame, split_features
+    from categorical_encoding import native_categorical_params
+    from model_pipelines import (build_assessment_pipeline, build_native_assessment_pipeline,
+                                 build_material_preprocessor, material_model_params)
+
+    if model == 'assessment':
+        X, y = assessment_frame(rows, seed)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        build = build_native_assessment_pipeline if categorical == 'native' else build_assessment_pipeline
+        pipeline = build(*split_features(X))
+        baseline = _rss_mb()
+        start = time.perf_counter()
+        pipeline.fit(X_train, y_train)
+        fit_seconds = time.perf_counter() - start
+        score = r2_score(y_test, pipeline.predict(X_test))
+    else:
+        X, y = material_frame(rows, seed)
+        y = LabelEncoder().fit_transform(y)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        params = {**material_model_params, 'n_estimators': 200, 'max_depth': 4, 'learning_rate': 0.1}
+        if categorical == 'native':
+            params.update(native_categorical_params)
+        preprocessor = build_material_preprocessor(*split_features(X), categorical=categorical)
+        baseline = _rss_mb()
+        start = time.perf_counter()
+        classifier = xgb.XGBClassifier(num_class=3, **params).fit(preprocessor.fit_transform(X_train), y_train)
+        fit_seconds = time.perf_counter() - start
+        score = accuracy_score(y_test, classifier.predict(preprocessor.transform(X_test)))
+    return {'fit_seconds': fit_seconds, 'baseline_mb': baseline, 'peak_mb': _rss_mb(), 'score': score}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Training time, peak RSS and accuracy/R^2 of one-hot vs native categoricals.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[20_000, 100_000])
+    parser.add_argument('--models', nargs='+', choices=['assessment', 'material'], default=['assessment', 'material'])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    for model in args.models:
+        metric = 'R2' if model == 'assessment' else 'accuracy'
+        for rows in args.rows:
+            print(f"{model}, {rows:,} rows")
+            for categorical in ('onehot', 'native'):
+                # a fresh process per run, so ru_maxrss is this run's peak
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(run, model, categorical, rows).result()
+                print(f"  {categorical:<7} fit {result['fit_seconds']:7.2f} s  peak RSS {result['peak_mb']:7.0f} MB "
+                      f"(+{result['peak_mb'] - result['baseline_mb']:.0f} MB during fit)  {metric} {result['score']:.4f}")
@@ -0,0 +1,67 @@
+# ___________________________________________ Benchmark: prediction cache on repeated scoring traffic ____________________________________
+
+import argparse
+import shutil
+import tempfile
+import time
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+from benchmarks.common import assessment_frame, material_frame, train_assessment, train_material
+from inference import load_predictor
+from model_artifacts import save_assessment_pipeline, save_material_model
+from prediction_cache import CachedPredictor
+
+
+def traffic(roster, students, requests, batch_size, seed=0):
+    """`requests` batches drawn with replacement from the first `students` rows: students are re-scored often."""
+    rng = np.random.default_rng(seed)
+    pool = roster.head(students)
+    return [pool.iloc[rng.integers(0, students, batch_size)] for _ in range(requests)]
+
+
+def replay(predictor, batches):
+    start = time.perf_counter()
+    results = [predictor.predict(batch) for batch in batches]
+    return results, sum(len(batch) for batch in batches) / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput and hit rate of CachedPredictor on repeated requests.")
+    parser.add_argument('--train-rows', type=int, default=5_000)
+    parser.add_argument('--students', type=int, default=2_000, help="Distinct students in the request stream.")
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--batch-size', type=int, default=8)
+    args = parser.parse_args()
+
+    model_root = tempfile.mkdtemp(prefix='cache-models-')
+    try:
+        pipeline, _, X, _ = train_assessment(args.train_rows)
+        save_assessment_pipeline(pipeline, X.columns, f"{model_root}/assessment_score")
+        preprocessor, model, material, X, y = train_material(args.train_rows)
+        save_material_model(preprocessor, model, LabelEncoder().fit(y), X.columns, f"{model_root}/material_level")
+
+        rosters = {'assessment_score': assessment_frame(args.students, seed=1)[0],
+                   'material_level': material_frame(args.students, seed=1)[0]}
+        for kind, roster in rosters.items():
+            predictor = load_predictor(f"{model_root}/{kind}")
+            cached = CachedPredictor(predictor)
+            batches = traffic(roster, args.students, args.requests, args.batch_size)
+            expected, plain_rate = replay(predictor, batches)
+            results, cached_rate = replay(cached, batches)
+            assert all(np.array_equal(a, b) for a, b in zip(expected, results)), "cached predictions differ"
+            stats = cached.cache.stats()
+            print(f"{kind:<17} uncached {plain_rate:>9,.0f} rows/sec  cached {cached_rate:>9,.0f} rows/sec  "
+                  f"hit rate {stats['hit_rate']:.1%}  entries {stats['size']:,}")
+
+        # Saving a new model into the directory invalidates the cache on the next reload check
+        cached = CachedPredictor(load_predictor(f"{model_root}/assessment_score"), reload_interval=0)
+        cached.predict(rosters['assessment_score'].head(100))
+        pipeline, _, X, _ = train_assessment(args.train_rows, seed=1)
+        time.sleep(0.01)
+        save_assessment_pipeline(pipeline, X.columns, f"{model_root}/assessment_score")
+        cached.predict(rosters['assessment_score'].head(100))
+        stats = cached.cache.stats()
+        print(f"after saving a new model: version {cached.model_version}, invalidations {stats['invalidations']}, "
+              f"hits {stats['hits']} (expected 0)")
+    finally:
+        shutil.rmtree(model_root, ignore_errors=True)
@@ -0,0 +1,87 @@
+# ___________________________________________ Benchmark: localhost load test of the scoring server _______________________________________
+
+import argparse
+import json
+import shutil
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+from benchmarks.common import assessment_frame, material_frame, train_assessment, train_material
+from model_artifacts import save_assessment_pipeline, save_material_model
+from scoring_server import serve
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, json.dumps(payload).encode(), {'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def client(url, records, latencies):
+    """One client sending its records one request at a time."""
+    for record in records:
+        start = time.perf_counter()
+        post(url, record)
+        latencies.append(time.perf_counter() - start)
+
+
+def load_test(base_url, kind, records, clients):
+    latencies = []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        for future in [executor.submit(client, f"{base_url}/predict/{kind}", records[i::clients], latencies)
+                       for i in range(clients)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"{kind:<17} {clients:>3} clients  {len(records) / elapsed:>8,.0f} req/sec  "
+          f"client p50 {p50:6.2f} ms  p99 {p99:6.2f} ms")
+
+
+def sample_records(X, n):
+    return json.loads(X.head(n).to_json(orient='records'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Start the scoring server on localhost and load-test it.")
+    parser.add_argument('--assessment-model', default=None, metavar='DIR', help="Saved model (trains a small one if omitted).")
+    parser.add_argument('--material-model', default=None, metavar='DIR', help="Saved model (trains a small one if omitted).")
+    parser.add_argument('--train-rows', type=int, default=2_000)
+    parser.add_argument('--requests', type=int, default=2_000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--batch-window-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    model_root = tempfile.mkdtemp(prefix='scoring-models-')
+    if args.assessment_model is None:
+        pipeline, _, X, _ = train_assessment(args.train_rows, n_estimators=100)
+        args.assessment_model = f"{model_root}/assessment_score"
+        save_assessment_pipeline(pipeline, X.columns, args.assessment_model)
+    if args.material_model is None:
+        preprocessor, model, _, X, y = train_material(args.train_rows)
+        args.material_model = f"{model_root}/material_level"
+        save_material_model(preprocessor, model, LabelEncoder().fit(y), X.columns, args.material_model)
+
+    server, service = serve([args.assessment_model, args.material_model], port=0, window=args.batch_window_ms / 1e3)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    records = {
+        'assessment_score': sample_records(assessment_frame(args.requests, seed=1)[0], args.requests),
+        'material_level': sample_records(material_frame(args.requests, seed=1)[0], args.requests),
+    }
+    for kind, kind_records in records.items():
+        post(f"{base_url}/predict/{kind}", kind_records[0])
+        for clients in args.clients:
+            load_test(base_url, kind, kind_records, clients)
+
+    with urllib.request.urlopen(f"{base_url}/metrics") as response:
+        print(json.dumps(json.loads(response.read()), indent=2))
+    server.shutdown()
+    server.server_close()
+    service.close()
+    shutil.rmtree(model_root)
@@ -0,0 +1,54 @@
+# ___________________________________________ Benchmark: default CSV dtypes vs the declared student schema _______________________________
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from assessment_score_generation import generate_students, add_numeric_columns
+from material_level_generation import generate_material_dataset
+from dataset_io import read_dataset
+from student_schema import (assessment_schema, assessment_unused_columns, material_schema, material_unused_columns,
+                            read_options, bytes_per_row)
+
+
+def timed_load(load, repeats):
+    """Best-of-`repeats` seconds of load() and the last DataFrame it returned."""
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        df = load()
+        best = min(best, time.perf_counter() - start)
+    return best, df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memory per row and CSV load time with and without the student schema.")
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    datasets = [
+        ('Assessment_Score', add_numeric_columns(generate_students(args.rows, args.rows // 50, rng=np.random.default_rng(0))),
+         assessment_schema, assessment_unused_columns),
+        ('Material_Level', generate_material_dataset(args.rows, rng=np.random.default_rng(0)),
+         material_schema, material_unused_columns),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'dataset':<18} {'load':<22} {'seconds':>8} {'bytes/row':>10} {'columns':>8}")
+        for name, df, schema, unused in datasets:
+            path = os.path.join(directory, f'{name}.csv')
+            df.to_csv(path, index=False)
+            loads = [
+                ('pd.read_csv defaults', lambda: pd.read_csv(path)),
+                ('schema', lambda: read_dataset(path, **read_options(schema))),
+                ('schema, skip unused', lambda: read_dataset(path, **read_options(schema, unused))),
+            ]
+            baseline = None
+            for label, load in loads:
+                seconds, loaded = timed_load(load, args.repeats)
+                size = bytes_per_row(loaded)
+                baseline = baseline or (seconds, size)
+                print(f"{name:<18} {label:<22} {seconds:>8.3f} {size:>10.1f} {loaded.shape[1]:>8}")
+            print(f"{'':<18} {'reduction':<22} {baseline[0] / seconds:>7.1f}x {baseline[1] / size:>9.1f}x")
@@ -0,0 +1,293 @@
+# ___________________________________________ Benchmark suite: generation, training and inference at several scales ______________________
+#
+# Runs both generators, both training pipelines (the material one with a bounded successive-halving search) and
+# both saved-model prediction paths at each scale, appends one JSON line per run to a history file and compares
+# the results with a stored baseline. Seeds are fixed, so two runs on the same machine do the same work.
+#
+#   python -m benchmarks.suite --scales 1000 100000 1000000
+#   python -m benchmarks.suite --save-baseline          # store this run as the baseline
+#   python -m benchmarks.suite                          # exits with status 1 on a regression
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import sklearn
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from assessment_score_generation import generate_students
+from material_level_generation import generate_material_dataset
+from benchmarks.common import assessment_drop_columns, material_drop_columns, split_features
+from hyperparameter_search import SuccessiveHalvingSearch
+from incremental_training import evaluate
+from inference import AssessmentScorePredictor, MaterialLevelPredictor
+from instrumentation import StageRecorder
+from model_artifacts import assessment_spec, material_spec
+from model_pipelines import build_assessment_pipeline, build_material_preprocessor, material_model_params
+
+cases = ['generate_assessment', 'generate_material', 'train_assessment', 'train_material',
+         'predict_assessment', 'predict_material']
+
+# A slice of material_param_grid: 8 configurations, so even the 1M-row search finishes its first rung
+suite_param_grid = {
+    'n_estimators': [300],
+    'learning_rate': [0.05, 0.1],
+    'max_depth': [3, 5],
+    'subsample': [0.8],
+    'colsample_bytree': [0.7, 0.9],
+    'gamma': [0],
+}
+
+# metric -> direction; throughput and quality must not drop, latency and memory must not grow
+compared_metrics = {
+    'rows_per_second': 'higher',
+    'p50_ms': 'lower',
+    'p99_ms': 'lower',
+    'peak_rss_mb': 'lower',
+    'r2': 'higher',
+    'accuracy': 'higher',
+}
+quality_metrics = {'r2', 'accuracy'}
+
+min_generated_rows = 100_000
+
+
+def environment():
+    """What a result depends on besides the code: versions, cores and the commit."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scikit-learn': sklearn.__version__,
+        'xgboost': xgb.__version__,
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def single_row_latencies(predictor, X, requests, seed=0):
+    """Milliseconds per predict() call of one student, over `requests` students drawn from X."""
+    rows = np.random.default_rng(seed).integers(0, len(X), size=min(requests, len(X)))
+    latencies = []
+    for i in rows:
+        row = X.iloc[[i]]
+        start = time.perf_counter()
+        predictor.predict(row)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1e3
+
+
+class Suite:
+    """Runs the cases at one scale; every case's timing and peak RSS come from a StageRecorder stage."""
+
+    def __init__(self, rows, seed=0, requests=500, search_seconds=60, assessment_params=None):
+        self.rows = rows
+        self.seed = seed
+        self.requests = requests
+        self.search_seconds = search_seconds
+        self.assessment_params = assessment_params or {}
+        self.stages = StageRecorder('benchmark_suite')
+        self.data = {}
+
+    def run(self, case):
+        # data and models a case needs are built outside its stage
+        model = case.split('_', 1)[1]
+        if case.startswith('train_') and model not in self.data:
+            getattr(self, f'generate_{model}')()
+        if case.startswith('predict_') and f'{model}_model' not in self.data:
+            self.run(f'train_{model}')
+        gc.collect()
+        self.stages.start(case)
+        metrics = getattr(self, case)()
+        self.stages.stop()
+        record = self.stages.records[-1]
+        metrics.update(seconds=record['wall_seconds'], cpu_seconds=record['cpu_seconds'],
+                       peak_rss_mb=record['peak_rss_mb'])
+        metrics.setdefault('rows_per_second', metrics['rows'] / record['wall_seconds'])
+        return {'case': case, 'scale': self.rows, **metrics}
+
+    def _generate(self, generate):
+        # small scales are repeated up to min_generated_rows, or their throughput is mostly timer noise
+        repeats = max(1, min_generated_rows // self.rows)
+        for _ in range(repeats):
+            df = generate(np.random.default_rng(self.seed))
+        return df, {'rows': len(df) * repeats, 'repeats': repeats}
+
+    def generate_assessment(self):
+        self.data['assessment'], metrics = self._generate(lambda rng: generate_students(self.rows, self.rows // 50, rng=rng))
+        return metrics
+
+    def generate_material(self):
+        self.data['material'], metrics = self._generate(lambda rng: generate_material_dataset(self.rows, rng=rng))
+        return metrics
+
+    def train_assessment(self):
+        df = self.data['assessment']
+        X, y = df.drop(columns=assessment_drop_columns), df['Assessment Score']
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        pipeline = build_assessment_pipeline(*split_features(X_train), **self.assessment_params).fit(X_train, y_train)
+        predictor = AssessmentScorePredictor(pipeline.named_steps['model'].get_booster(),
+                                             assessment_spec(pipeline, X_train.columns))
+        self.data['assessment_model'] = (predictor, X_test, y_test)
+        return {'rows': len(X_train), 'r2': evaluate(predictor, X_test, y_test)['r2']}
+
+    def train_material(self):
+        df = self.data['material']
+        X, y = df.drop(columns=material_drop_columns), df['Material Level']
+        # the same stratified 60/20/20 split as material_level_prediction.py, on raw rows so the test rows can be
+        # replayed through the saved-model predictor
+        X_train_val, X_test, y_train_val, y_test = train_test_split(X, y, test_size=0.20, random_state=42, stratify=y)
+        X_train, X_val, y_train, y_val = train_test_split(X_train_val, y_train_val, test_size=0.25, random_state=42,
+                                                          stratify=y_train_val)
+        preprocessor = build_material_preprocessor(*split_features(X_train))
+        label_encoder = LabelEncoder().fit(y_train)
+        search = SuccessiveHalvingSearch(suite_param_grid, len(label_encoder.classes_), max_seconds=self.search_seconds,
+                                         verbose=False)
+        X_train_processed, y_train_encoded = preprocessor.fit_transform(X_train), label_encoder.transform(y_train)
+        search.fit(X_train_processed, y_train_encoded, preprocessor.transform(X_val), label_encoder.transform(y_val))
+        # refit with the best parameters, as the script does
+        model = xgb.XGBClassifier(num_class=len(label_encoder.classes_), **material_model_params, **search.best_params_)
+        model.fit(X_train_processed, y_train_encoded)
+        predictor = MaterialLevelPredictor(model.get_booster(),
+                                           material_spec(preprocessor, label_encoder, X.columns, model))
+        self.data['material_model'] = (predictor, X_test, y_test)
+        return {'rows': len(X_train), 'search_seconds': search.elapsed_, 'search_trials': search.n_trials_,
+                'accuracy': evaluate(predictor, X_test, y_test)['accuracy']}
+
+    def _predict(self, model):
+        predictor, X_test, _ = self.data[f'{model}_model']
+        predictor.predict(X_test.iloc[:10])  # warm-up
+        latencies = single_row_latencies(predictor, X_test, self.requests, self.seed)
+        start = time.perf_counter()
+        predictor.predict(X_test)
+        batch_seconds = time.perf_counter() - start
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {'rows': len(X_test), 'rows_per_second': len(X_test) / batch_seconds,
+                'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99)}
+
+    def predict_assessment(self):
+        return self._predict('assessment')
+
+    def predict_material(self):
+        return self._predict('material')
+
+
+def _key(result):
+    return f"{result['case']}@{result['scale']}"
+
+
+def compare(results, baseline, tolerance=0.2, quality_tolerance=0.01):
+    """
+    Regressions of results against a baseline run, as a list of messages.
+
+    Throughput, latency and memory regress when they are worse by more than
+    `tolerance` (relative); r2/accuracy when they drop by more than
+    `quality_tolerance` (absolute). Cases missing from the baseline are skipped.
+    """
+    reference = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = reference.get(_key(result))
+        if base is None:
+            continue
+        for metric, direction in compared_metrics.items():
+            if result.get(metric) is None or base.get(metric) is None:
+                continue
+            now, then = result[metric], base[metric]
+            if metric in quality_metrics:
+                worse = then - now > quality_tolerance
+            elif direction == 'higher':
+                worse = now < then * (1 - tolerance)
+            else:
+                worse = now > then * (1 + tolerance)
+            if worse:
+                regressions.append(f"{_key(result)} {metric}: {now:.4g} vs baseline {then:.4g}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':<20} {'scale':>9} {'seconds':>9} {'rows/sec':>12} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'peak RSS MB':>12} {'quality':>8}")
+    for result in results:
+        p50 = '' if 'p50_ms' not in result else f"{result['p50_ms']:.2f}"
+        p99 = '' if 'p99_ms' not in result else f"{result['p99_ms']:.2f}"
+        quality = result.get('r2', result.get('accuracy'))
+        quality = '' if quality is None else f"{quality:.4f}"
+        peak = '' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.1f}"
+        print(f"{result['case']:<20} {result['scale']:>9,} {result['seconds']:>9.2f} {result['rows_per_second']:>12,.0f} "
+              f"{p50:>8} {p99:>8} {peak:>12} {quality:>8}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark generation, training and inference at several scales.")
+    parser.add_argument('--scales', type=int, nargs='+', default=[1_000, 100_000, 1_000_000], help="Rows per scale.")
+    parser.add_argument('--cases', nargs='+', choices=cases, default=cases)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--requests', type=int, default=500, help="Single-student predictions timed per model.")
+    parser.add_argument('--search-seconds', type=float, default=60,
+                        help="Budget of the material search (checked at rung boundaries).")
+    parser.add_argument('--assessment-estimators', type=int, default=None,
+                        help="Override the assessment model's n_estimators (default: the script's 400).")
+    parser.add_argument('--history', default='benchmarks/history.jsonl', help="JSON lines file every run is appended to.")
+    parser.add_argument('--baseline', default='benchmarks/baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Relative slowdown/memory growth counted as a regression.")
+    parser.add_argument('--quality-tolerance', type=float, default=0.01, help="Absolute r2/accuracy drop counted as a regression.")
+    args = parser.parse_args()
+
+    assessment_params = {} if args.assessment_estimators is None else {'n_estimators': args.assessment_estimators}
+    results = []
+    for rows in args.scales:
+        suite = Suite(rows, args.seed, args.requests, args.search_seconds, assessment_params)
+        for case in args.cases:
+            result = suite.run(case)
+            results.append(result)
+            print(f"{case} at {rows:,} rows: {result['seconds']:.2f}s", flush=True)
+        del suite
+
+    run = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'settings': {name: value for name, value in vars(args).items()
+                     if name not in ('history', 'baseline', 'save_baseline')},
+        'results': results,
+    }
+    print()
+    print_results(results)
+    with open(args.history, 'a') as f:
+        f.write(json.dumps(run) + '\n')
+    print(f"\nAppended this run to {args.history}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved this run as the baseline {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['environment'] != run['environment'] | {'commit': baseline['environment']['commit']}:
+            print("Note: the baseline was recorded with different versions or hardware.")
+        regressions = compare(results, baseline, args.tolerance, args.quality_tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) against {args.baseline} "
+                  f"(commit {baseline['environment']['commit']}):")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (commit {baseline['environment']['commit']}).")
+    else:
+        print(f"No baseline at {args.baseline}; store one with --save-baseline.")
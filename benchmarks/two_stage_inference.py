@@ -0,0 +1,60 @@
+# ___________________________________________ Benchmark: fused two-stage predictor vs two separate model calls _________________________
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.common import assessment_frame, train_assessment, train_material
+from material_level_generation import relative_performance
+from student_schema import levels_map
+from two_stage_inference import TwoStagePredictor, default_aliases
+
+
+def separate(assessment, material, X):
+    """The two models called one after the other on DataFrames, as two scripts would."""
+    score = np.clip(np.rint(assessment.predict(X)), 0, 100)
+    stage_two = X.rename(columns={column: feature for feature, column in default_aliases.items()})
+    stage_two['Assessment Score'] = score
+    stage_two['Relative Performance'] = relative_performance(
+        score, X['Level of Student'].map(levels_map).to_numpy(np.float64),
+        X['Level of Course'].map(levels_map).to_numpy(np.float64))
+    return score, material.predict_batch(stage_two[material.feature_columns])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latency per stage of the fused two-stage predictor.")
+    parser.add_argument('--train-rows', type=int, default=20_000)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 10_000])
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--backend', choices=['xgboost', 'compiled'], default='xgboost')
+    args = parser.parse_args()
+
+    _, assessment, _, _ = train_assessment(args.train_rows, n_estimators=args.n_estimators)
+    _, _, material, _, _ = train_material(args.train_rows, n_estimators=args.n_estimators)
+    if args.backend == 'compiled':
+        from compiled_inference import compile_predictor
+
+        assessment, material = compile_predictor(assessment), compile_predictor(material)
+    fused = TwoStagePredictor(assessment, material)
+    X, _ = assessment_frame(max(args.batch_sizes), seed=1)
+
+    result = fused.predict(X)
+    score, (levels, probabilities) = separate(assessment, material, X)
+    print(f"parity on {len(X):,} rows: scores equal {np.array_equal(result['assessment_score'], score)}, "
+          f"labels equal {np.array_equal(result['material_level'], levels)}, "
+          f"max probability difference {np.abs(result['probabilities'] - probabilities).max():.2e}")
+
+    stages = fused.stages + ('total',)
+    print(f"{'rows':>7} {'separate ms':>12} " + " ".join(f"{stage:>{max(12, len(stage))}}" for stage in stages)
+          + "   (fused p50 ms)")
+    for batch_size in args.batch_sizes:
+        batch = X.iloc[:batch_size]
+        timings = pd.DataFrame([fused.predict(batch)['timings'] for _ in range(args.repeats)])
+        separate_seconds = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            separate(assessment, material, batch)
+            separate_seconds.append(time.perf_counter() - start)
+        print(f"{batch_size:>7,} {np.median(separate_seconds) * 1e3:>12.3f} "
+              + " ".join(f"{timings[stage].median() * 1e3:>{max(12, len(stage))}.3f}" for stage in stages))
@@ -0,0 +1,42 @@
+# ___________________________________________ Native categorical features for XGBoost ____________________________________________________
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, TransformerMixin
+
+# XGBoost settings for splitting directly on pandas 'category' columns
+native_categorical_params = dict(enable_categorical=True, tree_method='hist')
+
+
+class CategoryEncoder(BaseEstimator, TransformerMixin):
+    """
+    Turns string columns into pandas categoricals with the categories seen in fit().
+
+    The categories are sorted like OneHotEncoder's categories_, so codes are
+    stable between training and inference. Values not seen in fit() become
+    missing (NaN), which XGBoost sends down each split's default branch: the
+    native-categorical counterpart of OneHotEncoder(handle_unknown='ignore'),
+    where an unknown value matches none of the one-hot columns.
+    """
+
+    # Recorded in saved model specs, so inference passes category codes instead of one-hot columns
+    encoding = 'native'
+
+    def fit(self, X, y=None):
+        X = pd.DataFrame(X)
+        self.feature_names_in_ = np.array(X.columns, dtype=object)
+        self.categories_ = [np.unique(X[column].dropna().astype(str)) for column in X.columns]
+        return self
+
+    def transform(self, X):
+        X = pd.DataFrame(X)
+        columns = {}
+        for column, categories in zip(self.feature_names_in_, self.categories_):
+            values = X[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(str)
+            columns[column] = pd.Categorical(values, categories=categories)
+        return pd.DataFrame(columns, index=X.index)
+
+    def get_feature_names_out(self, input_features=None):
+        return self.feature_names_in_.copy()
@@ -0,0 +1,224 @@
+# ___________________________________________ Compiled tree-ensemble inference ____________________________________________________________
+#
+# Flattens a trained XGBoost booster into NumPy arrays (one entry per node of every tree) and evaluates all
+# trees for all rows with a fixed number of vectorized steps, plus a fused preprocessing transform that only
+# computes the input columns the trees actually split on. Drop-in replacements for the inference.py predictors.
+
+import json
+import numpy as np
+from inference import FeatureTransform, AssessmentScorePredictor, MaterialLevelPredictor, _softmax
+
+
+def _parse_floats(value):
+    """XGBoost stores base_score as '5E-1' or, per output, as '[1E-1,2E-1]'."""
+    return np.array([float(v) for v in value.strip('[]').split(',')], dtype=np.float64)
+
+
+class CompiledForest:
+    """
+    Array-of-nodes form of an XGBoost gbtree booster.
+
+    Node arrays of all trees are concatenated; children are global node
+    ids and leaves point at themselves, so every row can take max_depth
+    steps through every tree in lock-step (numeric splits go left when
+    x < threshold, missing values follow default_left; categorical splits
+    send the listed categories right). Leaf values are summed per output
+    group on top of the booster's base margin.
+    """
+
+    def __init__(self, booster):
+        model = json.loads(booster.save_raw('json'))['learner']
+        gbtree = model['gradient_booster']
+        if gbtree['name'] != 'gbtree':
+            raise ValueError(f"Only gbtree boosters can be compiled, not {gbtree['name']}")
+        trees = gbtree['model']['trees']
+        self.objective = model['objective']['name']
+        self.n_groups = max(1, int(model['learner_model_param']['num_class']))
+        self.base_margin = np.broadcast_to(_parse_floats(model['learner_model_param']['base_score']),
+                                           (self.n_groups,)).copy()
+        self.tree_group = np.array(gbtree['model']['tree_info'], dtype=np.int64)
+
+        sizes = [len(tree['left_children']) for tree in trees]
+        self.roots = np.cumsum([0] + sizes[:-1]).astype(np.int32)
+        left, right, feature, threshold, default_left, leaf_value = [], [], [], [], [], []
+        categorical_nodes, categorical_sets = [], []
+        for root, tree in zip(self.roots, trees):
+            tree_left = np.array(tree['left_children'], dtype=np.int64)
+            tree_right = np.array(tree['right_children'], dtype=np.int64)
+            is_leaf = tree_left == -1
+            ids = np.arange(len(tree_left)) + root
+            left.append(np.where(is_leaf, ids, tree_left + root))
+            right.append(np.where(is_leaf, ids, tree_right + root))
+            feature.append(np.where(is_leaf, 0, tree['split_indices']))
+            conditions = np.array(tree['split_conditions'], dtype=np.float32)
+            threshold.append(np.where(is_leaf, np.float32(np.inf), conditions))
+            default_left.append(np.array(tree['default_left'], dtype=bool))
+            leaf_value.append(np.where(is_leaf, conditions, 0).astype(np.float32))
+            for node, start, size in zip(tree.get('categories_nodes', []), tree.get('categories_segments', []),
+                                         tree.get('categories_sizes', [])):
+                categorical_nodes.append(root + node)
+                categorical_sets.append(tree['categories'][start:start + size])
+
+        left = np.concatenate(left)
+        right = np.concatenate(right)
+        self.n_nodes = len(left)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([left, right], axis=1).ravel().astype(np.int32)
+        self.feature = np.concatenate(feature).astype(np.int32)
+        self.threshold = np.concatenate(threshold)
+        self.default_left = np.concatenate(default_left)
+        self.leaf_value = np.concatenate(leaf_value)
+        self.group_matrix = (self.tree_group[:, None] == np.arange(self.n_groups)).astype(np.float32)
+        self.max_depth = self._max_depth(trees)
+
+        # Categorical splits: a row per categorical node, True where the category goes right
+        self.category_row = np.full(self.n_nodes, -1, dtype=np.int32)
+        self.category_right = None
+        if categorical_nodes:
+            self.category_row[categorical_nodes] = np.arange(len(categorical_nodes))
+            width = max(max(categories, default=0) for categories in categorical_sets) + 1
+            self.category_right = np.zeros((len(categorical_nodes), width), dtype=bool)
+            for row, categories in enumerate(categorical_sets):
+                self.category_right[row, categories] = True
+
+        # Input columns the trees split on, and the node features renumbered to that subset
+        is_split = left != np.arange(self.n_nodes)
+        self.features = np.unique(self.feature[is_split])
+        self.feature = np.searchsorted(self.features, self.feature).clip(0, max(len(self.features) - 1, 0)).astype(np.int32)
+
+    @staticmethod
+    def _max_depth(trees):
+        deepest = 0
+        for tree in trees:
+            depth = {0: 0}
+            for node, (lc, rc) in enumerate(zip(tree['left_children'], tree['right_children'])):
+                if lc != -1:
+                    depth[lc] = depth[rc] = depth[node] + 1
+            deepest = max(deepest, max(depth.values()))
+        return deepest
+
+    def leaves(self, X, block_rows=1024):
+        """Leaf node id per (row, tree) for X holding the columns listed in self.features (float32)."""
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty((len(X), len(self.roots)), dtype=np.int32)
+        # blocks of rows keep the (rows, trees) working arrays in cache
+        for start in range(0, len(X), block_rows):
+            block = np.ascontiguousarray(X[start:start + block_rows])
+            values_flat = block.ravel()
+            row_offsets = (np.arange(len(block), dtype=np.int32) * block.shape[1])[:, None]
+            nodes = np.broadcast_to(self.roots, (len(block), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                values = values_flat[row_offsets + self.feature[nodes]]
+                missing = np.isnan(values)
+                go_right = ~np.where(missing, self.default_left[nodes], values < self.threshold[nodes])
+                if self.category_right is not None:
+                    self._categorical_splits(nodes, values, missing, go_right)
+                nodes = self.children[2 * nodes + go_right]
+            out[start:start + len(block)] = nodes
+        return out
+
+    def _categorical_splits(self, nodes, values, missing, go_right):
+        """Overwrites go_right at categorical nodes: listed categories go right, all others (unknown included) left."""
+        category_rows = self.category_row[nodes]
+        is_categorical = (category_rows >= 0) & ~missing
+        if not is_categorical.any():
+            return
+        codes = values[is_categorical].astype(np.int64)
+        in_range = (codes >= 0) & (codes < self.category_right.shape[1])
+        listed = np.zeros(len(codes), dtype=bool)
+        listed[in_range] = self.category_right[category_rows[is_categorical][in_range], codes[in_range]]
+        go_right[is_categorical] = listed
+
+    def margin(self, X):
+        """Raw scores (n_rows, n_groups) for X holding the columns listed in self.features."""
+        return (self.leaf_value[self.leaves(X)] @ self.group_matrix + self.base_margin).astype(np.float32)
+
+
+class FusedTransform(FeatureTransform):
+    """
+    FeatureTransform restricted to the input columns a compiled forest uses.
+
+    Scaling/Yeo-Johnson, one-hot lookups and interaction products are only
+    computed for those columns, straight into one float32 matrix, with the
+    same arithmetic as FeatureTransform so split decisions are unchanged.
+    """
+
+    def __init__(self, spec, columns):
+        super().__init__(spec)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        pair_columns = self.columns[self.columns >= self.n_base_features] - self.n_base_features
+        needed = set(self.columns[self.columns < self.n_base_features].tolist())
+        if self.pairs is not None and len(pair_columns):
+            needed |= set(self.pairs[0][pair_columns].tolist()) | set(self.pairs[1][pair_columns].tolist())
+        self.base_columns = np.array(sorted(needed), dtype=np.int64)
+        # categorical feature index of every base column (-1 for numerical columns)
+        self.column_feature = np.searchsorted(self.offsets, np.arange(self.n_base_features), side='right') - 1
+        self.needed_cat_features = sorted({self.cat_features[k] for k in self.column_feature[self.base_columns] if k >= 0})
+
+    def transform(self, data, codes=None):
+        n_rows = self.n_rows(data)
+        codes = dict(codes or {})
+        missing = [feature for feature in self.needed_cat_features if feature not in codes]
+        if missing:
+            codes.update(self.encode_categories(data, missing))
+
+        base = {}
+        for column in self.base_columns:
+            k = self.column_feature[column]
+            if k < 0:
+                base[column] = self.numerical_column(data, column)
+            elif self.native_categorical:
+                feature_codes = codes[self.cat_features[k]]
+                base[column] = np.where(feature_codes >= 0, feature_codes, np.nan)
+            else:
+                base[column] = (codes[self.cat_features[k]] == column - self.offsets[k]).astype(np.float64)
+
+        out = np.empty((n_rows, len(self.columns)), dtype=np.float32)
+        for i, column in enumerate(self.columns):
+            if column < self.n_base_features:
+                out[:, i] = base[column]
+            else:
+                pair = column - self.n_base_features
+                out[:, i] = base[self.pairs[0][pair]] * base[self.pairs[1][pair]]
+        if self.sparse:
+            out[out == 0] = np.nan
+        return out
+
+
+class _CompiledModel:
+    """Replaces a SavedModel's XGBoost prediction with a CompiledForest and a FusedTransform."""
+
+    def _compile(self):
+        self.forest = CompiledForest(self.booster)
+        self.transform = FusedTransform(self.spec, self.forest.features)
+
+    def predict_raw(self, data, predict_type='value', codes=None):
+        margin = self.forest.margin(self.transform.transform(data, codes))
+        if predict_type == 'margin' or self.forest.objective.startswith('reg:squared'):
+            return margin[:, 0] if margin.shape[1] == 1 else margin
+        if self.forest.objective == 'multi:softmax':
+            return margin.argmax(axis=1).astype(np.float32)
+        if self.forest.objective == 'multi:softprob':
+            return _softmax(margin)
+        raise ValueError(f"Objective {self.forest.objective} is not supported by the compiled backend")
+
+
+class CompiledAssessmentScorePredictor(_CompiledModel, AssessmentScorePredictor):
+    def __init__(self, booster, spec, model_dir=None):
+        super().__init__(booster, spec, model_dir)
+        self._compile()
+
+
+class CompiledMaterialLevelPredictor(_CompiledModel, MaterialLevelPredictor):
+    def __init__(self, booster, spec, model_dir=None):
+        super().__init__(booster, spec, model_dir)
+        self._compile()
+
+
+compiled_predictor_classes = {'assessment_score': CompiledAssessmentScorePredictor,
+                              'material_level': CompiledMaterialLevelPredictor}
+
+
+def compile_predictor(predictor):
+    """Compiled counterpart of an inference.py predictor (same booster and spec)."""
+    return compiled_predictor_classes[predictor.spec['kind']](predictor.booster, predictor.spec, predictor.model_dir)
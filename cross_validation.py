@@ -0,0 +1,110 @@
+# ___________________________________________ Parallel k-fold evaluation of the assessment regressor ______________________________________
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+from hyperparameter_search import thread_budget
+
+
+def share_frame(X, y, numerical_features, categorical_features, directory):
+    """
+    Writes the features and target to .npy files that workers memory-map.
+
+    Numerical columns go into one float64 array, categorical columns into
+    one int32 array of category codes (categories are kept in the returned
+    spec), so every worker reads the same pages instead of receiving a
+    pickled copy of the data.
+    """
+    numeric = np.lib.format.open_memmap(os.path.join(directory, 'numeric.npy'), mode='w+', dtype=np.float64,
+                                        shape=(len(X), len(numerical_features)), fortran_order=True)
+    codes = np.lib.format.open_memmap(os.path.join(directory, 'codes.npy'), mode='w+', dtype=np.int32,
+                                      shape=(len(X), len(categorical_features)), fortran_order=True)
+    categories = []
+    for j, feature in enumerate(numerical_features):
+        numeric[:, j] = X[feature].to_numpy(dtype=np.float64)
+    for j, feature in enumerate(categorical_features):
+        values = pd.Categorical(X[feature])
+        codes[:, j] = values.codes
+        categories.append(list(values.categories))
+    np.save(os.path.join(directory, 'target.npy'), np.asarray(y, dtype=np.float64))
+    numeric.flush()
+    codes.flush()
+    return {
+        'directory': directory,
+        'columns': list(X.columns),
+        'numerical_features': list(numerical_features),
+        'categorical_features': list(categorical_features),
+        'categories': categories,
+        'n_rows': len(X),
+    }
+
+
+def _load_rows(shared, rows):
+    """The given rows of the shared data as (X DataFrame, y)."""
+    numeric = np.load(os.path.join(shared['directory'], 'numeric.npy'), mmap_mode='r')
+    codes = np.load(os.path.join(shared['directory'], 'codes.npy'), mmap_mode='r')
+    target = np.load(os.path.join(shared['directory'], 'target.npy'), mmap_mode='r')
+    columns = {}
+    for j, feature in enumerate(shared['numerical_features']):
+        columns[feature] = numeric[rows, j]
+    for j, feature in enumerate(shared['categorical_features']):
+        columns[feature] = pd.Categorical.from_codes(codes[rows, j], shared['categories'][j])
+    return pd.DataFrame(columns)[shared['columns']], target[rows]
+
+
+def _fold_indices(n_rows, n_splits, seed):
+    return list(KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(np.zeros((n_rows, 1))))
+
+
+def _run_fold(task):
+    """Worker: fits a fresh pipeline on one fold with `nthread` XGBoost threads and scores it."""
+    build_pipeline, shared, fold, n_splits, seed, nthread, model_params = task
+    train_index, test_index = _fold_indices(shared['n_rows'], n_splits, seed)[fold]
+    X_train, y_train = _load_rows(shared, train_index)
+    X_test, y_test = _load_rows(shared, test_index)
+
+    start = time.perf_counter()
+    pipeline = build_pipeline(shared['numerical_features'], shared['categorical_features'],
+                              n_jobs=nthread, **model_params)
+    pipeline.fit(X_train, y_train)
+    y_pred = pipeline.predict(X_test)
+    mse = mean_squared_error(y_test, y_pred)
+    return {'fold': fold, 'mse': mse, 'rmse': mse ** 0.5, 'r2': r2_score(y_test, y_pred),
+            'seconds': time.perf_counter() - start, 'train_rows': len(train_index), 'test_rows': len(test_index)}
+
+
+def cross_validate(build_pipeline, X, y, numerical_features, categorical_features, n_splits=5, n_jobs=-1, seed=42,
+                   **model_params):
+    """
+    K-fold evaluation with the folds running concurrently in a process pool.
+
+    `build_pipeline` is one of the model_pipelines builders; every fold fits
+    its own pipeline (preprocessing included) on its training rows. With
+    W = min(n_splits, n_jobs, cores) workers each XGBoost model gets
+    cores // W threads, so the total never exceeds the core count. The data
+    is shared through memory-mapped .npy files in a temporary directory.
+    Returns a dict with per-fold metrics, wall_seconds, workers and nthread.
+    """
+    workers, nthread = thread_budget(min(n_splits, n_jobs) if n_jobs and n_jobs > 0 else n_splits)
+    directory = tempfile.mkdtemp(prefix='assessment-cv-')
+    start = time.perf_counter()
+    try:
+        shared = share_frame(X, y, numerical_features, categorical_features, directory)
+        tasks = [(build_pipeline, shared, fold, n_splits, seed, nthread, model_params) for fold in range(n_splits)]
+        if workers <= 1:
+            folds = [_run_fold(task) for task in tasks]
+        else:
+            # fork: the prediction scripts have no __main__ guard, so spawned workers must not re-import them
+            context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+                folds = list(executor.map(_run_fold, tasks))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return {'folds': folds, 'wall_seconds': time.perf_counter() - start, 'workers': workers, 'nthread': nthread}
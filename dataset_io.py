@@ -0,0 +1,128 @@
+# ___________________________________________ Dataset writing and reading ________________________________________________________________
+
+import os
+import glob
+import pandas as pd
+
+output_formats = ['csv', 'parquet', 'arrow']
+part_extensions = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def chunk_bounds(stop_row, chunk_size, start_row=0):
+    """Yields (start, stop) row ranges covering rows [start_row, stop_row) in chunks of chunk_size."""
+    for start in range(start_row, stop_row, chunk_size):
+        yield start, min(start + chunk_size, stop_row)
+
+
+def remove_parts(path, output_format, part_prefix='part'):
+    """Deletes partition files left in `path` by an earlier run."""
+    for old_part in glob.glob(os.path.join(path, f"{part_prefix}-*{part_extensions[output_format]}")):
+        os.remove(old_part)
+
+
+class DatasetWriter:
+    """
+    Appends DataFrame chunks to a dataset on disk.
+
+    'csv' appends every chunk to a single file (header written once).
+    'parquet' and 'arrow' write one partition file per chunk into the `path`
+    directory (part-00000.parquet, part-00001.parquet, ...). Categorical
+    columns are stored as dictionary-encoded columns, so every chunk only
+    needs to be in memory while it is being written.
+    """
+
+    def __init__(self, path, output_format='csv', part_prefix='part'):
+        if output_format not in output_formats:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {output_formats}")
+        self.path = path
+        self.output_format = output_format
+        self.part_prefix = part_prefix
+        self.parts_written = 0
+        self.rows_written = 0
+        if output_format == 'csv':
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            remove_parts(path, output_format, part_prefix)
+
+    def write(self, df):
+        if self.output_format == 'csv':
+            df.to_csv(self.path, mode='a', header=self.parts_written == 0, index=False)
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            part_path = os.path.join(self.path, f"{self.part_prefix}-{self.parts_written:05d}{part_extensions[self.output_format]}")
+            if self.output_format == 'parquet':
+                import pyarrow.parquet as pq
+                pq.write_table(table, part_path)
+            else:
+                with pa.OSFile(part_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        self.parts_written += 1
+        self.rows_written += len(df)
+
+
+def dataset_parts(path):
+    """Returns the partition files of a Parquet/Arrow dataset directory in write order."""
+    for output_format, extension in part_extensions.items():
+        parts = sorted(glob.glob(os.path.join(path, f"*{extension}")))
+        if parts:
+            return output_format, parts
+    raise FileNotFoundError(f"No .parquet or .arrow partitions found in {path}")
+
+
+def read_part(part_path, columns=None, dtype=None):
+    """
+    Reads one Parquet or Arrow IPC partition into a DataFrame.
+
+    `columns` is a list of names or a predicate on names; `dtype` maps
+    column names to dtypes (names not in the partition are ignored).
+    """
+    import pyarrow as pa
+
+    if part_path.endswith(part_extensions['parquet']):
+        import pyarrow.parquet as pq
+        if callable(columns):
+            columns = [name for name in pq.read_schema(part_path).names if columns(name)]
+        table = pq.read_table(part_path, columns=columns)
+    else:
+        with pa.memory_map(part_path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if callable(columns):
+            columns = [name for name in table.column_names if columns(name)]
+        if columns is not None:
+            table = table.select(columns)
+    df = table.to_pandas()
+    if dtype is not None:
+        df = df.astype({column: value for column, value in dtype.items() if column in df.columns})
+    return df
+
+
+def read_dataset(path, columns=None, dtype=None):
+    """Loads a CSV file or a directory of Parquet/Arrow partitions into one DataFrame (see read_part for the options)."""
+    if os.path.isdir(path):
+        _, parts = dataset_parts(path)
+        return pd.concat([read_part(part, columns, dtype) for part in parts], ignore_index=True)
+    return pd.read_csv(path, usecols=columns, dtype=dtype)
+
+
+def iter_dataset(path, chunk_size=100_000, columns=None, dtype=None):
+    """
+    Yields (first row number, DataFrame) chunks of a CSV file or a directory
+    of Parquet/Arrow partitions, without ever holding the whole dataset.
+    """
+    start = 0
+    if os.path.isdir(path):
+        _, parts = dataset_parts(path)
+        for part in parts:
+            df = read_part(part, columns, dtype)
+            for offset in range(0, len(df), chunk_size):
+                chunk = df.iloc[offset:offset + chunk_size]
+                yield start, chunk
+                start += len(chunk)
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunk_size):
+            yield start, chunk
+            start += len(chunk)
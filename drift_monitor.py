@@ -0,0 +1,170 @@
+# ___________________________________________ Streaming drift monitor for scoring traffic _________________________________________________
+#
+# At training time build_reference() summarizes every model input in a few numbers: counts over equal-frequency
+# bins of the training values (plus missing) for numerical features, counts per category (plus unseen) for
+# categorical ones. save_reference() writes the summary next to the model artifacts. DriftMonitor then counts
+# incoming rows into the same bins: a fixed number of integers per feature, updated with one vectorized
+# searchsorted/bincount per batch, so memory stays constant however long the service runs. report() compares
+# the recent traffic with the training snapshot by the population stability index (PSI) and, for numerical
+# features, the Kolmogorov-Smirnov distance between the binned distributions.
+
+import json
+import os
+import threading
+import numpy as np
+from inference import _column, encode_column
+from model_artifacts import load_spec
+
+reference_file = 'drift_reference.json'
+
+# Conventional PSI reading: below 0.1 no shift, 0.1-0.25 moderate, above 0.25 significant
+psi_thresholds = (0.1, 0.25)
+
+
+def build_reference(data, numerical_features, categorical_features, bins=20):
+    """Training-time snapshot of the feature distributions of `data` (a DataFrame of raw model inputs)."""
+    features = {}
+    for feature in numerical_features:
+        values = np.asarray(data[feature], dtype=np.float64)
+        present = values[~np.isnan(values)]
+        edges = np.unique(np.quantile(present, np.linspace(0, 1, bins + 1)[1:-1])) if len(present) else np.empty(0)
+        counts = np.bincount(np.searchsorted(edges, present, side='right'), minlength=len(edges) + 1)
+        features[feature] = {'type': 'numerical', 'edges': edges.tolist(), 'counts': counts.tolist(),
+                             'missing': int(len(values) - len(present))}
+    for feature in categorical_features:
+        counts = data[feature].value_counts(dropna=True)
+        counts = sorted((str(category), int(count)) for category, count in counts.items() if count > 0)
+        features[feature] = {'type': 'categorical', 'categories': [category for category, _ in counts],
+                             'counts': [count for _, count in counts],
+                             'other': int(len(data) - sum(count for _, count in counts))}
+    return {'rows': int(len(data)), 'bins': bins, 'features': features}
+
+
+def save_reference(reference, model_dir):
+    """Writes the snapshot next to the model artifacts in model_dir, tagged with the saved model's version."""
+    reference = {**reference, 'model_version': load_spec(model_dir).get('model_version')}
+    with open(os.path.join(model_dir, reference_file), 'w') as f:
+        json.dump(reference, f)
+    return os.path.join(model_dir, reference_file)
+
+
+def population_stability_index(expected, actual, floor=1e-4):
+    """PSI between two distributions over the same bins (proportions are floored to keep empty bins finite)."""
+    expected = np.maximum(expected / max(expected.sum(), 1), floor)
+    actual = np.maximum(actual / max(actual.sum(), 1), floor)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def ks_distance(expected, actual):
+    """Largest gap between the two binned CDFs (a lower bound on the KS statistic of the raw values)."""
+    if expected.sum() == 0 or actual.sum() == 0:
+        return None
+    return float(np.abs(np.cumsum(expected) / expected.sum() - np.cumsum(actual) / actual.sum()).max())
+
+
+class DriftMonitor:
+    """
+    Streaming per-feature bin counts of scoring traffic, compared with a training snapshot.
+
+    Numerical features count into the reference's bins with missing values
+    last; categorical features count per reference category with unseen
+    and missing values first. Counts are kept for two tumbling windows of
+    `window_rows` rows and report() looks at both, i.e. at the last
+    window_rows to 2 * window_rows rows, so old traffic ages out while the
+    memory per feature stays fixed. PSI over few rows is inflated by
+    sampling noise (roughly bins / rows without any drift), so no status is
+    given below `min_rows`. observe() is thread-safe.
+    """
+
+    def __init__(self, reference, window_rows=100_000, min_rows=1000):
+        self.reference = reference
+        self.model_version = reference.get('model_version')
+        self.window_rows = window_rows
+        self.min_rows = min_rows
+        self.lock = threading.Lock()
+        self.numerical, self.categorical = [], []
+        self.expected = {}
+        for feature, summary in reference['features'].items():
+            if summary['type'] == 'numerical':
+                self.numerical.append((feature, np.array(summary['edges'])))
+                self.expected[feature] = np.array(summary['counts'] + [summary['missing']], dtype=np.float64)
+            else:
+                categories = summary['categories']
+                lookup = {category: code for code, category in enumerate(categories)}
+                self.categorical.append((feature, categories, lookup))
+                self.expected[feature] = np.array([summary['other']] + summary['counts'], dtype=np.float64)
+        self.current = {feature: np.zeros(len(counts), dtype=np.int64) for feature, counts in self.expected.items()}
+        self.previous = {feature: np.zeros(len(counts), dtype=np.int64) for feature, counts in self.expected.items()}
+        self.current_rows = self.previous_rows = 0
+        self.observed_rows = 0
+
+    @classmethod
+    def load(cls, model_dir, window_rows=100_000, min_rows=1000):
+        """The monitor for a saved model, or None when no reference was saved with it."""
+        path = os.path.join(model_dir, reference_file)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return cls(json.load(f), window_rows, min_rows)
+
+    def observe(self, data):
+        """Counts a batch (DataFrame, dict of arrays, ...) holding at least the reference features."""
+        counts = {}
+        for feature, edges in self.numerical:
+            values = _column(data, feature).astype(np.float64)
+            missing = np.isnan(values)
+            # Missing values go to the last slot, after the bins
+            bins = np.where(missing, len(edges) + 1, np.searchsorted(edges, values, side='right'))
+            counts[feature] = np.bincount(bins, minlength=len(edges) + 2)
+        for feature, categories, lookup in self.categorical:
+            values = data[feature]
+            if not hasattr(values, 'cat'):
+                values = _column(data, feature)
+            # pandas categorical columns are recoded category by category, not value by value
+            counts[feature] = np.bincount(encode_column(values, categories, lookup) + 1, minlength=len(categories) + 1)
+        n_rows = int(next(iter(counts.values())).sum()) if counts else 0
+        with self.lock:
+            if self.current_rows >= self.window_rows:
+                self.previous, self.previous_rows = self.current, self.current_rows
+                self.current = {feature: np.zeros_like(values) for feature, values in self.current.items()}
+                self.current_rows = 0
+            for feature, values in counts.items():
+                self.current[feature] += values
+            self.current_rows += n_rows
+            self.observed_rows += n_rows
+
+    def report(self):
+        """PSI (and KS for numerical features) per feature over the recent rows, plus the worst PSI and its status."""
+        with self.lock:
+            actual = {feature: self.current[feature] + self.previous[feature] for feature in self.current}
+            rows = self.current_rows + self.previous_rows
+        features = {}
+        for feature, expected in self.expected.items():
+            counts = actual[feature].astype(np.float64)
+            summary = {'psi': population_stability_index(expected, counts) if rows else None}
+            if self.reference['features'][feature]['type'] == 'numerical':
+                summary['ks'] = ks_distance(expected[:-1], counts[:-1])
+                summary['missing_share'] = float(counts[-1] / rows) if rows else None
+            else:
+                summary['unseen_share'] = float(counts[0] / rows) if rows else None
+            features[feature] = summary
+        scored = {feature: summary['psi'] for feature, summary in features.items() if summary['psi'] is not None}
+        worst = max(scored, key=scored.get) if scored else None
+        max_psi = scored[worst] if worst else None
+        if max_psi is None:
+            status = 'no traffic'
+        elif rows < self.min_rows:
+            status = 'too few rows'
+        else:
+            status = 'ok' if max_psi < psi_thresholds[0] else 'moderate' if max_psi < psi_thresholds[1] else 'drift'
+        return {
+            'status': status,
+            'max_psi': max_psi,
+            'max_psi_feature': worst,
+            'drifted_features': sorted(feature for feature, psi in scored.items()
+                                       if psi >= psi_thresholds[1] and rows >= self.min_rows),
+            'window_rows': rows,
+            'observed_rows': self.observed_rows,
+            'reference_model_version': self.model_version,
+            'features': features,
+        }
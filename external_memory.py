@@ -0,0 +1,189 @@
+# ___________________________________________ Out-of-core training with XGBoost external memory __________________________________________
+#
+# Streams a CSV file or a partitioned dataset chunk by chunk: the preprocessing is fitted on a bounded sample
+# of training rows, every chunk is transformed on its own and handed to XGBoost through a DataIter, and
+# XGBoost keeps the quantized pages on disk (ExtMemQuantileDMatrix). Train/test membership is a hash of the
+# row number, so it does not depend on chunk sizes and needs no in-memory shuffle.
+
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+from dataset_io import iter_dataset
+from student_schema import levels_list
+
+
+def _splitmix64(x):
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def fit_label_encoder(labels):
+    """
+    LabelEncoder over the declared classes of a target column: the categories
+    of a categorical column, otherwise the material levels. A fitting sample
+    missing a rare class would otherwise shift every class code after it.
+    """
+    classes = labels.cat.categories if isinstance(labels.dtype, pd.CategoricalDtype) else levels_list
+    return LabelEncoder().fit(list(classes))
+
+
+def hash_split(row_keys, test_size=0.2, seed=42):
+    """Boolean test-set mask: a row is in the test set when the hash of (seed, key) falls below test_size."""
+    keys = np.asarray(row_keys, dtype=np.uint64)
+    mixed = _splitmix64(keys ^ _splitmix64(np.array([seed], dtype=np.uint64)))
+    return (mixed >> np.uint64(11)).astype(np.float64) * 2.0 ** -53 < test_size
+
+
+def iter_split(path, subset, test_size=0.2, seed=42, chunk_size=100_000, columns=None, dtype=None):
+    """Yields the 'train' or 'test' rows of every chunk of the dataset (empty chunks are skipped)."""
+    for start, chunk in iter_dataset(path, chunk_size, columns, dtype):
+        is_test = hash_split(np.arange(start, start + len(chunk)), test_size, seed)
+        rows = chunk[is_test] if subset == 'test' else chunk[~is_test]
+        if len(rows):
+            yield rows
+
+
+class PreprocessedChunks(xgb.DataIter):
+    """
+    DataIter over the training rows of a dataset on disk.
+
+    Each call to next() reads one chunk, transforms it with the already
+    fitted `features` (a fitted sklearn transformer/Pipeline) and passes it
+    to XGBoost, so only one chunk is in memory at a time.
+    """
+
+    def __init__(self, path, features, feature_columns, target, label_encoder=None, test_size=0.2, seed=42,
+                 chunk_size=100_000, cache_prefix=None, dtype=None):
+        self.path = path
+        self.features = features
+        self.feature_columns = list(feature_columns)
+        self.target = target
+        self.label_encoder = label_encoder
+        self.split = dict(test_size=test_size, seed=seed, chunk_size=chunk_size,
+                          columns=self.feature_columns + [target], dtype=dtype)
+        self.chunks = None
+        self.rows = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self.chunks is None:
+            self.chunks = iter_split(self.path, 'train', **self.split)
+            self.rows = 0
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            return False
+        label = chunk[self.target].to_numpy()
+        if self.label_encoder is not None:
+            label = self.label_encoder.transform(label)
+        input_data(data=self.features.transform(chunk[self.feature_columns]), label=label)
+        self.rows += len(chunk)
+        return True
+
+    def reset(self):
+        self.chunks = None
+
+
+def _booster_params(model):
+    """Native training parameters of an (unfitted) XGBRegressor/XGBClassifier; external memory needs 'hist'."""
+    params = {name: value for name, value in model.get_xgb_params().items()
+              if value is not None and name != 'use_label_encoder'}
+    params['tree_method'] = 'hist'
+    return params
+
+
+def score_chunks(booster, chunks, label_encoder=None):
+    """
+    Metrics of a booster over (transformed features, y) chunks, accumulated one chunk at a time.
+
+    With a label encoder (classification) the accuracy, otherwise MSE, RMSE
+    and R2. Returns (metrics, rows); metrics are empty when there are no rows.
+    """
+    n = correct = 0
+    squared_error = total = total_squared = 0.0
+    for X, y in chunks:
+        prediction = booster.inplace_predict(X)
+        n += len(y)
+        if label_encoder is not None:
+            correct += int(np.sum(label_encoder.classes_[prediction.astype(np.int64)] == y))
+        else:
+            y = np.asarray(y, dtype=np.float64)
+            squared_error += float(np.sum((y - prediction) ** 2))
+            total += float(np.sum(y))
+            total_squared += float(np.sum(y ** 2))
+
+    if n == 0:
+        return {}, 0
+    if label_encoder is not None:
+        return {'accuracy': correct / n}, n
+    mse = squared_error / n
+    return {'mse': mse, 'rmse': mse ** 0.5, 'r2': 1 - squared_error / (total_squared - total ** 2 / n)}, n
+
+
+def train_external_memory(path, pipeline, target, feature_columns, classification=False, test_size=0.2, seed=42,
+                          chunk_size=100_000, fit_rows=200_000, cache_dir=None, dtype=None):
+    """
+    Trains pipeline = (feature steps..., XGBoost model) on a dataset that does not fit in memory.
+
+    The feature steps are fitted on the first `fit_rows` training rows
+    (categories unseen there are treated as unknown later on). Training then
+    streams all training rows through PreprocessedChunks into an
+    ExtMemQuantileDMatrix cached under cache_dir, and the test rows are
+    scored chunk by chunk. Only the quantized feature pages go to disk:
+    labels, gradients and predictions (tens of bytes per training row) stay
+    in memory. `dtype` (e.g. a student_schema schema) is applied to every
+    chunk as it is parsed. Returns a dict with the booster, the pipeline
+    (feature steps fitted), the label encoder (classification) and metrics.
+    """
+    start = time.perf_counter()
+    feature_columns = list(feature_columns)
+    columns = feature_columns + [target]
+
+    sample = []
+    sampled = 0
+    for chunk in iter_split(path, 'train', test_size, seed, chunk_size, columns, dtype):
+        sample.append(chunk)
+        sampled += len(chunk)
+        if sampled >= fit_rows:
+            break
+    sample = pd.concat(sample, ignore_index=True).head(fit_rows)
+    features = pipeline[:-1]
+    features.fit(sample[feature_columns], sample[target])
+    label_encoder = fit_label_encoder(sample[target]) if classification else None
+    del sample
+
+    own_cache = cache_dir is None
+    cache_dir = tempfile.mkdtemp(prefix='xgb-extmem-') if own_cache else cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        chunks = PreprocessedChunks(path, features, feature_columns, target, label_encoder, test_size, seed,
+                                    chunk_size, cache_prefix=os.path.join(cache_dir, 'cache'), dtype=dtype)
+        dtrain = xgb.ExtMemQuantileDMatrix(chunks, enable_categorical=True)
+        model = pipeline[-1]
+        booster = xgb.train(_booster_params(model), dtrain, num_boost_round=model.n_estimators)
+        del dtrain
+    finally:
+        if own_cache:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    trained = time.perf_counter()
+
+    # Streamed evaluation on the hash-selected test rows
+    metrics, n_test = score_chunks(
+        booster, ((features.transform(chunk[feature_columns]), chunk[target].to_numpy())
+                  for chunk in iter_split(path, 'test', test_size, seed, chunk_size, columns, dtype)),
+        label_encoder)
+    return {
+        'booster': booster,
+        'pipeline': pipeline,
+        'label_encoder': label_encoder,
+        'train_rows': chunks.rows,
+        'test_rows': n_test,
+        'train_seconds': trained - start,
+        'metrics': metrics,
+    }
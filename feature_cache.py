@@ -0,0 +1,213 @@
+# ___________________________________________ Content-addressed cache of preprocessed feature matrices ____________________________________
+#
+# A training run with --feature-cache looks up its preprocessed matrices under a key made of the dataset's content
+# hash and the preprocessing spec (script options, the unfitted transformer's parameters and the source files of
+# its classes, split settings). On a hit the CSV is not parsed and nothing is refitted: the matrices and labels
+# are memory-mapped from .npy (dense) or CSR component files, and the fitted transformer is unpickled. Entries are
+# written to a temporary directory and renamed into place, so an interrupted or concurrent run never leaves a
+# half-written entry.
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+cache_format = 1
+
+
+def _file_blocks(path, block_size=1 << 20):
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            yield block
+
+
+def dataset_files(path):
+    """The files making up a dataset: the CSV itself, or every file of a partition directory in name order."""
+    if os.path.isdir(path):
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    return [path]
+
+
+def dataset_digest(path, memo=None):
+    """
+    BLAKE2b digest of a dataset's bytes (and partition names).
+
+    `memo` maps a file to its (size, mtime_ns, digest); files whose size
+    and modification time are unchanged are not read again.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for file in dataset_files(path):
+        stat = os.stat(file)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        key = os.path.abspath(file)
+        if memo is not None and key in memo and memo[key][:2] == signature:
+            file_digest = memo[key][2]
+        else:
+            file_hash = hashlib.blake2b(digest_size=16)
+            for block in _file_blocks(file):
+                file_hash.update(block)
+            file_digest = file_hash.hexdigest()
+            if memo is not None:
+                memo[key] = signature + [file_digest]
+        digest.update(os.path.relpath(file, path).encode() if os.path.isdir(path) else b'')
+        digest.update(file_digest.encode())
+    return digest.hexdigest()
+
+
+def transformer_spec(transformer):
+    """The full parameter repr of an (unfitted) estimator, for cache keys."""
+    return transformer.__repr__(N_CHAR_MAX=1_000_000)
+
+
+def transformer_code(transformer):
+    """
+    Digests of this project's source files that define the classes (and
+    base classes) of an estimator and of every estimator nested in it, for
+    cache keys: editing e.g. FeatureCrosser.transform changes the key even
+    though the parameter repr stays the same. Installed packages are covered
+    by their version instead.
+    """
+    root = os.path.dirname(os.path.abspath(__file__)) + os.sep
+    estimators = [transformer] + [value for value in transformer.get_params(deep=True).values()
+                                  if hasattr(value, 'get_params')]
+    files = set()
+    for estimator in estimators:
+        for cls in type(estimator).__mro__:
+            path = getattr(sys.modules.get(cls.__module__), '__file__', None)
+            if path and os.path.abspath(path).startswith(root):
+                files.add(os.path.abspath(path))
+    return {os.path.relpath(path, root): dataset_digest(path) for path in sorted(files)}
+
+
+def _save_matrix(directory, name, matrix):
+    """Writes a dense array, CSR matrix or DataFrame (numeric and categorical columns); returns its description."""
+    if sp.issparse(matrix):
+        matrix = sp.csr_matrix(matrix)
+        for part in ('data', 'indices', 'indptr'):
+            np.save(os.path.join(directory, f'{name}.{part}.npy'), getattr(matrix, part))
+        return {'format': 'csr', 'shape': list(matrix.shape)}
+    if isinstance(matrix, pd.DataFrame):
+        columns = []
+        for j, (column, values) in enumerate(matrix.items()):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                np.save(os.path.join(directory, f'{name}.{j}.npy'), values.cat.codes.to_numpy())
+                columns.append({'name': column, 'categories': values.cat.categories.tolist()})
+            else:
+                np.save(os.path.join(directory, f'{name}.{j}.npy'), values.to_numpy())
+                columns.append({'name': column})
+        return {'format': 'frame', 'columns': columns}
+    matrix = np.asarray(matrix)
+    np.save(os.path.join(directory, f'{name}.npy'), matrix, allow_pickle=False)
+    return {'format': 'dense', 'shape': list(matrix.shape)}
+
+
+def _load_matrix(directory, name, description):
+    """Memory-maps a matrix written by _save_matrix (DataFrame columns are copied into the frame)."""
+    def load(suffix):
+        return np.load(os.path.join(directory, f'{name}{suffix}.npy'), mmap_mode='r')
+
+    if description['format'] == 'csr':
+        return sp.csr_matrix((load('.data'), load('.indices'), load('.indptr')), shape=tuple(description['shape']),
+                             copy=False)
+    if description['format'] == 'frame':
+        columns = {}
+        for j, column in enumerate(description['columns']):
+            values = load(f'.{j}')
+            if 'categories' in column:
+                values = pd.Categorical.from_codes(values, column['categories'])
+            columns[column['name']] = values
+        return pd.DataFrame(columns)
+    return load('')
+
+
+class FeatureCache:
+    """
+    Preprocessed matrices, labels and fitted transformers in `root`, one directory per key.
+
+    key(data_path, spec) hashes the dataset content with the spec (a JSON-
+    serializable dict of everything the matrices depend on besides the
+    data). save(key, matrices, objects, meta) stores arrays/CSR/DataFrames,
+    pickled objects (fitted transformers, label encoders) and JSON metadata;
+    load(key) returns them as a dict with matrices memory-mapped, or None.
+    """
+
+    def __init__(self, root='.feature_cache'):
+        self.root = root
+        self.hits = 0
+        self.misses = 0
+
+    def _memo_path(self):
+        return os.path.join(self.root, 'digests.json')
+
+    def key(self, data_path, spec):
+        memo = {}
+        if os.path.exists(self._memo_path()):
+            with open(self._memo_path()) as f:
+                memo = json.load(f)
+        digest = dataset_digest(data_path, memo)
+        os.makedirs(self.root, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=self.root, suffix='.tmp', delete=False) as f:
+            json.dump(memo, f)
+        os.replace(f.name, self._memo_path())
+        payload = {'format': cache_format, 'data': digest, 'spec': spec, 'sklearn': sklearn.__version__}
+        return hashlib.blake2b(json.dumps(payload, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def load(self, key):
+        directory = self.path(key)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            self.misses += 1
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        entry = {'meta': meta['meta']}
+        entry.update({name: _load_matrix(directory, name, description)
+                      for name, description in meta['matrices'].items()})
+        entry.update({name: joblib.load(os.path.join(directory, f'{name}.joblib')) for name in meta['objects']})
+        self.hits += 1
+        return entry
+
+    def save(self, key, matrices, objects=None, meta=None):
+        """Stores an entry; a concurrent run that saved the same key first wins."""
+        os.makedirs(self.root, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix=f'{key}.', suffix='.tmp', dir=self.root)
+        try:
+            descriptions = {name: _save_matrix(directory, name, matrix) for name, matrix in matrices.items()}
+            for name, value in (objects or {}).items():
+                joblib.dump(value, os.path.join(directory, f'{name}.joblib'))
+            with open(os.path.join(directory, 'meta.json'), 'w') as f:
+                json.dump({'key': key, 'created': time.time(), 'matrices': descriptions,
+                           'objects': sorted(objects or {}), 'meta': meta or {}}, f, indent=2, default=str)
+            os.rename(directory, self.path(key))
+        except OSError:
+            if not os.path.exists(os.path.join(self.path(key), 'meta.json')):
+                raise
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        return self.path(key)
+
+
+def add_feature_cache_arguments(parser):
+    """Adds the shared --feature-cache option to a prediction script's parser."""
+    parser.add_argument('--feature-cache', nargs='?', const='.feature_cache', default=None, metavar='DIR',
+                        help="Reuse preprocessed matrices cached in DIR (default .feature_cache) when neither the "
+                             "dataset nor the preprocessing has changed; fills the cache on a miss.")
+
+
+def feature_cache_from_args(args):
+    """A FeatureCache for --feature-cache, or None when the option is not given."""
+    return None if args.feature_cache is None else FeatureCache(args.feature_cache)
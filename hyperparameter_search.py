@@ -0,0 +1,255 @@
+# ___________________________________________ Budgeted hyperparameter search for XGBoost __________________________________________________
+
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import StratifiedKFold
+
+# scikit-learn style XGBClassifier arguments -> native xgb.train parameter names
+_native_names = {'learning_rate': 'eta', 'random_state': 'seed', 'n_jobs': 'nthread'}
+_sklearn_only = {'n_estimators', 'use_label_encoder', 'eval_metric', 'objective', 'early_stopping_rounds', 'verbose'}
+
+
+def native_params(params, num_classes, nthread=None, seed=42):
+    """xgb.train parameters for a multi-class model configured with XGBClassifier arguments."""
+    native = {'objective': 'multi:softprob', 'num_class': num_classes, 'eval_metric': 'mlogloss', 'seed': seed}
+    for name, value in params.items():
+        if name not in _sklearn_only:
+            native[_native_names.get(name, name)] = value
+    if nthread is not None:
+        native['nthread'] = nthread
+    return native
+
+
+def param_combinations(param_grid):
+    """Every combination of a GridSearchCV-style parameter grid, as a list of dicts."""
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+
+
+def _rows(X, index):
+    """Rows of a NumPy array or DataFrame (native categorical features) by position."""
+    return X.iloc[index] if hasattr(X, 'iloc') else np.asarray(X)[index]
+
+
+class _Trial:
+    """One configuration being boosted rung by rung."""
+
+    def __init__(self, params):
+        self.params = params
+        self.booster = None
+        self.rounds = 0
+        self.stopped = False
+        self.logloss = math.inf
+        self.best_iteration = 0
+        self.accuracy = 0.0
+
+    def key(self):
+        return (-self.accuracy, self.logloss)
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving over a parameter grid, with boosting rounds as the budget.
+
+    The budget parameter (n_estimators) is taken out of the grid; its largest
+    value is the most rounds any configuration gets. Every remaining
+    combination starts with `min_rounds` rounds; after each rung only the
+    best 1/eta (by validation accuracy, then log loss) are boosted further,
+    continuing their existing booster up to eta times more rounds. A trial
+    whose validation log loss has not improved for `early_stopping_rounds`
+    is stopped where it is and only keeps competing with its best score.
+    Trials that are not promoted are dropped. With `max_seconds` the search
+    is cancelled at the next rung boundary and returns the best trial so far.
+
+    Attributes after fit(): best_params_ (including n_estimators = best
+    iteration + 1), best_score_ (validation accuracy), time_to_best_
+    (seconds until the best accuracy was first reached), rounds_trained_,
+    n_trials_ and history_ (one record per trial and rung).
+    """
+
+    def __init__(self, param_grid, num_classes, budget_param='n_estimators', min_rounds=10, eta=3,
+                 early_stopping_rounds=10, max_seconds=None, nthread=None, seed=42, verbose=True):
+        grid = dict(param_grid)
+        self.max_rounds = max(grid.pop(budget_param))
+        self.configs = param_combinations(grid)
+        self.num_classes = num_classes
+        self.budget_param = budget_param
+        self.min_rounds = min_rounds
+        self.eta = eta
+        self.early_stopping_rounds = early_stopping_rounds
+        self.max_seconds = max_seconds
+        self.nthread = nthread
+        self.seed = seed
+        self.verbose = verbose
+
+    def rungs(self):
+        """Round budgets of the rungs, ending at max_rounds."""
+        steps = max(0, int(math.floor(math.log(self.max_rounds / self.min_rounds, self.eta) + 1e-9)))
+        return [max(1, int(round(self.max_rounds / self.eta ** (steps - i)))) for i in range(steps + 1)]
+
+    def _boost(self, trial, rounds, dtrain, dval, y_val):
+        booster = xgb.train(
+            native_params(trial.params, self.num_classes, self.nthread, self.seed), dtrain,
+            num_boost_round=rounds - trial.rounds, evals=[(dval, 'validation')],
+            early_stopping_rounds=self.early_stopping_rounds, verbose_eval=False, xgb_model=trial.booster,
+        )
+        trial.booster = booster
+        trial.stopped = booster.num_boosted_rounds() < rounds
+        trial.rounds = booster.num_boosted_rounds()
+        # best_score only covers the rounds of this call, so keep the best seen across rungs
+        if booster.best_score < trial.logloss:
+            trial.logloss = booster.best_score
+            trial.best_iteration = booster.best_iteration
+            probabilities = booster.predict(dval, iteration_range=(0, trial.best_iteration + 1))
+            trial.accuracy = float(np.mean(probabilities.argmax(axis=1) == y_val))
+
+    def fit(self, X_train, y_train, X_val, y_val):
+        start = time.perf_counter()
+        y_val = np.asarray(y_val)
+        dtrain = xgb.DMatrix(X_train, label=y_train, nthread=self.nthread, enable_categorical=True)
+        dval = xgb.DMatrix(X_val, label=y_val, nthread=self.nthread, enable_categorical=True)
+
+        trials = [_Trial(params) for params in self.configs]
+        best = None
+        self.history_ = []
+        self.rounds_trained_ = 0
+        self.time_to_best_ = None
+        for rung, rounds in enumerate(self.rungs()):
+            for trial in trials:
+                if trial.stopped or trial.rounds >= rounds:
+                    continue
+                before = trial.rounds
+                self._boost(trial, rounds, dtrain, dval, y_val)
+                self.rounds_trained_ += trial.rounds - before
+                elapsed = time.perf_counter() - start
+                self.history_.append({'rung': rung, 'rounds': trial.rounds, 'accuracy': trial.accuracy,
+                                      'logloss': trial.logloss, 'elapsed': elapsed, **trial.params})
+                if best is None or trial.key() < best[0]:
+                    # boosting continues on a copy, so this booster stays as it is now
+                    best = (trial.key(), trial.params, trial.best_iteration, trial.accuracy, trial.booster)
+                    self.time_to_best_ = elapsed
+            trials.sort(key=_Trial.key)
+            if self.verbose:
+                print(f"Rung {rung}: {len(trials)} trials at {rounds} rounds, best validation accuracy "
+                      f"{trials[0].accuracy:.4f} ({time.perf_counter() - start:.1f}s)")
+            keep = max(1, len(trials) // self.eta)
+            for trial in trials[keep:]:
+                trial.booster = None
+            trials = trials[:keep]
+            if self.max_seconds is not None and time.perf_counter() - start > self.max_seconds:
+                if self.verbose:
+                    print(f"Search cancelled after {time.perf_counter() - start:.1f}s (max_seconds={self.max_seconds}).")
+                break
+
+        _, params, best_iteration, self.best_score_, self.best_booster_ = best
+        self.best_params_ = {**params, self.budget_param: best_iteration + 1}
+        self.n_trials_ = len(self.configs)
+        self.elapsed_ = time.perf_counter() - start
+        return self
+
+    def grid_rounds(self, param_grid, cv=3):
+        """Boosting rounds an exhaustive GridSearchCV over param_grid trains (not counting the refit)."""
+        return cv * sum(params[self.budget_param] for params in param_combinations(param_grid))
+
+
+def thread_budget(n_jobs=-1, cores=None):
+    """(parallel trials, XGBoost threads per trial) that together use `cores` without oversubscribing."""
+    if cores is None:
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    workers = cores if n_jobs is None or n_jobs < 0 else min(n_jobs, cores)
+    return workers, max(1, cores // workers)
+
+
+class CachedGridSearch:
+    """
+    Exhaustive k-fold grid search with the fold matrices built once.
+
+    GridSearchCV hands dense arrays to every XGBClassifier fit, so each of
+    the thousands of fits re-quantizes its fold. Here each fold is turned
+    into a QuantileDMatrix (tree_method='hist' bins) plus a DMatrix of its
+    held-out rows once, and every trial trains on the cached matrices.
+    Configurations differing only in n_estimators share one booster: it is
+    trained to the largest value and scored at every smaller one through
+    iteration_range (boosting rounds are prefixes of each other).
+
+    Trials run on a thread pool of `n_jobs` workers that share the cached
+    matrices (XGBoost releases the GIL); each booster gets cores // workers
+    threads, so trials x threads never exceeds the cores. Folds and scoring
+    match GridSearchCV(cv=k, scoring='accuracy'), including the tie-break
+    (first best configuration in grid order).
+
+    Attributes after fit(): best_params_, best_score_ (mean CV accuracy),
+    cv_results_ (params, mean_test_score, split<i>_test_score), elapsed_,
+    cache_seconds_ (time spent building the fold matrices), n_workers_ and
+    nthread_.
+    """
+
+    def __init__(self, param_grid, num_classes, cv=3, n_jobs=-1, budget_param='n_estimators', seed=42):
+        self.param_grid = dict(param_grid)
+        self.num_classes = num_classes
+        self.cv = cv
+        self.n_jobs = n_jobs
+        self.budget_param = budget_param
+        self.seed = seed
+
+    def _fold_matrices(self, X, y):
+        folds = []
+        for train_index, test_index in StratifiedKFold(self.cv).split(X, y):
+            nthread = self.n_workers_ * self.nthread_
+            dtrain = xgb.QuantileDMatrix(_rows(X, train_index), label=y[train_index], nthread=nthread,
+                                         enable_categorical=True)
+            dtest = xgb.DMatrix(_rows(X, test_index), nthread=nthread, enable_categorical=True)
+            folds.append((dtrain, dtest, y[test_index]))
+        return folds
+
+    def _run_trial(self, params, fold):
+        """Accuracy on one fold for every budget value of one configuration."""
+        dtrain, dtest, y_test = self.folds_[fold]
+        native = native_params(params, self.num_classes, self.nthread_, self.seed)
+        native['tree_method'] = 'hist'
+        booster = xgb.train(native, dtrain, num_boost_round=max(self.budgets))
+        return [float(np.mean(booster.predict(dtest, iteration_range=(0, rounds)).argmax(axis=1) == y_test))
+                for rounds in self.budgets]
+
+    def fit(self, X, y):
+        start = time.perf_counter()
+        y = np.asarray(y)
+        self.n_workers_, self.nthread_ = thread_budget(self.n_jobs)
+        self.folds_ = self._fold_matrices(X, y)
+        self.cache_seconds_ = time.perf_counter() - start
+
+        grid = dict(self.param_grid)
+        self.budgets = list(grid.pop(self.budget_param))
+        configs = param_combinations(grid)
+        tasks = [(params, fold) for params in configs for fold in range(self.cv)]
+        if self.n_workers_ <= 1:
+            scores = [self._run_trial(*task) for task in tasks]
+        else:
+            with ThreadPoolExecutor(max_workers=self.n_workers_) as executor:
+                scores = list(executor.map(lambda task: self._run_trial(*task), tasks))
+        fold_scores = {}
+        for (params, fold), scores_by_budget in zip(tasks, scores):
+            for rounds, score in zip(self.budgets, scores_by_budget):
+                key = tuple(sorted({**params, self.budget_param: rounds}.items()))
+                fold_scores.setdefault(key, []).append(score)
+
+        # Same candidate order as GridSearchCV (parameter names sorted, last one varying fastest)
+        candidates = param_combinations(dict(sorted(self.param_grid.items())))
+        self.cv_results_ = {'params': candidates, 'mean_test_score': []}
+        for candidate in candidates:
+            self.cv_results_['mean_test_score'].append(float(np.mean(fold_scores[tuple(sorted(candidate.items()))])))
+        for fold in range(self.cv):
+            self.cv_results_[f'split{fold}_test_score'] = [fold_scores[tuple(sorted(candidate.items()))][fold]
+                                                           for candidate in candidates]
+
+        best = int(np.argmax(self.cv_results_['mean_test_score']))
+        self.best_params_ = self.cv_results_['params'][best]
+        self.best_score_ = self.cv_results_['mean_test_score'][best]
+        self.folds_ = None
+        self.elapsed_ = time.perf_counter() - start
+        return self
@@ -0,0 +1,288 @@
+# ___________________________________________ Incremental retraining from a saved model __________________________________________________
+#
+# A daily batch of new students does not need a full training job: the last saved model is loaded, its
+# scaling statistics are merged with the batch's moments, and trees fitted on the new rows only are added with
+# XGBoost training continuation (xgb_model=). The existing trees' split thresholds are moved to the updated
+# scale column by column; a column keeps its old statistics when one of its thresholds cannot be moved so that
+# every raw value it can hold goes the same way as before.
+
+import copy
+import json
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from inference import FeatureTransform, _column, _yeo_johnson
+
+
+def merge_moments(n, mean, var, x):
+    """Count, mean and (population) variance of n earlier values with these moments plus the rows of x (Chan et al.)."""
+    m = len(x)
+    if m == 0:
+        return n, mean, var
+    batch_mean = x.mean(axis=0)
+    total = n + m
+    delta = batch_mean - mean
+    merged_mean = mean + delta * m / total
+    merged_var = (n * var + m * x.var(axis=0) + delta ** 2 * n * m / total) / total
+    return total, merged_mean, merged_var
+
+
+def _scale(var):
+    """StandardScaler's scale_: the standard deviation, or 1 for (near) constant features."""
+    std = np.sqrt(var)
+    return np.where(std < 10 * np.finfo(np.float64).eps, 1.0, std)
+
+
+def update_numerical_spec(numerical, data):
+    """
+    Numerical spec with the rows of `data` added to its fitted statistics.
+
+    Yeo-Johnson lambdas are kept: they are maximum-likelihood estimates,
+    not moments, and the new trees need the same transform as the old
+    ones. The power standardization and the StandardScaler means/variances
+    are merged with the batch's moments. n_samples_seen is one count, or
+    one per column once some columns have been kept frozen.
+    """
+    spec = dict(numerical)
+    n = np.broadcast_to(np.asarray(numerical['n_samples_seen'], dtype=np.int64), (len(numerical['features']),))
+    x = np.column_stack([_column(data, feature).astype(np.float64) for feature in numerical['features']])
+    alpha, beta = np.ones(x.shape[1]), np.zeros(x.shape[1])
+    z = x
+    if numerical['yeo_johnson_lambdas'] is not None:
+        z = np.column_stack([_yeo_johnson(x[:, j], lmbda) for j, lmbda in enumerate(numerical['yeo_johnson_lambdas'])])
+        if numerical['power_mean'] is not None:
+            power_mean, power_scale = np.array(numerical['power_mean']), np.array(numerical['power_scale'])
+            _, merged_mean, merged_var = merge_moments(n, power_mean, power_scale ** 2, z)
+            merged_scale = _scale(merged_var)
+            # standardized values move from (y - power_mean) / power_scale to (y - merged_mean) / merged_scale
+            alpha, beta = power_scale / merged_scale, (power_mean - merged_mean) / merged_scale
+            z = (z - merged_mean) / merged_scale
+            spec['power_mean'], spec['power_scale'] = merged_mean.tolist(), merged_scale.tolist()
+
+    # The scaler's moments were measured before the power standardization moved; map them over first
+    mean, var = np.array(numerical['mean']), np.array(numerical['var'])
+    total, merged_mean, merged_var = merge_moments(n, alpha * mean + beta, alpha ** 2 * var, z)
+    spec.update(mean=merged_mean.tolist(), var=merged_var.tolist(), scale=_scale(merged_var).tolist(),
+                n_samples_seen=_counts(total))
+    return spec
+
+
+def _counts(n):
+    """n_samples_seen as stored in a spec: one int when every column has seen the same rows."""
+    n = np.asarray(n, dtype=np.int64)
+    return int(n[0]) if (n == n[0]).all() else n.tolist()
+
+
+def freeze_columns(updated, numerical, columns):
+    """The `updated` numerical spec with the statistics of the given column indexes put back to `numerical`'s."""
+    spec = dict(updated)
+    n_columns = len(numerical['features'])
+    for name in ('power_mean', 'power_scale', 'mean', 'var', 'scale', 'n_samples_seen'):
+        if updated[name] is None:
+            continue
+        values = np.array(np.broadcast_to(np.asarray(updated[name]), (n_columns,)))
+        values[columns] = np.broadcast_to(np.asarray(numerical[name]), (n_columns,))[columns]
+        spec[name] = _counts(values) if name == 'n_samples_seen' else values.tolist()
+    return spec
+
+
+# Every finite float32 as an ordered integer key, so the float32 grid can be binary searched
+_lowest_key = -0x7f7fffff
+_highest_key = 0x7f7fffff
+
+
+def _from_keys(keys):
+    """float32 values of ordered keys (negative keys are the negative floats)."""
+    keys = np.asarray(keys, dtype=np.int64)
+    bits = np.where(keys < 0, -keys | 0x80000000, keys).astype(np.uint32)
+    return bits.view(np.float32)
+
+
+def _integers(keys):
+    return np.asarray(keys, dtype=np.float64)
+
+
+def _raw_grid(dtype=None):
+    """
+    (lowest key, highest key, key -> raw value) over the raw values a column
+    holds: the integers of its type for integer columns of up to 32 bits (the
+    student_schema int8/int16 ones), every finite float32 otherwise.
+    """
+    if dtype is not None and np.issubdtype(dtype, np.integer) and np.dtype(dtype).itemsize <= 4:
+        info = np.iinfo(dtype)
+        return int(info.min), int(info.max), _integers
+    return _lowest_key, _highest_key, _from_keys
+
+
+def _scaled(transform, j, x):
+    """The j-th numerical model input (float32, as the model sees it) for raw values x."""
+    with np.errstate(all='ignore'):
+        return transform.numerical_column({transform.num_features[j]: x}, j).astype(np.float32)
+
+
+def _boundary_keys(transform, j, thresholds, grid):
+    """Key of the smallest raw value on the grid whose scaled value is >= each threshold (highest key + 1: none)."""
+    lowest, highest, values = grid
+    lo = np.full(len(thresholds), lowest, dtype=np.int64)
+    hi = np.full(len(thresholds), highest + 1, dtype=np.int64)
+    while (lo < hi).any():
+        mid = (lo + hi) // 2
+        right = _scaled(transform, j, values(np.minimum(mid, highest))) >= thresholds
+        searching = lo < hi
+        hi = np.where(searching & right, mid, hi)
+        lo = np.where(searching & ~right, mid + 1, lo)
+    return lo
+
+
+def _moved_thresholds(old, new, j, thresholds, grid):
+    """
+    Thresholds in the `new` scale sending every raw value of column j on the
+    grid the same way as `thresholds` in the `old` one, and whether each is
+    exact.
+
+    XGBoost sends a value left when it is below the threshold. With b the
+    smallest raw value at or above the old threshold, the new threshold is
+    b's new scaled value; it is exact when the raw value just below b still
+    scales below it (the new scale may round both to the same float32).
+    """
+    lowest, highest, values = grid
+    keys = _boundary_keys(old, j, thresholds, grid)
+    moved = _scaled(new, j, values(np.minimum(keys, highest)))
+    below = _scaled(new, j, values(np.clip(keys - 1, lowest, highest)))
+    exact = (keys == lowest) | (below < moved)
+    # No raw value reaches the old threshold: everything must stay left
+    none = keys > highest
+    top = _scaled(new, j, values(np.full(none.sum(), highest)))
+    moved[none] = np.nextafter(top, np.float32(np.inf))
+    exact[none] = np.isfinite(moved[none])
+    return moved, exact
+
+
+def remap_thresholds(booster, old, new, dtypes=None):
+    """
+    Copy of booster with every numeric split on a numerical input moved from
+    the `old` FeatureTransform's scaling to the `new` one.
+
+    Each threshold is mapped through the raw value where the old decision
+    flips, found by binary search over the raw values of the column's dtype
+    (`dtypes`, one per numerical feature; integer columns are searched over
+    their integers, others over the float32 grid), so every such raw input
+    goes the same way as before. A column with a threshold that no float32
+    threshold can keep exact is left unmoved. Returns (booster, {column index:
+    number of inexact thresholds} for the columns left unmoved).
+    """
+    model = json.loads(booster.save_raw('json'))
+    trees = model['learner']['gradient_booster']['model']['trees']
+    n_numerical = len(old.num_features)
+    splits = []
+    for tree in trees:
+        feature = np.array(tree['split_indices'])
+        remap = (np.array(tree['left_children']) != -1) & (np.array(tree['split_type']) == 0) & (feature < n_numerical)
+        splits.append((feature, remap, np.array(tree['split_conditions'], dtype=np.float32)))
+
+    # Each distinct threshold of a column is searched once
+    mapped, inexact = {}, {}
+    for j in range(n_numerical):
+        thresholds = [conditions[remap & (feature == j)] for feature, remap, conditions in splits]
+        thresholds = np.unique(np.concatenate(thresholds)) if thresholds else np.empty(0, dtype=np.float32)
+        moved, exact = _moved_thresholds(old, new, j, thresholds, _raw_grid(None if dtypes is None else dtypes[j]))
+        if exact.all():
+            mapped[j] = (thresholds, moved)
+        else:
+            inexact[j] = int((~exact).sum())
+
+    for tree, (feature, remap, conditions) in zip(trees, splits):
+        for j, (thresholds, moved) in mapped.items():
+            rows = remap & (feature == j)
+            conditions[rows] = moved[np.searchsorted(thresholds, conditions[rows])]
+        tree['split_conditions'] = conditions.astype(np.float64).tolist()
+    remapped = xgb.Booster()
+    remapped.load_model(bytearray(json.dumps(model).encode()))
+    return remapped, inexact
+
+
+def _labels(spec, y):
+    """Regression targets as they are; class labels as codes in the order of the saved classes."""
+    if spec['classes'] is None:
+        return np.asarray(y, dtype=np.float64)
+    codes = {label: code for code, label in enumerate(spec['classes'])}
+    unknown = sorted({str(label) for label in y} - set(codes))
+    if unknown:
+        raise ValueError(f"Labels not known to the saved model: {unknown}")
+    return np.array([codes[str(label)] for label in y])
+
+
+def _training_matrix(spec, booster, X, y):
+    """DMatrix of the new rows; native categorical models need pandas categoricals with the model's categories."""
+    matrix = FeatureTransform(spec).transform(X)
+    label = _labels(spec, y)
+    if spec['categorical'].get('encoding') != 'native':
+        return xgb.DMatrix(matrix, label=label, feature_names=booster.feature_names, feature_types=booster.feature_types)
+    n_numerical = len(spec['numerical']['features'])
+    columns = {}
+    for j, name in enumerate(booster.feature_names):
+        if j < n_numerical:
+            columns[name] = matrix[:, j]
+        else:
+            codes = np.nan_to_num(matrix[:, j], nan=-1).astype(np.int64)
+            columns[name] = pd.Categorical.from_codes(codes, spec['categorical']['categories'][j - n_numerical])
+    return xgb.DMatrix(pd.DataFrame(columns), label=label, enable_categorical=True)
+
+
+def continue_training(predictor, X, y, rounds=50, update_statistics=True, nthread=None):
+    """
+    Adds `rounds` trees fitted on the new rows (X, y) only to a loaded predictor.
+
+    The predictor must have been saved with its training parameters. With
+    update_statistics the scaling statistics are merged with the batch (see
+    update_numerical_spec) and the old trees remapped to them, column by
+    column: a column whose thresholds cannot all be moved exactly for the
+    raw values of its dtype in X (see remap_thresholds) keeps its old
+    statistics. They all stay frozen for models with interaction features,
+    since products of scaled columns cannot be remapped. Categories stay as
+    fitted (new ones count as unknown). Returns (updated predictor, not
+    saved yet, and an info dict).
+    """
+    start = time.perf_counter()
+    spec = copy.deepcopy(predictor.spec)
+    spec.pop('model_version', None)
+    params = spec.get('training_params')
+    if params is None:
+        raise ValueError("The saved model has no training parameters; retrain it once with --save-model.")
+    booster = predictor.booster
+    statistics = 'frozen'
+    if update_statistics and spec['interactions'] is None:
+        features = spec['numerical']['features']
+        updated = {**spec, 'numerical': update_numerical_spec(spec['numerical'], X)}
+        booster, inexact = remap_thresholds(booster, FeatureTransform(spec), FeatureTransform(updated),
+                                            [_column(X, feature).dtype for feature in features])
+        spec = {**updated, 'numerical': freeze_columns(updated['numerical'], spec['numerical'], list(inexact))}
+        statistics = 'updated'
+        if inexact:
+            statistics += '; frozen for ' + ', '.join(f"{features[j]} ({n} thresholds cannot be remapped exactly)"
+                                                     for j, n in inexact.items())
+    elif update_statistics:
+        statistics = 'frozen (interaction features)'
+
+    dtrain = _training_matrix(spec, booster, X, y)
+    params = {**params, **({'nthread': nthread} if nthread else {})}
+    booster = xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+    info = {
+        'rows': len(X),
+        'rounds': rounds,
+        'total_rounds': booster.num_boosted_rounds(),
+        'statistics': statistics,
+        'seconds': time.perf_counter() - start,
+    }
+    return type(predictor)(booster, spec, predictor.model_dir), info
+
+
+def evaluate(predictor, X, y):
+    """MSE/RMSE/R2 for the assessment regressor, accuracy for the material classifier."""
+    prediction = predictor.predict(X)
+    if predictor.spec['classes'] is not None:
+        return {'accuracy': float(np.mean(prediction == np.asarray(y).astype(str)))}
+    y = np.asarray(y, dtype=np.float64)
+    mse = float(np.mean((y - prediction) ** 2))
+    return {'mse': mse, 'rmse': mse ** 0.5, 'r2': 1 - mse / float(np.var(y))}
@@ -0,0 +1,293 @@
+# ___________________________________________ Fast-loading inference for saved models _____________________________________________________
+#
+# Loads the artifacts written by model_artifacts.py (XGBoost booster + preprocessing spec) and predicts
+# without scikit-learn, pandas or a retrain. XGBoost itself is only imported when a model is loaded.
+
+import json
+import os
+import numpy as np
+from model_artifacts import booster_file, spec_file
+
+
+def _yeo_johnson(x, lmbda):
+    """Yeo-Johnson transform of one column (same formulation as scipy.stats.yeojohnson)."""
+    eps = np.finfo(np.float64).eps
+    out = np.zeros_like(x)
+    pos = x >= 0
+    if abs(lmbda) < eps:
+        out[pos] = np.log1p(x[pos])
+    else:
+        out[pos] = np.expm1(lmbda * np.log1p(x[pos])) / lmbda
+    if abs(lmbda - 2) > eps:
+        out[~pos] = -np.expm1((2 - lmbda) * np.log1p(-x[~pos])) / (2 - lmbda)
+    else:
+        out[~pos] = -np.log1p(-x[~pos])
+    return out
+
+
+def _column(data, name):
+    """A column of a DataFrame, dict of lists, NumPy record array or Arrow table as a NumPy array."""
+    column = data[name]
+    if hasattr(column, 'to_numpy'):
+        column = column.to_numpy()
+    return np.asarray(column)
+
+
+def as_columns(data, names):
+    """Pulls the named columns out of any supported batch type once, as a dict of NumPy arrays."""
+    return {name: _column(data, name) for name in names}
+
+
+def encode_column(values, categories, lookup, small_batch_rows=256):
+    """Codes of `values` in `categories` (-1 for unknown values); `lookup` maps category -> code for small batches."""
+    import pandas as pd
+
+    if len(values) <= small_batch_rows:
+        return np.array([lookup.get(value, -1) for value in values.tolist()], dtype=np.int64)
+    return np.asarray(pd.Categorical(values, categories=categories).codes, dtype=np.int64)
+
+
+def _softmax(margin):
+    margin = margin - margin.max(axis=1, keepdims=True)
+    np.exp(margin, out=margin)
+    margin /= margin.sum(axis=1, keepdims=True)
+    return margin
+
+
+class FeatureTransform:
+    """
+    Rebuilds the fitted preprocessing from its spec as plain NumPy.
+
+    Numerical columns: optional Yeo-Johnson + standardization, then scaling.
+    Categorical columns: one-hot with the fitted categories (unknown values
+    encode as all zeros, like handle_unknown='ignore'), or for models using
+    XGBoost's native categorical splits one column of category codes each
+    (unknown values are NaN, i.e. missing). Optionally followed
+    by all pairwise interaction products (PolynomialFeatures, degree 2,
+    interaction_only=True, include_bias=False) or by the products of an
+    explicit list of column pairs (FeatureCrosser). Models trained on sparse
+    input get NaN for zeros, since XGBoost saw those entries as missing.
+    """
+
+    # batches up to this many rows are encoded with dict lookups (see encode_categories)
+    small_batch_rows = 256
+
+    def __init__(self, spec):
+        self.spec = spec
+        num = spec['numerical']
+        self.num_features = num['features']
+        self.lambdas = num['yeo_johnson_lambdas']
+        self.power_mean = None if num['power_mean'] is None else np.array(num['power_mean'])
+        self.power_scale = None if num['power_scale'] is None else np.array(num['power_scale'])
+        self.mean = np.array(num['mean'])
+        self.scale = np.array(num['scale'])
+        self.cat_features = spec['categorical']['features']
+        self.categories = spec['categorical']['categories']
+        self.category_codes = [{category: code for code, category in enumerate(categories)}
+                               for categories in self.categories]
+        self.native_categorical = spec['categorical'].get('encoding', 'onehot') == 'native'
+        if self.native_categorical:
+            self.offsets = np.arange(len(self.num_features), len(self.num_features) + len(self.cat_features) + 1)
+        else:
+            self.offsets = np.cumsum([len(self.num_features)] + [len(cats) for cats in self.categories])
+        self.n_base_features = int(self.offsets[-1])
+        if spec['interactions'] == 'pairwise':
+            self.pairs = np.triu_indices(self.n_base_features, k=1)
+        elif spec['interactions'] is not None:
+            self.pairs = tuple(np.array(side, dtype=np.int64) for side in spec['interactions']['pairs'])
+        else:
+            self.pairs = None
+        self.sparse = spec.get('sparse', False)
+        self.n_features = self.n_base_features + (0 if self.pairs is None else len(self.pairs[0]))
+
+    def encode_categories(self, data, features=None):
+        """
+        Category codes per categorical column (-1 for unknown values).
+
+        Uses pandas' hash-based Categorical encoding (pandas is already loaded
+        by XGBoost), so there is no per-row Python work; pandas categorical
+        columns are recoded category by category. Batches of up to
+        small_batch_rows rows use plain dict lookups instead, which skip the
+        fixed cost of building a Categorical (tens of microseconds per column).
+        """
+        import pandas as pd
+
+        codes = {}
+        for feature, categories, lookup in zip(self.cat_features, self.categories, self.category_codes):
+            if features is not None and feature not in features:
+                continue
+            values = data[feature]
+            if not isinstance(values, pd.Series):
+                values = _column(data, feature)
+            codes[feature] = encode_column(values, categories, lookup, self.small_batch_rows)
+        return codes
+
+    def n_rows(self, data):
+        return len(_column(data, self.num_features[0] if self.num_features else self.cat_features[0]))
+
+    def numerical_column(self, data, j):
+        """The j-th numerical feature after Yeo-Johnson (if fitted) and scaling, as float64."""
+        x = _column(data, self.num_features[j]).astype(np.float64)
+        if self.lambdas is not None:
+            x = _yeo_johnson(x, self.lambdas[j])
+            if self.power_mean is not None:
+                x = (x - self.power_mean[j]) / self.power_scale[j]
+        return (x - self.mean[j]) / self.scale[j]
+
+    def transform(self, data, codes=None):
+        """Returns the model input matrix (float32). `codes` may carry precomputed encode_categories() output."""
+        n_rows = self.n_rows(data)
+        out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        for j in range(len(self.num_features)):
+            out[:, j] = self.numerical_column(data, j)
+
+        codes = dict(codes or {})
+        missing = [feature for feature in self.cat_features if feature not in codes]
+        if missing:
+            codes.update(self.encode_categories(data, missing))
+        rows = np.arange(n_rows)
+        for k, feature in enumerate(self.cat_features):
+            known = codes[feature] >= 0
+            if self.native_categorical:
+                out[:, self.offsets[k]] = np.where(known, codes[feature], np.nan)
+            else:
+                out[rows[known], self.offsets[k] + codes[feature][known]] = 1.0
+
+        if self.pairs is not None:
+            base = out[:, :self.n_base_features]
+            np.multiply(base[:, self.pairs[0]], base[:, self.pairs[1]], out=out[:, self.n_base_features:])
+        out = out.astype(np.float32)
+        if self.sparse:
+            out[out == 0] = np.nan
+        return out
+
+
+class SavedModel:
+    """A loaded booster plus its preprocessing; subclasses decide what predict() returns."""
+
+    def __init__(self, booster, spec, model_dir=None):
+        self.booster = booster
+        self.spec = spec
+        self.model_dir = model_dir
+        self.model_version = spec.get('model_version')
+        self.feature_columns = spec['feature_columns']
+        self.transform = FeatureTransform(spec)
+
+    @classmethod
+    def load(cls, model_dir):
+        import xgboost as xgb
+
+        with open(os.path.join(model_dir, spec_file)) as f:
+            spec = json.load(f)
+        booster = xgb.Booster()
+        booster.load_model(os.path.join(model_dir, booster_file))
+        return cls(booster, spec, model_dir)
+
+    def predict_raw(self, data, predict_type='value', codes=None):
+        """Raw booster output; `codes` may carry category codes already computed (see FeatureTransform.transform)."""
+        return self.booster.inplace_predict(self.transform.transform(data, codes), predict_type=predict_type)
+
+    def iter_chunks(self, data, chunk_size):
+        """Yields the batch in slices of chunk_size rows; columns are extracted only once."""
+        columns = as_columns(data, self.feature_columns)
+        n_rows = len(next(iter(columns.values())))
+        for start in range(0, n_rows, chunk_size):
+            stop = min(start + chunk_size, n_rows)
+            yield {name: values[start:stop] for name, values in columns.items()}
+
+
+class AssessmentScorePredictor(SavedModel):
+    def predict(self, data):
+        """Predicted assessment scores for every row of `data`."""
+        return self.predict_raw(data)
+
+    def predict_batch(self, data, chunk_size=100_000):
+        """Scores a large DataFrame / Arrow table / record array in vectorized chunks."""
+        scores = [self.predict_raw(chunk) for chunk in self.iter_chunks(data, chunk_size)]
+        return np.concatenate(scores) if scores else np.empty(0, dtype=np.float32)
+
+
+class MaterialLevelPredictor(SavedModel):
+    def __init__(self, booster, spec, model_dir=None):
+        super().__init__(booster, spec, model_dir)
+        self.classes = np.array(spec['classes'])
+
+    def predict(self, data):
+        """Predicted material level labels for every row of `data`."""
+        return self.classes[self.predict_raw(data).astype(np.int64)]
+
+    def predict_proba(self, data):
+        """Class probabilities (columns ordered like self.classes) for every row of `data`."""
+        return _softmax(self.predict_raw(data, predict_type='margin'))
+
+    def predict_batch(self, data, chunk_size=100_000):
+        """
+        Labels and class probabilities for a large DataFrame / Arrow table / record array.
+
+        Preprocessing and prediction run per chunk of chunk_size rows with no
+        per-row Python work, and the label is the arg-max of the probabilities.
+        """
+        probabilities = [self.predict_proba(chunk) for chunk in self.iter_chunks(data, chunk_size)]
+        probabilities = np.concatenate(probabilities) if probabilities else np.empty((0, len(self.classes)))
+        return self.classes[probabilities.argmax(axis=1)], probabilities
+
+
+predictor_classes = {'assessment_score': AssessmentScorePredictor, 'material_level': MaterialLevelPredictor}
+
+
+def load_predictor(model_dir):
+    """Loads whichever predictor the artifacts in model_dir were saved for."""
+    with open(os.path.join(model_dir, spec_file)) as f:
+        kind = json.load(f)['kind']
+    return predictor_classes[kind].load(model_dir)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    start = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Predict with a saved assessment score or material level model.")
+    parser.add_argument('model_dir', help="Directory written by --save-model of a prediction script.")
+    parser.add_argument('--data', required=True,
+                        help="CSV file or Parquet/Arrow directory with the feature columns of the model.")
+    parser.add_argument('--backend', choices=['xgboost', 'compiled'], default='xgboost',
+                        help="'compiled' evaluates the trees as flattened NumPy arrays (compiled_inference.py).")
+    parser.add_argument('--drift', action='store_true',
+                        help="Compare the batch with the drift reference saved with the model (drift_monitor.py).")
+    args = parser.parse_args()
+
+    predictor = load_predictor(args.model_dir)
+    if args.backend == 'compiled':
+        from compiled_inference import compile_predictor
+
+        predictor = compile_predictor(predictor)
+    loaded = time.perf_counter()
+
+    from dataset_io import read_dataset
+    from student_schema import assessment_schema, material_schema
+
+    schema = material_schema if predictor.spec['kind'] == 'material_level' else assessment_schema
+    data = read_dataset(args.data, columns=lambda column: column in predictor.spec['feature_columns'], dtype=schema)
+    predictions = predictor.predict(data)
+    predicted = time.perf_counter()
+    for i, prediction in enumerate(predictions):
+        print(f"  Row {i + 1}: {prediction}")
+    print(f"Model {predictor.spec['kind']} ({predictor.model_version}): {len(data)} predictions")
+    print(f"Cold start: load {(loaded - start) * 1e3:.0f} ms (mostly `import xgboost`), "
+          f"read + predict {(predicted - loaded) * 1e3:.0f} ms")
+    if args.drift:
+        from drift_monitor import DriftMonitor
+
+        monitor = DriftMonitor.load(args.model_dir, window_rows=len(data), min_rows=1)
+        if monitor is None:
+            print(f"No drift reference in {args.model_dir} (saved by the prediction scripts with --save-model).")
+        else:
+            monitor.observe(data)
+            drift = monitor.report()
+            print(f"Drift: {drift['status']}" + ('' if drift['max_psi'] is None else
+                                                 f" (max PSI {drift['max_psi']:.3f} on {drift['max_psi_feature']})"))
+            for feature, summary in drift['features'].items() if drift['window_rows'] else ():
+                ks = '' if summary.get('ks') is None else f", KS {summary['ks']:.3f}"
+                print(f"  {feature:<22} PSI {summary['psi']:.3f}{ks}")
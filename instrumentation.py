@@ -0,0 +1,233 @@
+# ___________________________________________ Per-stage timing and memory instrumentation ________________________________________________
+#
+# The scripts mark their numbered sections with stages.start('load'), stages.start('split'), ...; each call ends
+# the previous stage. Per stage we record wall and CPU time, the peak resident set size and, with
+# --trace-allocations, the bytes allocated through Python/NumPy. The records are written as JSON or CSV when the
+# script exits (also through an early exit()), and selected stages can be profiled with cProfile/pyinstrument.
+
+import atexit
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows: no getrusage, so child CPU time (and peak RSS outside Linux) are reported as None
+    resource = None
+
+
+def _read_status_kb(field):
+    """A memory field of /proc/self/status in kB (Linux), or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _reset_peak_rss():
+    """Resets the kernel's high-water mark (VmHWM) so the next reading is this stage's peak; False if unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb():
+    peak = _read_status_kb('VmHWM')
+    if peak is None:
+        if resource is None:
+            return None
+        # ru_maxrss is the peak of the whole run so far (kB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform == 'darwin' else 1)
+    return peak / 1024
+
+
+def _children_cpu_seconds():
+    """User + system CPU time of finished child processes, or None where getrusage is missing."""
+    if resource is None:
+        return None
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return children.ru_utime + children.ru_stime
+
+
+def _format(value, spec):
+    return '' if value is None else format(value, spec)
+
+
+def _rss_mb():
+    rss = _read_status_kb('VmRSS')
+    return None if rss is None else rss / 1024
+
+
+class StageRecorder:
+    """
+    Records wall time, CPU time, peak RSS and allocated bytes per script stage.
+
+    CPU time covers this process plus finished child processes (shard and
+    plot workers). Peak RSS is per stage where the kernel allows resetting
+    the high-water mark (Linux), otherwise the peak of the run so far.
+    Allocations are traced with tracemalloc only when trace_allocations is
+    set, since tracing slows allocation-heavy code down several times. A
+    disabled recorder makes start()/stop() no-ops.
+    """
+
+    def __init__(self, script, output=None, profile_stages=(), profile_dir='.', profiler='cprofile',
+                 trace_allocations=False, enabled=True):
+        self.script = script
+        self.output = output
+        self.profile_stages = set(profile_stages or ())
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self.trace_allocations = trace_allocations
+        self.enabled = enabled
+        self.records = []
+        self.current = None
+        self.closed = False
+        if enabled and trace_allocations:
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def start(self, name):
+        """Ends the running stage (if any) and starts stage `name`."""
+        if not self.enabled:
+            return
+        self.stop()
+        self.current = {
+            'name': name,
+            'wall': time.perf_counter(),
+            'cpu': time.process_time(),
+            'child_cpu': _children_cpu_seconds(),
+            'peak_reset': _reset_peak_rss(),
+            'profile': self._start_profile(name),
+        }
+        if self.trace_allocations:
+            import tracemalloc
+
+            tracemalloc.reset_peak()
+            self.current['traced'] = tracemalloc.get_traced_memory()[0]
+
+    def stop(self):
+        """Ends the running stage and stores its record."""
+        if not self.enabled or self.current is None:
+            return
+        stage, self.current = self.current, None
+        child_cpu = _children_cpu_seconds()
+        record = {
+            'script': self.script,
+            'stage': stage['name'],
+            'wall_seconds': time.perf_counter() - stage['wall'],
+            'cpu_seconds': time.process_time() - stage['cpu'],
+            'child_cpu_seconds': None if child_cpu is None else child_cpu - stage['child_cpu'],
+            'peak_rss_mb': _peak_rss_mb(),
+            'peak_rss_scope': 'stage' if stage['peak_reset'] else 'run',
+            'rss_mb': _rss_mb(),
+            'allocated_mb': None,
+            'peak_allocated_mb': None,
+        }
+        if self.trace_allocations:
+            import tracemalloc
+
+            current, peak = tracemalloc.get_traced_memory()
+            record['allocated_mb'] = (current - stage['traced']) / 2 ** 20
+            record['peak_allocated_mb'] = (peak - stage['traced']) / 2 ** 20
+        self._stop_profile(stage['name'], stage['profile'])
+        self.records.append(record)
+
+    def _start_profile(self, name):
+        if name not in self.profile_stages:
+            return None
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _stop_profile(self, name, profiler):
+        if profiler is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"{self.script}.{name}")
+        if self.profiler == 'pyinstrument':
+            profiler.stop()
+            path += '.html'
+            with open(path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            path += '.prof'
+            profiler.dump_stats(path)
+        print(f"Wrote {self.profiler} profile of stage '{name}' to {path}")
+
+    def summary(self):
+        """The records as an aligned text table."""
+        lines = [f"{'stage':<20} {'wall s':>9} {'cpu s':>9} {'child cpu s':>12} {'peak RSS MB':>12} {'alloc MB':>9}"]
+        for record in self.records:
+            lines.append(f"{record['stage']:<20} {record['wall_seconds']:>9.3f} {record['cpu_seconds']:>9.3f} "
+                         f"{_format(record['child_cpu_seconds'], '.3f'):>12} {_format(record['peak_rss_mb'], '.1f'):>12} "
+                         f"{_format(record['allocated_mb'], '.1f'):>9}")
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """Writes the records to `path`: CSV for a .csv file, JSON otherwise."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if path.endswith('.csv'):
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.records[0]) if self.records else ['script', 'stage'])
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'script': self.script, 'argv': sys.argv[1:], 'stages': self.records}, f, indent=2)
+
+    def close(self):
+        """Ends the running stage, prints the summary and writes the output file (once)."""
+        if not self.enabled or self.closed:
+            return
+        self.closed = True
+        self.stop()
+        print(f"\n--- Stage timings ({self.script}) ---")
+        print(self.summary())
+        if self.output:
+            self.write(self.output)
+            print(f"Wrote stage metrics to {self.output}")
+
+
+def add_instrumentation_arguments(parser):
+    """Adds the shared --stage-report/--profile-stage/--profiler/--trace-allocations options to a script's parser."""
+    parser.add_argument('--stage-report', default=None, metavar='PATH',
+                        help="Record wall/CPU time and memory per stage and write them to PATH (.csv or .json).")
+    parser.add_argument('--profile-stage', action='append', default=[], metavar='STAGE',
+                        help="Profile this stage (repeatable); the profile is written to --profile-dir.")
+    parser.add_argument('--profile-dir', default='profiles', help="Directory for --profile-stage output.")
+    parser.add_argument('--profiler', choices=['cprofile', 'pyinstrument'], default='cprofile',
+                        help="cProfile (.prof, view with snakeviz or pstats) or pyinstrument (.html, needs pyinstrument).")
+    parser.add_argument('--trace-allocations', action='store_true',
+                        help="Also record bytes allocated per stage with tracemalloc (slows the run down).")
+
+
+def stages_from_args(args, script):
+    """A StageRecorder for the script's options; enabled by any of them, and closed automatically at exit."""
+    enabled = bool(args.stage_report or args.profile_stage or args.trace_allocations)
+    stages = StageRecorder(script, args.stage_report, args.profile_stage, args.profile_dir, args.profiler,
+                           args.trace_allocations, enabled)
+    if enabled:
+        atexit.register(stages.close)
+    return stages
@@ -1,129 +1,94 @@
 # -----------------------------------------------------------------------Code to Create Dataset ------------------------------------------------------
 
-import pandas as pd
+import argparse
+import os
+from functools import partial
 import numpy as np
-import random
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-num_samples = 1000
-
-data = {
-    'Age': np.round(np.random.normal(12, 3, num_samples)).astype(int),
-    'IQ': np.random.normal(100, 15, num_samples),
-    'Time per Day (hrs)': np.random.exponential(1.5, num_samples),
-    'Assessment Score': np.random.randint(40, 100, num_samples),
-    'Level of Student': random.choices(['Beginner', 'Intermediate', 'Advanced'], k=num_samples),
-    'Level of Course': random.choices(['Beginner', 'Intermediate', 'Advanced'], k=num_samples),
-    'Course Name': random.choices(['Math', 'English', 'Science', 'History'], k=num_samples),
-    'Consistency': random.choices(['Regular', 'Irregular'], k=num_samples),
-}
-
-df = pd.DataFrame(data)
-
-df['Age'] = df['Age'].clip(3, 18)
-
-df['Consistency_Num'] = df['Consistency'].map({'Regular': 1, 'Irregular': 0})
-df['Student_Level_Num'] = df['Level of Student'].map({'Beginner': 1, 'Intermediate': 2, 'Advanced': 3})
-df['Course_Level_Num'] = df['Level of Course'].map({'Beginner': 1, 'Intermediate': 2, 'Advanced': 3})
-
-def generate_present_material(student_level):
-    if student_level == 1:
-        return random.choices(['Beginner', 'Intermediate'], weights=[0.8, 0.2])[0]
-    elif student_level == 2:
-        return random.choices(['Beginner', 'Intermediate', 'Advanced'], weights=[0.2, 0.6, 0.2])[0]
-    else:
-        return random.choices(['Intermediate', 'Advanced'], weights=[0.2, 0.8])[0]
-
-df['Present Material Level'] = df['Student_Level_Num'].apply(generate_present_material)
-
-# Revised determine_material_level function
-def determine_material_level(row):
-    score = row['Assessment Score']
-    student_level = row['Student_Level_Num']
-    course_level = row['Course_Level_Num']
-    iq = row['IQ']
-    consistency = row['Consistency_Num']
-    time = row['Time per Day (hrs)']
-    course = row['Course Name']
-    present_material = row['Present Material Level']
-    relative_performance = row['Relative Performance']
-
-    base_level = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3}[present_material]
-
-    # Stronger influence of Relative Performance
-    adjustment = relative_performance / 10 + (iq - 100) / 20 + (consistency * 1) + (time - 1.5)
-
-    if course == 'Math':
-        adjustment += 1.5
-    if course == 'History':
-        adjustment -= 1.5
-
-    if abs(adjustment) >= 1:
-        base_level += int(round(adjustment))
-    else:
-        if adjustment > 0.3:
-            base_level += 1
-        elif adjustment < -0.3:
-            base_level -= 1
-
-    base_level = max(1, min(3, base_level))
-
-    return {1: 'Beginner', 2: 'Intermediate', 3: 'Advanced'}[base_level]
-
-# Feature Engineering: Relative Performance
-df['Relative Performance'] = (df['Assessment Score'] - (df['Student_Level_Num'] + df['Course_Level_Num']) * 15)
-
-df['Material Level'] = df.apply(determine_material_level, axis=1)
-
-# Numerical representations for correlation matrix
-df['Present_Material_Level_Num'] = df['Present Material Level'].map({'Beginner': 1, 'Intermediate': 2, 'Advanced': 3})
-df['Material_Level_Num'] = df['Material Level'].map({'Beginner': 1, 'Intermediate': 2, 'Advanced': 3})
+from material_level_generation import num_samples, generate_material_dataset, iter_material_chunks
+from dataset_io import DatasetWriter, output_formats
+from sharded_generation import generate_sharded
+from reporting import add_report_arguments, report_from_args
+from instrumentation import add_instrumentation_arguments, stages_from_args
+
+parser = argparse.ArgumentParser(description="Generate the material level dataset.")
+parser.add_argument('--num-samples', type=int, default=num_samples)
+parser.add_argument('--seed', type=int, default=None)
+parser.add_argument('--output-format', choices=output_formats, default='csv')
+parser.add_argument('--output', default=None,
+                    help="CSV file, or directory of partitions for parquet/arrow (default: Material_Level[.csv]).")
+parser.add_argument('--chunk-size', type=int, default=None,
+                    help="Stream the dataset to disk in chunks of this many rows (skips visualizations).")
+parser.add_argument('--shards', type=int, default=None,
+                    help="Split generation into this many independently seeded shards (skips visualizations).")
+parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes for --shards.")
+add_report_arguments(parser)
+add_instrumentation_arguments(parser)
+args = parser.parse_args()
+stages = stages_from_args(args, 'material_level_dataset_creation')
+output_path = args.output or ('Material_Level.csv' if args.output_format == 'csv' else 'Material_Level')
+
+# Sharded mode: shards run on a process pool, output depends only on --seed and --shards
+if args.shards:
+    stages.start('sharded_generation')
+    seed_seq, rows, parts = generate_sharded(
+        partial(iter_material_chunks, num_samples=args.num_samples),
+        args.num_samples, args.shards, args.workers, args.seed, output_path, args.output_format,
+        chunk_size=args.chunk_size or 100_000
+    )
+    print(f"Wrote {rows} rows from {args.shards} shards ({parts} chunks, {args.workers} workers) to {output_path}")
+    print(f"Seed entropy: {seed_seq.entropy}")
+    exit()
+
+# Streaming mode: peak memory is bounded by the chunk size
+if args.chunk_size:
+    stages.start('streaming_generation')
+    writer = DatasetWriter(output_path, args.output_format)
+    for chunk in iter_material_chunks(args.num_samples, args.chunk_size, rng=np.random.default_rng(args.seed)):
+        writer.write(chunk)
+    print(f"Wrote {writer.rows_written} rows in {writer.parts_written} chunks to {output_path}")
+    print("Streaming mode: visualizations skipped.")
+    exit()
+
+# Sampling, present material levels and the labeling rules are all vectorized
+stages.start('generate')
+df = generate_material_dataset(args.num_samples, rng=np.random.default_rng(args.seed))
 
 # Visualizations
+stages.start('plots')
+report = report_from_args(args)
 
 # 1. Age Distribution
-plt.figure(figsize=(8, 6))
-sns.histplot(df['Age'], bins=16, kde=True)
-plt.title('Age Distribution')
-plt.show()
+report.add('age_distribution', 'histplot', df['Age'], 'Age Distribution', sample=True, bins=16, kde=True)
 
 # 2. Assessment Score Distribution
-plt.figure(figsize=(8, 6))
-sns.histplot(df['Assessment Score'], bins=20, kde=True)
-plt.title('Assessment Score Distribution')
-plt.show()
+report.add('assessment_score_distribution', 'histplot', df['Assessment Score'], 'Assessment Score Distribution',
+           sample=True, bins=20, kde=True)
 
 # 3. Material Level Count
-plt.figure(figsize=(8, 6))
-sns.countplot(x='Material Level', data=df)
-plt.title('Material Level Counts')
-plt.show()
+report.add('material_level_counts', 'countplot', df[['Material Level']], 'Material Level Counts', x='Material Level')
 
 # 4. Present vs Predicted Material Level
-plt.figure(figsize=(10, 8))
-sns.countplot(x='Present Material Level', hue='Material Level', data=df)
-plt.title('Present vs Predicted Material Level')
-plt.show()
+report.add('present_vs_predicted_material_level', 'countplot', df[['Present Material Level', 'Material Level']],
+           'Present vs Predicted Material Level', figsize=(10, 8), x='Present Material Level', hue='Material Level')
 
 # 5. IQ vs Assessment Score
-plt.figure(figsize=(8, 6))
-sns.scatterplot(x='IQ', y='Assessment Score', data=df)
-plt.title('IQ vs Assessment Score')
-plt.show()
+report.add('iq_vs_assessment_score', 'scatterplot', df[['IQ', 'Assessment Score']], 'IQ vs Assessment Score',
+           sample=True, x='IQ', y='Assessment Score')
 
 # 6. Time per Day (hrs) Distribution
-plt.figure(figsize=(8, 6))
-sns.histplot(df['Time per Day (hrs)'], kde=True)
-plt.title('Time per Day (hrs) Distribution')
-plt.show()
+report.add('time_per_day_distribution', 'histplot', df['Time per Day (hrs)'], 'Time per Day (hrs) Distribution',
+           sample=True, kde=True)
 
 # 7 Correlation Heatmap
 
 correlation_matrix = df[['Age', 'IQ', 'Time per Day (hrs)', 'Assessment Score', 'Consistency_Num', 'Student_Level_Num', 'Course_Level_Num', 'Present_Material_Level_Num', 'Material_Level_Num', 'Relative Performance']].corr()
-plt.figure(figsize=(12, 10))
-sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm')
-plt.title('Correlation Heatmap')
-plt.show()
+report.add('correlation_heatmap', 'heatmap', correlation_matrix, 'Correlation Heatmap', figsize=(12, 10),
+           annot=True, cmap='coolwarm')
 
-df.to_csv('Material_Level.csv', index=False)
+stages.start('write')
+DatasetWriter(output_path, args.output_format).write(df)
+
+# Background figures keep rendering while the dataset is written
+stages.start('plots_wait')
+report.close()
+stages.close()
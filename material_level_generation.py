@@ -0,0 +1,156 @@
+# ___________________________________________ Material level data generators ______________________________________________________________
+
+import numpy as np
+import pandas as pd
+from dataset_io import chunk_bounds
+from student_schema import levels_map, levels_list, consistencies_list, material_schema, apply_schema
+from student_schema import material_courses as courses
+
+# --- Configuration (the category lists are declared in student_schema.py) ---
+
+# Present material level options and weights, keyed by the numeric student level
+present_material_weights = {
+    1: (['Beginner', 'Intermediate'], [0.8, 0.2]),
+    2: (['Beginner', 'Intermediate', 'Advanced'], [0.2, 0.6, 0.2]),
+    3: (['Intermediate', 'Advanced'], [0.2, 0.8]),
+}
+
+num_samples = 1000
+
+# --- Row-wise Reference Rules ---
+
+# Revised determine_material_level function
+def determine_material_level(row):
+    score = row['Assessment Score']
+    student_level = row['Student_Level_Num']
+    course_level = row['Course_Level_Num']
+    iq = row['IQ']
+    consistency = row['Consistency_Num']
+    time = row['Time per Day (hrs)']
+    course = row['Course Name']
+    present_material = row['Present Material Level']
+    relative_performance = row['Relative Performance']
+
+    base_level = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3}[present_material]
+
+    # Stronger influence of Relative Performance
+    adjustment = relative_performance / 10 + (iq - 100) / 20 + (consistency * 1) + (time - 1.5)
+
+    if course == 'Math':
+        adjustment += 1.5
+    if course == 'History':
+        adjustment -= 1.5
+
+    if abs(adjustment) >= 1:
+        base_level += int(round(adjustment))
+    else:
+        if adjustment > 0.3:
+            base_level += 1
+        elif adjustment < -0.3:
+            base_level -= 1
+
+    base_level = max(1, min(3, base_level))
+
+    return {1: 'Beginner', 2: 'Intermediate', 3: 'Advanced'}[base_level]
+
+# --- Columnar Rule Engine ---
+
+def relative_performance(assessment_score, student_level_num, course_level_num):
+    """Score relative to the expected score for the student and course levels."""
+    return assessment_score - (student_level_num + course_level_num) * 15
+
+
+def sample_present_material(student_level_num, rng):
+    """
+    Weighted present-material sampling, one Generator.choice call per level.
+
+    Returns level numbers (1-3). Rows are filled level by level in a fixed
+    order, so the result only depends on the generator state.
+    """
+    student_level_num = np.asarray(student_level_num)
+    present = np.empty(len(student_level_num), dtype=np.int64)
+    for level, (options, weights) in present_material_weights.items():
+        rows = np.flatnonzero(student_level_num == level)
+        option_nums = np.array([levels_map[name] for name in options])
+        present[rows] = rng.choice(option_nums, size=len(rows), p=weights)
+    return present
+
+
+def label_material_level(present_level_num, relative_perf, iq, consistency_num, time, course_name):
+    """
+    Vectorized determine_material_level().
+
+    Takes whole columns and returns the material level numbers (1-3). The
+    arithmetic follows the row-wise rule step by step, so the labels are
+    identical for the same inputs.
+    """
+    adjustment = (np.asarray(relative_perf) / 10 + (np.asarray(iq) - 100) / 20
+                  + (np.asarray(consistency_num) * 1) + (np.asarray(time) - 1.5))
+
+    if not hasattr(course_name, 'dtype'):
+        course_name = np.asarray(course_name)
+    adjustment[np.asarray(course_name == 'Math', dtype=bool)] += 1.5
+    adjustment[np.asarray(course_name == 'History', dtype=bool)] -= 1.5
+
+    # Large adjustments move by their rounded value, small ones only outside the ±0.3 dead-band
+    step = np.where(adjustment > 0.3, 1, np.where(adjustment < -0.3, -1, 0))
+    step = np.where(np.abs(adjustment) >= 1, np.rint(adjustment).astype(np.int64), step)
+
+    return np.clip(np.asarray(present_level_num) + step, 1, 3)
+
+
+def generate_material_dataset(num_samples=num_samples, rng=None):
+    """
+    Generates the material level dataset from a np.random.Generator.
+
+    Produces the same columns, in the same order, as material_level_dataset_creation.py.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    student_level_num = rng.integers(1, 4, size=num_samples)
+    course_level_num = rng.integers(1, 4, size=num_samples)
+    course_idx = rng.integers(0, len(courses), size=num_samples)
+    consistency_idx = rng.integers(0, len(consistencies_list), size=num_samples)
+
+    df = pd.DataFrame({
+        'Age': np.round(rng.normal(12, 3, num_samples)).astype(int).clip(3, 18),
+        'IQ': rng.normal(100, 15, num_samples),
+        'Time per Day (hrs)': rng.exponential(1.5, num_samples),
+        'Assessment Score': rng.integers(40, 100, num_samples),
+        'Level of Student': pd.Categorical.from_codes(student_level_num - 1, categories=levels_list),
+        'Level of Course': pd.Categorical.from_codes(course_level_num - 1, categories=levels_list),
+        'Course Name': pd.Categorical.from_codes(course_idx, categories=courses),
+        'Consistency': pd.Categorical.from_codes(consistency_idx, categories=consistencies_list),
+    })
+
+    df['Consistency_Num'] = 1 - consistency_idx
+    df['Student_Level_Num'] = student_level_num
+    df['Course_Level_Num'] = course_level_num
+
+    present_level_num = sample_present_material(student_level_num, rng)
+    df['Present Material Level'] = pd.Categorical.from_codes(present_level_num - 1, categories=levels_list)
+
+    # Feature Engineering: Relative Performance
+    df['Relative Performance'] = relative_performance(df['Assessment Score'].to_numpy(), student_level_num, course_level_num)
+
+    material_level_num = label_material_level(
+        present_level_num, df['Relative Performance'].to_numpy(), df['IQ'].to_numpy(),
+        df['Consistency_Num'].to_numpy(), df['Time per Day (hrs)'].to_numpy(), df['Course Name'].values
+    )
+    df['Material Level'] = pd.Categorical.from_codes(material_level_num - 1, categories=levels_list)
+
+    # Numerical representations for correlation matrix
+    df['Present_Material_Level_Num'] = present_level_num
+    df['Material_Level_Num'] = material_level_num
+    return apply_schema(df, material_schema)
+
+
+def iter_material_chunks(num_samples=num_samples, chunk_size=100_000, rng=None, start_row=0, stop_row=None):
+    """Yields the dataset (or rows [start_row, stop_row) of it) as DataFrames of at most chunk_size rows."""
+    if rng is None:
+        rng = np.random.default_rng()
+    if stop_row is None:
+        stop_row = num_samples
+    for start, stop in chunk_bounds(stop_row, chunk_size, start_row):
+        yield generate_material_dataset(stop - start, rng=rng)
@@ -1,60 +1,164 @@
 # ----------------------------------------------------------Code to predict Material Level ------------------------------------------------------------------
 
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import OneHotEncoder, StandardScaler, LabelEncoder
-from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import LabelEncoder
+from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Load the generated dataset
-try:
-    df = pd.read_csv('Material_Level.csv')
-    print("Dataset loaded successfully.")
-except FileNotFoundError:
-    print("Error: 'refined_material_level_data_stronger_relative.csv' not found.")
-    print("Please ensure the dataset generation script has been run and the file exists.")
-    exit() # Exit if the file isn't found
-
-# --- 1. Data Preparation ---
-print("\n--- Data Preparation ---")
-
-# Separate features (X) and target variable (y)
-X = df.drop('Material Level', axis=1)
-y = df['Material Level']
-
-# Check for and drop any columns that were intermediate calculation steps
-potential_leakage_cols = [
-    'Consistency_Num', 'Student_Level_Num', 'Course_Level_Num',
-    'Present_Material_Level_Num', 'Material_Level_Num',
-    'Present Material Level'
-]
-cols_to_drop = [col for col in potential_leakage_cols if col in X.columns and col != 'Present Material Level' and col != 'Relative Performance'] # Keep Present Material and Relative Perf
-if cols_to_drop:
-    print(f"Dropping intermediate/leakage columns: {cols_to_drop}")
-    X = X.drop(columns=cols_to_drop)
-
-# Identify numerical and categorical features *after potential drops*
-numerical_features = X.select_dtypes(include=np.number).columns.tolist()
-categorical_features = X.select_dtypes(include='object').columns.tolist()
-
-print(f"Numerical features: {numerical_features}")
-print(f"Categorical features: {categorical_features}")
+from dataset_io import read_dataset, iter_dataset
+from drift_monitor import build_reference, save_reference
+from model_artifacts import save_material_model, material_spec, save_booster
+from external_memory import train_external_memory
+from inference import MaterialLevelPredictor, load_predictor
+from incremental_training import continue_training, evaluate
+from model_pipelines import build_material_preprocessor, material_model_params, material_param_grid
+from hyperparameter_search import SuccessiveHalvingSearch, CachedGridSearch
+from categorical_encoding import native_categorical_params
+from reporting import add_report_arguments, report_from_args
+from instrumentation import add_instrumentation_arguments, stages_from_args
+from student_schema import material_schema, material_unused_columns, read_options
+from feature_cache import (add_feature_cache_arguments, feature_cache_from_args, dataset_digest, transformer_spec,
+                           transformer_code)
+
+parser = argparse.ArgumentParser(description="Train and evaluate the material level classifier.")
+parser.add_argument('--data', default='Material_Level.csv',
+                    help="CSV file or directory of Parquet/Arrow partitions written by the generator.")
+parser.add_argument('--save-model', default=None, metavar='DIR',
+                    help="Save the preprocessor, final model and label encoder for inference.py.")
+parser.add_argument('--search', choices=['grid', 'cached-grid', 'halving'], default='grid',
+                    help="Exhaustive 3-fold GridSearchCV, the same grid on fold matrices quantized once "
+                         "(cached-grid), or successive halving over boosting rounds with early stopping on "
+                         "the validation split.")
+parser.add_argument('--search-seconds', type=float, default=None,
+                    help="Cancel the halving search after this many seconds and keep the best trial so far.")
+parser.add_argument('--categorical', choices=['onehot', 'native'], default='onehot',
+                    help="One-hot encode categorical features, or let XGBoost split on them natively "
+                         "(enable_categorical=True, hist).")
+parser.add_argument('--external-memory', action='store_true',
+                    help="Train out of core with default hyperparameters: stream the dataset in chunks into XGBoost "
+                         "external memory, with a hashed train/test split, instead of loading it into RAM.")
+parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows per chunk with --external-memory.")
+parser.add_argument('--fit-rows', type=int, default=200_000,
+                    help="Training rows the preprocessing is fitted on with --external-memory.")
+parser.add_argument('--cache-dir', default=None, help="Where XGBoost keeps its external memory pages (default: a temp dir).")
+parser.add_argument('--incremental-from', default=None, metavar='DIR',
+                    help="Update the model saved in DIR with --data as a batch of new rows (trees added by "
+                         "training continuation) instead of searching and training from scratch. "
+                         "The result is saved to --save-model, or back to DIR.")
+parser.add_argument('--incremental-rounds', type=int, default=50, help="Trees added per class by --incremental-from.")
+parser.add_argument('--incremental-freeze-statistics', action='store_true',
+                    help="With --incremental-from, keep the saved scaling statistics instead of merging the batch "
+                         "into them.")
+add_report_arguments(parser)
+add_feature_cache_arguments(parser)
+add_instrumentation_arguments(parser)
+args = parser.parse_args()
+report = report_from_args(args)
+stages = stages_from_args(args, 'material_level_prediction')
+
+# --- Feature cache (--feature-cache): a hit skips loading and preprocessing ---
+feature_cache = feature_cache_from_args(args)
+cache_key = cached = None
+if (feature_cache is not None and os.path.exists(args.data)
+        and not (args.external_memory or args.incremental_from)):
+    stages.start('feature_cache')
+    preprocessing = build_material_preprocessor(['<numerical>'], ['<categorical>'], categorical=args.categorical)
+    cache_key = feature_cache.key(args.data, {
+        'script': dataset_digest(__file__),
+        'categorical': args.categorical,
+        'preprocessing': transformer_spec(preprocessing),
+        'code': transformer_code(preprocessing),
+        'schema': repr(material_schema),
+    })
+    cached = feature_cache.load(cache_key)
+
+if cached is None:
+    # Load the generated dataset
+    stages.start('load')
+    # Parsed straight into the declared dtypes (int8/float32/categoricals), skipping the columns never used
+    schema_options = read_options(material_schema, material_unused_columns)
+    try:
+        if args.external_memory:
+            # Only the first chunk is loaded here, to find the columns; training streams the whole dataset
+            _, df = next(iter_dataset(args.data, args.chunk_size, **schema_options))
+        else:
+            df = read_dataset(args.data, **schema_options)
+        print("Dataset loaded successfully.")
+    except FileNotFoundError:
+        print(f"Error: '{args.data}' not found.")
+        print("Please ensure the dataset generation script has been run and the file exists.")
+        exit() # Exit if the file isn't found
+
+    # --- 1. Data Preparation ---
+    stages.start('prepare')
+    print("\n--- Data Preparation ---")
+
+    # Separate features (X) and target variable (y)
+    X = df.drop('Material Level', axis=1)
+    y = df['Material Level']
+
+    # Check for and drop any columns that were intermediate calculation steps
+    potential_leakage_cols = [
+        'Consistency_Num', 'Student_Level_Num', 'Course_Level_Num',
+        'Present_Material_Level_Num', 'Material_Level_Num',
+        'Present Material Level'
+    ]
+    cols_to_drop = [col for col in potential_leakage_cols if col in X.columns and col != 'Present Material Level' and col != 'Relative Performance'] # Keep Present Material and Relative Perf
+    if cols_to_drop:
+        print(f"Dropping intermediate/leakage columns: {cols_to_drop}")
+        X = X.drop(columns=cols_to_drop)
+    feature_columns = X.columns.tolist()
+
+    # Identify numerical and categorical features *after potential drops*
+    numerical_features = X.select_dtypes(include=np.number).columns.tolist()
+    categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
+
+    print(f"Numerical features: {numerical_features}")
+    print(f"Categorical features: {categorical_features}")
+    # Feature distributions the scoring traffic is compared with (drift_monitor.py), saved with the model. Only the
+    # training rows count: the same two splits as in Data Splitting below, taken on row positions
+    train_val_rows, _ = train_test_split(np.arange(len(X)), test_size=0.20, random_state=42, stratify=y)
+    train_rows, _ = train_test_split(train_val_rows, test_size=0.25, random_state=42, stratify=y.iloc[train_val_rows])
+    drift_reference = build_reference(X.iloc[train_rows], numerical_features, categorical_features)
+else:
+    print(f"Loaded preprocessed features from the feature cache: {feature_cache.path(cache_key)}")
+    feature_columns = cached['meta']['feature_columns']
+    numerical_features = cached['meta']['numerical_features']
+    categorical_features = cached['meta']['categorical_features']
+    drift_reference = cached['drift_reference']
+
+# --- Incremental update of a saved model (--incremental-from DIR) ---
+if args.incremental_from:
+    stages.start('incremental_update')
+    X_new, X_check, y_new, y_check = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    previous = load_predictor(args.incremental_from)
+    print(f"\nContinuing model {previous.model_version} from {args.incremental_from} on {len(X_new)} new rows...")
+    updated, info = continue_training(previous, X_new, y_new, rounds=args.incremental_rounds,
+                                      update_statistics=not args.incremental_freeze_statistics)
+    print(f"Added {info['rounds']} rounds ({info['total_rounds']} in total) in {info['seconds']:.1f}s; "
+          f"scaling statistics {info['statistics']}.")
+    for name, model in (('Previous model', previous), ('Updated model', updated)):
+        print(f"{name}: accuracy on held-out new rows {evaluate(model, X_check, y_check)['accuracy']:.4f}")
+    model_dir = args.save_model or args.incremental_from
+    model_version = save_booster(updated.booster, updated.spec, model_dir)
+    print(f"Saved model artifacts to {model_dir} (version {model_version})")
+    report.close()
+    exit()
 
 # Preprocessing pipeline
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_features) # sparse_output=False often easier
-    ],
-    remainder='passthrough'
-)
+preprocessor = build_material_preprocessor(numerical_features, categorical_features, categorical=args.categorical)
+model_params = {**material_model_params, **(native_categorical_params if args.categorical == 'native' else {})}
 
 # Apply preprocessing
-X_processed = preprocessor.fit_transform(X)
+stages.start('preprocess')
+if cached is None:
+    X_processed = preprocessor.fit_transform(X)
+else:
+    preprocessor, X_processed = cached['preprocessor'], cached['X_processed']
 print(f"Data preprocessed. Shape: {X_processed.shape}")
 
 # Get feature names after preprocessing for later use (importance)
@@ -66,13 +170,44 @@ except AttributeError:
 
 
 # Label Encoding for the target variable ('Beginner', 'Intermediate', 'Advanced')
-label_encoder = LabelEncoder()
-y_encoded = label_encoder.fit_transform(y)
+if cached is None:
+    label_encoder = LabelEncoder()
+    y_encoded = label_encoder.fit_transform(y)
+    if cache_key is not None:
+        path = feature_cache.save(
+            cache_key, {'X_processed': X_processed, 'y_encoded': y_encoded},
+            {'preprocessor': preprocessor, 'label_encoder': label_encoder, 'drift_reference': drift_reference},
+            {'feature_columns': feature_columns, 'numerical_features': numerical_features,
+             'categorical_features': categorical_features})
+        print(f"Stored the preprocessed features in the feature cache: {path}")
+else:
+    label_encoder, y_encoded = cached['label_encoder'], cached['y_encoded']
 class_names = label_encoder.classes_
 num_classes = len(class_names)
 print(f"Target variable encoded. Classes: {class_names}")
 
+# --- Out-of-core training (--external-memory) ---
+if args.external_memory:
+    stages.start('external_memory')
+    print("\nTraining the XGBoost model out of core (external memory, default hyperparameters)...")
+    pipeline = Pipeline([('preprocessor', preprocessor),
+                         ('model', xgb.XGBClassifier(num_class=num_classes, n_estimators=100, **model_params))])
+    result = train_external_memory(args.data, pipeline, 'Material Level', X.columns, classification=True,
+                                   chunk_size=args.chunk_size, fit_rows=args.fit_rows, cache_dir=args.cache_dir,
+                                   dtype=material_schema)
+    print(f"Trained on {result['train_rows']} rows in {result['train_seconds']:.1f}s; "
+          f"evaluated on {result['test_rows']} hash-selected test rows.")
+    print(f"\nAccuracy on Test Set: {result['metrics']['accuracy']:.4f}")
+    if args.save_model:
+        spec = material_spec(preprocessor, result['label_encoder'], X.columns, pipeline[-1])
+        model_version = save_booster(result['booster'], spec, args.save_model)
+        save_reference(drift_reference, args.save_model)
+        print(f"Saved model artifacts to {args.save_model} (version {model_version})")
+    report.close()
+    exit()
+
 # --- 2. Data Splitting (Train, Validation, Test) ---
+stages.start('split')
 print("\n--- Data Splitting ---")
 
 # Split into Training + Validation set (80%) and Test set (20%)
@@ -91,48 +226,59 @@ print(f"Test set size: {X_test.shape[0]}")
 
 
 print("\n--- Model Training ---")
-
-# Instantiate the XGBoost classifier
-xgb_model = xgb.XGBClassifier(
-    objective='multi:softmax',
-    num_class=num_classes,
-    eval_metric='mlogloss',
-    use_label_encoder=False,
-    random_state=42
-)
-
-# Define a more comprehensive parameter grid for GridSearchCV
-param_grid = {
-    'n_estimators': [100, 200, 300],
-    'learning_rate': [0.01, 0.05, 0.1],
-    'max_depth': [3, 4, 5],
-    'subsample': [0.7, 0.8, 0.9],
-    'colsample_bytree': [0.7, 0.8, 0.9],
-    'gamma': [0, 0.1, 0.2],
-}
-
-# Configure GridSearchCV
-
-grid_search = GridSearchCV(
-    estimator=xgb_model,
-    param_grid=param_grid,
-    scoring='accuracy',
-    cv=3,
-    verbose=1,
-    n_jobs=-1
-)
-
-print("Starting GridSearchCV (this may take some time)...")
-# Perform Grid Search on the training data
-grid_search.fit(X_train, y_train)
-
-print("\nGridSearchCV complete.")
-print(f"Best Parameters found: {grid_search.best_params_}")
-print(f"Best Cross-validation Accuracy: {grid_search.best_score_:.4f}")
-
-# Get the best estimator found by GridSearchCV
-best_xgb_params = grid_search.best_params_
-
+stages.start('search')
+
+param_grid = material_param_grid
+
+if args.search == 'halving':
+    search = SuccessiveHalvingSearch(param_grid, num_classes, max_seconds=args.search_seconds)
+    print(f"Starting successive halving over {len(search.configs)} configurations "
+          f"(boosting rounds {search.rungs()})...")
+    search.fit(X_train, y_train, X_val, y_val)
+
+    print("\nSuccessive halving complete.")
+    print(f"Best Parameters found: {search.best_params_}")
+    print(f"Best Validation Accuracy: {search.best_score_:.4f} (reached after {search.time_to_best_:.1f}s "
+          f"of {search.elapsed_:.1f}s)")
+    print(f"Boosting rounds trained: {search.rounds_trained_:,} "
+          f"(exhaustive 3-fold grid: {search.grid_rounds(param_grid):,})")
+    best_xgb_params = search.best_params_
+elif args.search == 'cached-grid':
+    search = CachedGridSearch(param_grid, num_classes, cv=3, n_jobs=-1)
+    print("Starting cached grid search (this may take some time)...")
+    search.fit(X_train, y_train)
+
+    print("\nCached grid search complete.")
+    print(f"{search.n_workers_} parallel trials x {search.nthread_} XGBoost threads; "
+          f"fold matrices built in {search.cache_seconds_:.2f}s, search took {search.elapsed_:.1f}s")
+    print(f"Best Parameters found: {search.best_params_}")
+    print(f"Best Cross-validation Accuracy: {search.best_score_:.4f}")
+    best_xgb_params = search.best_params_
+else:
+    # Instantiate the XGBoost classifier
+    xgb_model = xgb.XGBClassifier(num_class=num_classes, **model_params)
+
+    # Configure GridSearchCV
+
+    grid_search = GridSearchCV(
+        estimator=xgb_model,
+        param_grid=param_grid,
+        scoring='accuracy',
+        cv=3,
+        verbose=1,
+        n_jobs=-1
+    )
+
+    print("Starting GridSearchCV (this may take some time)...")
+    # Perform Grid Search on the training data
+    grid_search.fit(X_train, y_train)
+
+    print("\nGridSearchCV complete.")
+    print(f"Best Parameters found: {grid_search.best_params_}")
+    print(f"Best Cross-validation Accuracy: {grid_search.best_score_:.4f}")
+    best_xgb_params = grid_search.best_params_
+
+# Get the best parameters found by the search
 params_for_constructor = best_xgb_params.copy()
 
 
@@ -143,15 +289,9 @@ for param in fit_only_params:
         print(f"Note: Removing fit-specific param '{param}' from constructor params.")
         params_for_constructor.pop(param)
 
+stages.start('train')
 print("\nInstantiating final model with best constructor parameters...")
-final_model = xgb.XGBClassifier(
-    objective='multi:softmax',
-    num_class=num_classes,
-    eval_metric='mlogloss',
-    use_label_encoder=False,
-    random_state=42,
-    **params_for_constructor
-)
+final_model = xgb.XGBClassifier(num_class=num_classes, **model_params, **params_for_constructor)
 
 # Define the evaluation set needed for early stopping
 eval_set = [(X_val, y_val)]
@@ -167,7 +307,14 @@ final_model.fit(
 
 print("Final model trained successfully!")
 
+if args.save_model:
+    stages.start('save')
+    model_version = save_material_model(preprocessor, final_model, label_encoder, feature_columns, args.save_model)
+    save_reference(drift_reference, args.save_model)
+    print(f"Saved model artifacts to {args.save_model} (version {model_version})")
+
 # --- 4. Model Evaluation on the Test Set ---
+stages.start('evaluate')
 print("\n--- Model Evaluation ---")
 
 y_pred_encoded = final_model.predict(X_test)
@@ -186,12 +333,8 @@ print(f"\nAccuracy on Test Set: {accuracy:.4f}")
 cm = confusion_matrix(y_test, y_pred_encoded)
 print("\nConfusion Matrix (Test Set):")
 # Plotting the confusion matrix for better visualization
-plt.figure(figsize=(8, 6))
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=class_names, yticklabels=class_names)
-plt.xlabel('Predicted Level')
-plt.ylabel('True Level')
-plt.title('Confusion Matrix')
-plt.show()
+report.add('confusion_matrix', 'heatmap', cm, 'Confusion Matrix', xlabel='Predicted Level', ylabel='True Level',
+           annot=True, fmt='d', cmap='Blues', xticklabels=class_names, yticklabels=class_names)
 
 
 # Classification Report
@@ -200,6 +343,7 @@ print("\nClassification Report (Test Set):")
 print(cr)
 
 # --- 5. Feature Importance ---
+stages.start('feature_importance')
 print("\n--- Feature Importance ---")
 
 feature_importance = final_model.feature_importances_
@@ -219,46 +363,36 @@ print("\nFeature Importance Ranking:")
 print(feature_importance_df)
 
 
-plt.figure(figsize=(10, 8))
-sns.barplot(x='Importance', y='Feature', data=feature_importance_df.head(15)) # Display top 15 features
-plt.title('Top 15 Feature Importances')
-plt.tight_layout()
-plt.show()
+report.add('feature_importance', 'barplot', feature_importance_df.head(15), 'Top 15 Feature Importances', # Display top 15 features
+           figsize=(10, 8), tight_layout=True, x='Importance', y='Feature')
+stages.start('plots')
+report.close()
 
 
 
 
 # --- 6. Prediction Function and Usage ---
+stages.start('predict')
 print("\n--- Prediction Function ---")
 
 
-original_feature_columns = X.columns.tolist()
+original_feature_columns = feature_columns
 print(f"Original features expected by the preprocessor: {original_feature_columns}")
 
-def predict_material_level(input_data, model, processor, encoder, feature_columns):
+# Batch predictor built from the in-memory model: vectorized preprocessing, no per-row printing
+batch_predictor = MaterialLevelPredictor(
+    final_model.get_booster(), material_spec(preprocessor, label_encoder, original_feature_columns)
+)
 
+def predict_material_level(input_data, predictor):
+    """Predicts one student's material level through the batch API."""
     try:
-
-        input_df = pd.DataFrame([input_data], columns=feature_columns)
-        print(f"\nInput DataFrame created:\n{input_df}")
-
-
-        input_processed = processor.transform(input_df)
-        print(f"Input data preprocessed. Shape: {input_processed.shape}")
-
-        prediction_encoded = model.predict(input_processed)
-        print(f"Model prediction (encoded): {prediction_encoded}")
-
-
-        predicted_label = encoder.inverse_transform(prediction_encoded)
-        print(f"Predicted label (decoded): {predicted_label}")
-
-        return predicted_label[0]
-
+        labels, _ = predictor.predict_batch({name: [value] for name, value in input_data.items()})
+        return labels[0]
     except KeyError as e:
-         print(f"\nError: Missing feature in input_data: {e}")
-         print(f"Please ensure your input includes all required features: {feature_columns}")
-         return None
+        print(f"\nError: Missing feature in input_data: {e}")
+        print(f"Please ensure your input includes all required features: {predictor.feature_columns}")
+        return None
     except Exception as e:
         print(f"\nAn error occurred during prediction: {e}")
         return None
@@ -281,13 +415,7 @@ new_student_data_1 = {
 }
 
 # Make the prediction using the function
-predicted_level_1 = predict_material_level(
-    new_student_data_1,
-    final_model,
-    preprocessor,
-    label_encoder,
-    original_feature_columns
-)
+predicted_level_1 = predict_material_level(new_student_data_1, batch_predictor)
 
 if predicted_level_1:
     print(f"\n---> Final Predicted Material Level for student 1: {predicted_level_1}")
@@ -307,13 +435,16 @@ new_student_data_2 = {
     'Relative Performance': -2.0
 }
 
-predicted_level_2 = predict_material_level(
-    new_student_data_2,
-    final_model,
-    preprocessor,
-    label_encoder,
-    original_feature_columns
-)
+predicted_level_2 = predict_material_level(new_student_data_2, batch_predictor)
 
 if predicted_level_2:
     print(f"\n---> Final Predicted Material Level for student 2: {predicted_level_2}")
+
+print("\n--- Batch Prediction Example ---")
+
+# Whole rosters go through predict_batch in one call (DataFrame, Arrow table or NumPy record array)
+roster = pd.DataFrame([new_student_data_1, new_student_data_2], columns=original_feature_columns)
+roster_labels, roster_probabilities = batch_predictor.predict_batch(roster)
+for label, probabilities in zip(roster_labels, roster_probabilities):
+    print(f"  {label:<12} " + "  ".join(f"{name}: {p:.2f}" for name, p in zip(batch_predictor.classes, probabilities)))
+stages.close()
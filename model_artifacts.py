@@ -0,0 +1,174 @@
+# ___________________________________________ Saving trained models as compact artifacts __________________________________________________
+
+import hashlib
+import json
+import os
+
+booster_file = 'booster.ubj'
+spec_file = 'preprocess.json'
+
+
+def _numerical_spec(features, scaler, power=None, power_scaler=None):
+    """
+    Scaler constants (and Yeo-Johnson lambdas when `power` is given, plus its
+    standardization from the `power_scaler` StandardScaler step) as plain lists.
+    """
+    spec = {
+        'features': list(features),
+        'yeo_johnson_lambdas': None,
+        'power_mean': None,
+        'power_scale': None,
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'var': scaler.var_.tolist(),
+        'n_samples_seen': int(scaler.n_samples_seen_),
+    }
+    if power is not None:
+        if power.standardize:
+            raise ValueError("A PowerTransformer with standardize=True cannot be exported: build it with "
+                             "standardize=False followed by a StandardScaler (see build_numerical_transformer).")
+        spec['yeo_johnson_lambdas'] = power.lambdas_.tolist()
+        if power_scaler is not None:
+            spec['power_mean'] = power_scaler.mean_.tolist()
+            spec['power_scale'] = power_scaler.scale_.tolist()
+    return spec
+
+
+def _scaler_step(transformer):
+    """The StandardScaler of a numerical part: the transformer itself, or its 'scaler' step."""
+    return transformer.named_steps['scaler'] if hasattr(transformer, 'named_steps') else transformer
+
+
+def training_params(model):
+    """XGBoost training parameters of an XGBRegressor/XGBClassifier (JSON-safe), so training can be continued later."""
+    skip = {'use_label_encoder', 'missing', 'n_jobs', 'enable_categorical'}
+    return {name: value for name, value in model.get_xgb_params().items() if value is not None and name not in skip}
+
+
+def _categorical_spec(features, encoder):
+    """Fitted categories, plus whether the model sees them one-hot encoded or as native categorical codes."""
+    if hasattr(encoder, 'steps'):
+        encoder = encoder.steps[-1][1]
+    return {
+        'features': list(features),
+        'categories': [[str(value) for value in categories] for categories in encoder.categories_],
+        'encoding': getattr(encoder, 'encoding', 'onehot'),
+    }
+
+
+def _column_groups(preprocessor):
+    """(numerical features, categorical features) of a fitted ColumnTransformer with 'num' and 'cat' parts."""
+    columns = {name: list(cols) for name, _, cols in preprocessor.transformers_}
+    if columns.get('remainder'):
+        raise ValueError(f"Columns passed through untransformed cannot be exported: {columns['remainder']}")
+    return columns['num'], columns['cat']
+
+
+def _replace_file(path, data):
+    """Writes data to a temporary file next to path and renames it over path, so readers never see a partial file."""
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def _write_artifacts(model_dir, booster, spec):
+    """
+    Writes the booster (XGBoost UBJSON) and the preprocessing spec, tagged
+    with a content-derived version. Each file is replaced atomically, the
+    spec last, so a reader polling the spec (CachedPredictor) only sees it
+    change once the new booster is in place.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    raw = booster.save_raw('ubj')
+    digest = hashlib.sha256(raw)
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    spec['model_version'] = digest.hexdigest()[:16]
+    _replace_file(os.path.join(model_dir, booster_file), bytes(raw))
+    _replace_file(os.path.join(model_dir, spec_file), json.dumps(spec, indent=2).encode())
+    return spec['model_version']
+
+
+def assessment_spec(pipeline, feature_columns):
+    """
+    Preprocessing spec of a fitted assessment score Pipeline: preprocessor ->
+    poly_features -> model, crosses (FeatureCrosser) -> model, or
+    preprocessor -> model (native categorical).
+    """
+    if 'crosses' in pipeline.named_steps:
+        crosser = pipeline.named_steps['crosses']
+        preprocessor = crosser.preprocessor_
+        interactions = {'pairs': [crosser.pairs_[0].tolist(), crosser.pairs_[1].tolist()]}
+    elif 'poly_features' in pipeline.named_steps:
+        preprocessor = pipeline.named_steps['preprocessor']
+        poly = pipeline.named_steps['poly_features']
+        if poly.degree != 2 or not poly.interaction_only or poly.include_bias:
+            raise ValueError("Only degree-2, interaction-only polynomial features without bias can be exported.")
+        interactions = 'pairwise'
+    else:
+        preprocessor = pipeline.named_steps['preprocessor']
+        interactions = None
+    num_pipeline = preprocessor.named_transformers_['num']
+    cat_pipeline = preprocessor.named_transformers_['cat']
+    num_features, cat_features = _column_groups(preprocessor)
+
+    return {
+        'kind': 'assessment_score',
+        'feature_columns': list(feature_columns),
+        'numerical': _numerical_spec(num_features, num_pipeline.named_steps['scaler'], num_pipeline.named_steps['power'],
+                                     num_pipeline.named_steps.get('power_scaler')),
+        'categorical': _categorical_spec(cat_features, cat_pipeline),
+        'interactions': interactions,
+        # sparse models were trained on CSR input, where zeros are missing values to XGBoost
+        'sparse': isinstance(interactions, dict),
+        'classes': None,
+        'training_params': training_params(pipeline.steps[-1][1]),
+    }
+
+
+def material_spec(preprocessor, label_encoder, feature_columns, model=None):
+    """
+    Preprocessing spec of the fitted material level ColumnTransformer
+    (StandardScaler + one-hot or native categories), labels and, when
+    `model` is given, its training parameters.
+    """
+    num_features, cat_features = _column_groups(preprocessor)
+    return {
+        'kind': 'material_level',
+        'feature_columns': list(feature_columns),
+        'numerical': _numerical_spec(num_features, _scaler_step(preprocessor.named_transformers_['num'])),
+        'categorical': _categorical_spec(cat_features, preprocessor.named_transformers_['cat']),
+        'interactions': None,
+        'classes': [str(label) for label in label_encoder.classes_],
+        'training_params': None if model is None else training_params(model),
+    }
+
+
+def save_assessment_pipeline(pipeline, feature_columns, model_dir):
+    """
+    Saves the fitted assessment score Pipeline (pairwise or crossed, see assessment_spec).
+
+    Returns the model version string.
+    """
+    spec = assessment_spec(pipeline, feature_columns)
+    return _write_artifacts(model_dir, pipeline.named_steps['model'].get_booster(), spec)
+
+
+def save_material_model(preprocessor, model, label_encoder, feature_columns, model_dir):
+    """
+    Saves the material level preprocessor, classifier and label encoder.
+
+    Returns the model version string.
+    """
+    spec = material_spec(preprocessor, label_encoder, feature_columns, model)
+    return _write_artifacts(model_dir, model.get_booster(), spec)
+
+
+def save_booster(booster, spec, model_dir):
+    """Saves a booster trained outside the sklearn wrappers (e.g. external memory) with its spec; returns the version."""
+    return _write_artifacts(model_dir, booster, dict(spec))
+
+
+def load_spec(model_dir):
+    with open(os.path.join(model_dir, spec_file)) as f:
+        return json.load(f)
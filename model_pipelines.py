@@ -0,0 +1,171 @@
+# ___________________________________________ Shared model pipeline definitions __________________________________________________________
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, PowerTransformer, PolynomialFeatures
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from xgboost import XGBRegressor
+from feature_crossing import FeatureCrosser
+from categorical_encoding import CategoryEncoder, native_categorical_params
+
+
+class Float64Cast(BaseEstimator, TransformerMixin):
+    """
+    Casts numerical columns to float64 before they are scaled.
+
+    The datasets are parsed into int8/int16/float32 columns (student_schema.py),
+    and scikit-learn's scalers keep float32 input in float32. inference.py
+    computes in float64, so without the cast a model input lying on a split
+    threshold could land on the other side of it at inference time.
+    """
+
+    def fit(self, X, y=None):
+        self.n_features_in_ = X.shape[1]
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.array(X.columns, dtype=object)
+        return self
+
+    def transform(self, X):
+        return X.astype(np.float64)
+
+    def get_feature_names_out(self, input_features=None):
+        return self.feature_names_in_.copy() if hasattr(self, 'feature_names_in_') else input_features
+
+
+# --- Assessment Score Regressor ---
+assessment_model_params = dict(
+    random_state=42, objective='reg:squarederror',
+    n_estimators=400, learning_rate=0.02, max_depth=7,
+    subsample=0.65, colsample_bytree=0.65, gamma=0.25,
+    reg_alpha=0.1, reg_lambda=2.5, min_child_weight=3,
+    colsample_bynode=0.8 #added colsample_bynode.
+)
+
+
+# Feature groups crossed by the sparse assessment pipeline (numeric x numeric, numeric x level)
+assessment_level_features = ['Level of Student', 'Level of Course', 'Material Level']
+assessment_crosses = [('num', 'num'), ('num', 'level')]
+
+
+def build_numerical_transformer(power=True):
+    """
+    float64 cast, Yeo-Johnson and its standardization (with power=True), then
+    scaling. The standardization is its own StandardScaler step (the same
+    arithmetic PowerTransformer does internally with standardize=True), so
+    its fitted mean_/scale_ can be exported.
+    """
+    steps = [('float64', Float64Cast())]
+    if power:
+        steps += [('power', PowerTransformer(method='yeo-johnson', standardize=False)),
+                  ('power_scaler', StandardScaler())]
+    return Pipeline(steps=steps + [('scaler', StandardScaler())])
+
+
+def build_assessment_preprocessor(numerical_features, categorical_features, sparse_output=False):
+    """Yeo-Johnson + scaling for numbers, one-hot for categories (CSR output with sparse_output=True)."""
+    numerical_transformer = build_numerical_transformer()
+
+    categorical_transformer = Pipeline(steps=[
+        ('onehot', OneHotEncoder(handle_unknown='ignore', sparse_output=sparse_output))
+    ])
+
+    return ColumnTransformer(
+        transformers=[
+            ('num', numerical_transformer, numerical_features),
+            ('cat', categorical_transformer, categorical_features)
+        ],
+        remainder='passthrough',
+        sparse_threshold=1.0 if sparse_output else 0.3
+    )
+
+
+def build_assessment_pipeline(numerical_features, categorical_features, **model_params):
+    """Yeo-Johnson + scaling, one-hot, pairwise interactions and the XGBoost regressor."""
+    return Pipeline(steps=[
+        ('preprocessor', build_assessment_preprocessor(numerical_features, categorical_features)),
+        ('poly_features', PolynomialFeatures(degree=2, interaction_only=True, include_bias=False)),
+        ('model', XGBRegressor(**{**assessment_model_params, **model_params}))
+    ])
+
+
+def build_crossed_assessment_pipeline(numerical_features, categorical_features, crosses=assessment_crosses,
+                                      **model_params):
+    """
+    Like build_assessment_pipeline, but with sparse one-hot encoding and only
+    the selected group crosses instead of all pairwise interactions; the
+    matrix stays CSR all the way into XGBoost.
+    """
+    groups = {
+        'num': list(numerical_features),
+        'level': [feature for feature in assessment_level_features if feature in categorical_features],
+    }
+    return Pipeline(steps=[
+        ('crosses', FeatureCrosser(
+            build_assessment_preprocessor(numerical_features, categorical_features, sparse_output=True),
+            groups, crosses)),
+        ('model', XGBRegressor(**{**assessment_model_params, **model_params}))
+    ])
+
+
+def build_native_assessment_pipeline(numerical_features, categorical_features, **model_params):
+    """
+    Yeo-Johnson + scaling for numbers, categorical columns passed to XGBoost
+    as pandas categoricals (enable_categorical=True, hist) instead of one-hot
+    and interaction features.
+    """
+    numerical_transformer = build_numerical_transformer()
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', numerical_transformer, numerical_features),
+            ('cat', CategoryEncoder(), categorical_features)
+        ],
+        remainder='passthrough'
+    ).set_output(transform='pandas')
+
+    return Pipeline(steps=[
+        ('preprocessor', preprocessor),
+        ('model', XGBRegressor(**{**assessment_model_params, **native_categorical_params, **model_params}))
+    ])
+
+# --- Material Level Classifier ---
+material_model_params = dict(
+    objective='multi:softmax',
+    eval_metric='mlogloss',
+    use_label_encoder=False,
+    random_state=42
+)
+
+# Define a more comprehensive parameter grid for GridSearchCV
+material_param_grid = {
+    'n_estimators': [100, 200, 300],
+    'learning_rate': [0.01, 0.05, 0.1],
+    'max_depth': [3, 4, 5],
+    'subsample': [0.7, 0.8, 0.9],
+    'colsample_bytree': [0.7, 0.8, 0.9],
+    'gamma': [0, 0.1, 0.2],
+}
+
+
+def build_material_preprocessor(numerical_features, categorical_features, categorical='onehot'):
+    """
+    StandardScaler for numbers, one-hot for categories; with categorical='native'
+    the categories stay pandas categoricals (a DataFrame) for an XGBClassifier
+    created with native_categorical_params.
+    """
+    if categorical == 'native':
+        return ColumnTransformer(
+            transformers=[
+                ('num', build_numerical_transformer(power=False), numerical_features),
+                ('cat', CategoryEncoder(), categorical_features)
+            ],
+            remainder='passthrough'
+        ).set_output(transform='pandas')
+    return ColumnTransformer(
+        transformers=[
+            ('num', build_numerical_transformer(power=False), numerical_features),
+            ('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_features) # sparse_output=False often easier
+        ],
+        remainder='passthrough'
+    )
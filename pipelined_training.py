@@ -0,0 +1,324 @@
+# ___________________________________________ Pipelined generation and training (producer/consumer) ______________________________________
+#
+# Instead of generating a dataset to disk and re-reading it, a producer process generates chunks into a bounded
+# queue (optionally also writing them out) while this process consumes them: rows are split by the same row
+# hash as --external-memory, transformed, and handed to XGBoost through a DataIter, so the quantile sketch is
+# built while generation is still running. Boosting needs every training row and starts at the last chunk;
+# the held-out rows are already transformed by then, so evaluation follows training directly.
+
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+from collections import deque
+from functools import partial
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from dataset_io import DatasetWriter
+from drift_monitor import build_reference
+from external_memory import _booster_params, fit_label_encoder, hash_split, score_chunks
+
+
+def _produce(iter_chunks, chunk_size, seed, chunks, output=None, output_format='csv'):
+    """Producer process: puts ('chunk', first row, DataFrame) messages on the queue, then a 'done' summary."""
+    try:
+        start = time.perf_counter()
+        writer = None if output is None else DatasetWriter(output, output_format)
+        rows = 0
+        write_seconds = put_seconds = 0.0
+        for chunk in iter_chunks(chunk_size=chunk_size, rng=np.random.default_rng(seed)):
+            if writer is not None:
+                written = time.perf_counter()
+                writer.write(chunk)
+                write_seconds += time.perf_counter() - written
+            put = time.perf_counter()
+            chunks.put(('chunk', rows, chunk))
+            put_seconds += time.perf_counter() - put
+            rows += len(chunk)
+        elapsed = time.perf_counter() - start
+        chunks.put(('done', {'rows': rows, 'seconds': elapsed, 'generate_seconds': elapsed - write_seconds - put_seconds,
+                             'write_seconds': write_seconds, 'blocked_seconds': put_seconds}))
+    except Exception:
+        chunks.put(('error', traceback.format_exc()))
+
+
+class ChunkSource:
+    """The consumer's end of the queue: (first row, chunk) pairs, with chunks put back by the fitting sample first."""
+
+    def __init__(self, chunks, producer):
+        self.chunks = chunks
+        self.producer = producer
+        self.pending = deque()
+        self.summary = None
+        self.wait_seconds = 0.0
+
+    def next_chunk(self):
+        """The next (first row, chunk), or None once the producer is done."""
+        if self.pending:
+            return self.pending.popleft()
+        if self.summary is not None:
+            return None
+        start = time.perf_counter()
+        while True:
+            try:
+                message = self.chunks.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not self.producer.is_alive():
+                    raise RuntimeError(f"The producer process exited with code {self.producer.exitcode}")
+        self.wait_seconds += time.perf_counter() - start
+        if message[0] == 'error':
+            raise RuntimeError(f"Chunk generation failed:\n{message[1]}")
+        if message[0] == 'done':
+            self.summary = message[1]
+            return None
+        return message[1], message[2]
+
+
+class QueuedChunks(xgb.DataIter):
+    """
+    DataIter over the training rows of chunks taken off the producer's queue.
+
+    On XGBoost's first pass every chunk is split by hash_split on its row
+    numbers and both parts are transformed with the fitted `features`; the
+    test part is kept for evaluation and the training part goes to XGBoost.
+    The transformed training chunks are kept as well, so the later passes
+    (QuantileDMatrix reads its input twice) replay them without the producer.
+    """
+
+    def __init__(self, source, features, feature_columns, target, label_encoder=None, test_size=0.2, seed=42):
+        self.source = source
+        self.features = features
+        self.feature_columns = feature_columns
+        self.target = target
+        self.label_encoder = label_encoder
+        self.test_size = test_size
+        self.seed = seed
+        self.train = []
+        self.test = []
+        self.position = 0
+        self.transform_seconds = 0.0
+        super().__init__()
+
+    def _transform(self, rows):
+        label = rows[self.target].to_numpy()
+        if self.label_encoder is not None:
+            label = self.label_encoder.transform(label)
+        return self.features.transform(rows[self.feature_columns]), label
+
+    def _take(self):
+        """Transforms the next queued chunk; False once the producer is done."""
+        item = self.source.next_chunk()
+        if item is None:
+            return False
+        start_row, chunk = item
+        start = time.perf_counter()
+        is_test = hash_split(np.arange(start_row, start_row + len(chunk)), self.test_size, self.seed)
+        if is_test.any():
+            X, _ = self._transform(chunk[is_test])
+            self.test.append((X, chunk[self.target].to_numpy()[is_test]))
+        if not is_test.all():
+            self.train.append(self._transform(chunk[~is_test]))
+        self.transform_seconds += time.perf_counter() - start
+        return True
+
+    def next(self, input_data):
+        while self.position >= len(self.train):
+            if not self._take():
+                return False
+        X, label = self.train[self.position]
+        self.position += 1
+        input_data(data=X, label=label)
+        return True
+
+    def reset(self):
+        self.position = 0
+
+    @property
+    def train_rows(self):
+        return sum(len(label) for _, label in self.train)
+
+
+def _start_producer(iter_chunks, chunk_size, seed, queue_size, output, output_format):
+    context = multiprocessing.get_context('fork') if hasattr(os, 'fork') else multiprocessing.get_context()
+    chunks = context.Queue(maxsize=queue_size)
+    producer = context.Process(target=_produce, args=(iter_chunks, chunk_size, seed, chunks, output, output_format),
+                               daemon=True)
+    producer.start()
+    return chunks, producer
+
+
+def train_pipelined(iter_chunks, pipeline, target, drop_columns=(), classification=False, chunk_size=100_000,
+                    queue_size=4, seed=None, test_size=0.2, split_seed=42, fit_rows=200_000, output=None,
+                    output_format='csv'):
+    """
+    Trains pipeline = (feature steps..., XGBoost model) on chunks generated concurrently by a producer process.
+
+    `iter_chunks` is a picklable callable (e.g. a functools.partial of
+    iter_student_chunks) accepting chunk_size and rng; the producer seeds it
+    with `seed` and, with `output`, also writes the chunks to disk. At most
+    `queue_size` chunks wait in the queue, which bounds memory when the
+    consumer is the slower side. The feature steps are fitted on the first
+    `fit_rows` training rows, as in train_external_memory, and the features
+    are every column not in `drop_columns` or the target. Training uses an
+    in-memory QuantileDMatrix; for data larger than RAM write it out and use
+    train_external_memory. Returns a dict like train_external_memory's plus
+    a 'timings' dict and the fitting sample's drift reference.
+    """
+    start = time.perf_counter()
+    chunks, producer = _start_producer(iter_chunks, chunk_size, seed, queue_size, output, output_format)
+    try:
+        source = ChunkSource(chunks, producer)
+
+        # Fitting sample: the first training rows; the chunks are put back for the iterator
+        sample, sampled = [], 0
+        while sampled < fit_rows:
+            item = source.next_chunk()
+            if item is None:
+                break
+            source.pending.append(item)
+            start_row, chunk = item
+            rows = chunk[~hash_split(np.arange(start_row, start_row + len(chunk)), test_size, split_seed)]
+            sample.append(rows)
+            sampled += len(rows)
+        if not sample:
+            raise ValueError("The generator produced no training rows")
+        sample = pd.concat(sample, ignore_index=True).head(fit_rows)
+        feature_columns = [column for column in sample.columns if column != target and column not in set(drop_columns)]
+        features = pipeline[:-1]
+        features.fit(sample[feature_columns], sample[target])
+        label_encoder = fit_label_encoder(sample[target]) if classification else None
+        numerical = sample[feature_columns].select_dtypes(np.number).columns.tolist()
+        categorical = [column for column in feature_columns if column not in numerical]
+        drift_reference = build_reference(sample, numerical, categorical)
+        del sample
+        fitted = time.perf_counter()
+
+        batches = QueuedChunks(source, features, feature_columns, target, label_encoder, test_size, split_seed)
+        dtrain = xgb.QuantileDMatrix(batches, enable_categorical=True)
+        ingested = time.perf_counter()
+        model = pipeline[-1]
+        booster = xgb.train(_booster_params(model), dtrain, num_boost_round=model.n_estimators)
+        del dtrain
+        trained = time.perf_counter()
+        metrics, n_test = score_chunks(booster, batches.test, label_encoder)
+        evaluated = time.perf_counter()
+    finally:
+        producer.join(timeout=5)
+        if producer.is_alive():
+            producer.terminate()
+
+    generation = source.summary or {}
+    return {
+        'booster': booster,
+        'pipeline': pipeline,
+        'label_encoder': label_encoder,
+        'feature_columns': feature_columns,
+        'train_rows': batches.train_rows,
+        'test_rows': n_test,
+        'metrics': metrics,
+        'drift_reference': drift_reference,
+        'timings': {
+            'generate_seconds': generation.get('generate_seconds'),
+            'write_seconds': generation.get('write_seconds'),
+            'producer_blocked_seconds': generation.get('blocked_seconds'),
+            'producer_seconds': generation.get('seconds'),
+            'fit_features_seconds': fitted - start,
+            'ingest_seconds': ingested - fitted,
+            'transform_seconds': batches.transform_seconds,
+            'consumer_wait_seconds': source.wait_seconds,
+            'boost_seconds': trained - ingested,
+            'evaluate_seconds': evaluated - trained,
+            'wall_seconds': evaluated - start,
+        },
+    }
+
+
+def pipelined_job(model, rows, categorical='onehot', interactions='pairwise', engine='vectorized', n_estimators=None):
+    """(iter_chunks, pipeline, target, drop_columns, classification) for 'assessment' or 'material' training."""
+    from student_schema import assessment_unused_columns, material_unused_columns, material_schema
+
+    if model == 'assessment':
+        from assessment_score_generation import iter_student_chunks
+        from model_pipelines import (build_assessment_pipeline, build_crossed_assessment_pipeline,
+                                     build_native_assessment_pipeline)
+        from student_schema import assessment_schema
+
+        iter_chunks = partial(iter_student_chunks, num_records=rows, engine=engine)
+        numerical, categorical_features = _feature_types(assessment_schema, assessment_unused_columns + ['Assessment Score'])
+        if categorical == 'native':
+            build = build_native_assessment_pipeline
+        elif interactions == 'crossed':
+            build = build_crossed_assessment_pipeline
+        else:
+            build = build_assessment_pipeline
+        params = {} if n_estimators is None else {'n_estimators': n_estimators}
+        return iter_chunks, build(numerical, categorical_features, **params), 'Assessment Score', assessment_unused_columns, False
+
+    from sklearn.pipeline import Pipeline
+    from categorical_encoding import native_categorical_params
+    from material_level_generation import iter_material_chunks
+    from model_pipelines import build_material_preprocessor, material_model_params
+
+    numerical, categorical_features = _feature_types(material_schema, material_unused_columns + ['Material Level'])
+    params = {**material_model_params, **(native_categorical_params if categorical == 'native' else {})}
+    classifier = xgb.XGBClassifier(num_class=3, n_estimators=n_estimators or 100, **params)
+    pipeline = Pipeline([('preprocessor', build_material_preprocessor(numerical, categorical_features, categorical)),
+                         ('model', classifier)])
+    return (partial(iter_material_chunks, num_samples=rows), pipeline, 'Material Level', material_unused_columns, True)
+
+
+def _feature_types(schema, skip):
+    """Numerical and categorical feature names of a schema, without the `skip` columns (and the optional Country)."""
+    columns = [column for column in schema if column not in skip and column != 'Country']
+    categorical = [column for column in columns if isinstance(schema[column], pd.CategoricalDtype)]
+    return [column for column in columns if column not in categorical], categorical
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a dataset and train on it at the same time.")
+    parser.add_argument('--model', choices=['assessment', 'material'], default='assessment')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=100_000)
+    parser.add_argument('--queue-size', type=int, default=4, help="Chunks that may wait between producer and consumer.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['loop', 'vectorized'], default='vectorized', help="Assessment generator engine.")
+    parser.add_argument('--categorical', choices=['onehot', 'native'], default='onehot')
+    parser.add_argument('--interactions', choices=['pairwise', 'crossed'], default='crossed',
+                        help="Assessment interaction features (crossed keeps the matrices sparse).")
+    parser.add_argument('--n-estimators', type=int, default=None)
+    parser.add_argument('--fit-rows', type=int, default=200_000, help="Training rows the preprocessing is fitted on.")
+    parser.add_argument('--output', default=None, help="Also write the generated dataset here (as the generator scripts do).")
+    parser.add_argument('--output-format', choices=['csv', 'parquet', 'arrow'], default='csv')
+    parser.add_argument('--save-model', default=None, metavar='DIR')
+    args = parser.parse_args()
+
+    iter_chunks, pipeline, target, drop_columns, classification = pipelined_job(
+        args.model, args.rows, args.categorical, args.interactions, args.engine, args.n_estimators)
+    result = train_pipelined(iter_chunks, pipeline, target, drop_columns, classification, args.chunk_size,
+                             args.queue_size, args.seed, fit_rows=args.fit_rows, output=args.output,
+                             output_format=args.output_format)
+    print(f"Trained on {result['train_rows']} rows, evaluated on {result['test_rows']} hash-selected test rows: "
+          + ", ".join(f"{name} {value:.4f}" for name, value in result['metrics'].items()))
+    timings = result['timings']
+    for name, seconds in timings.items():
+        print(f"  {name:<26} {seconds:8.2f}s")
+    train_seconds = timings['ingest_seconds'] + timings['boost_seconds']
+    print(f"Wall {timings['wall_seconds']:.1f}s vs sequential generate + train "
+          f"{timings['producer_seconds'] + timings['fit_features_seconds'] + train_seconds:.1f}s "
+          f"(max of the two: {max(timings['producer_seconds'], timings['fit_features_seconds'] + train_seconds):.1f}s)")
+    if args.save_model:
+        from drift_monitor import save_reference
+        from model_artifacts import assessment_spec, material_spec, save_booster
+
+        if classification:
+            spec = material_spec(pipeline[0], result['label_encoder'], result['feature_columns'], pipeline[-1])
+        else:
+            spec = assessment_spec(pipeline, result['feature_columns'])
+        model_version = save_booster(result['booster'], spec, args.save_model)
+        save_reference(result['drift_reference'], args.save_model)
+        print(f"Saved model artifacts to {args.save_model} (version {model_version})")
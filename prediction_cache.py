@@ -0,0 +1,215 @@
+# ___________________________________________ Prediction result cache _____________________________________________________________________
+#
+# Students are often re-scored with unchanged features, and the feature space is small (ages 3-18, three
+# levels, ten courses, ...), so scoring traffic repeats a lot. CachedPredictor puts a bounded LRU/TTL cache
+# in front of an inference.py predictor: rows are keyed on a hash of their normalized feature vector tied to
+# the model version, and only the rows not in the cache reach XGBoost.
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from inference import as_columns, load_predictor
+from model_artifacts import spec_file
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionCache:
+    """Thread-safe LRU map from row keys to results; entries older than `ttl` seconds count as misses."""
+
+    def __init__(self, maxsize=100_000, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get_many(self, keys):
+        """Cached values for keys (None where missing or expired); hits become most recently used."""
+        now = time.monotonic()
+        values = []
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is not None and self.ttl is not None and entry[0] < now:
+                    del self.entries[key]
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    values.append(entry[1])
+        return values
+
+    def put_many(self, keys, values):
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            for key, value in zip(keys, values):
+                self.entries[key] = (expires, value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class CachedPredictor:
+    """
+    An AssessmentScorePredictor / MaterialLevelPredictor behind a PredictionCache.
+
+    A row's key is a 16-byte BLAKE2b digest, keyed with the model version,
+    of its normalized feature vector: the scaled (and Yeo-Johnson
+    transformed) numerical values followed by the category codes, so
+    equivalent inputs (int vs float, unseen categories) share an entry.
+    Assessment rows cache the score, material rows the class probabilities.
+    Loading a model with a different version clears the cache; with
+    `reload_interval` the model directory is checked at most that often and
+    a newly saved artifact is picked up automatically; a reload that fails
+    (say, a spec caught mid-save) is logged and the current model kept.
+    """
+
+    def __init__(self, predictor, maxsize=100_000, ttl=None, reload_interval=None):
+        self.cache = PredictionCache(maxsize, ttl)
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.predictor = None
+        self.set_predictor(predictor)
+
+    @property
+    def spec(self):
+        return self.predictor.spec
+
+    @property
+    def model_version(self):
+        return self.predictor.model_version
+
+    @property
+    def model_dir(self):
+        return self.predictor.model_dir
+
+    @property
+    def feature_columns(self):
+        return self.predictor.feature_columns
+
+    @property
+    def classes(self):
+        return self.predictor.classes
+
+    def set_predictor(self, predictor):
+        """Swaps in another predictor; cached results are dropped unless the model version is unchanged."""
+        with self.lock:
+            if self.predictor is not None and predictor.model_version == self.predictor.model_version:
+                self.predictor = predictor
+                return
+            if self.predictor is not None:
+                self.cache.clear()
+            self.predictor = predictor
+            self.spec_mtime = self._spec_mtime()
+            self.checked = time.monotonic()
+
+    def _spec_mtime(self):
+        if self.predictor.model_dir is None:
+            return None
+        try:
+            return os.stat(os.path.join(self.predictor.model_dir, spec_file)).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """Loads the artifacts in model_dir again if they changed on disk; returns True if the model changed."""
+        if self.predictor.model_dir is None or self._spec_mtime() == self.spec_mtime:
+            return False
+        version = self.predictor.model_version
+        self.set_predictor(load_predictor(self.predictor.model_dir))
+        return self.predictor.model_version != version
+
+    def _maybe_reload(self):
+        if self.reload_interval is not None and time.monotonic() - self.checked >= self.reload_interval:
+            self.checked = time.monotonic()
+            try:
+                self.reload()
+            except Exception:
+                # e.g. artifacts being written by a save that is still running; retried at the next check
+                logger.exception("Reloading the model from %s failed; still serving version %s",
+                                 self.predictor.model_dir, self.predictor.model_version)
+
+    def row_keys(self, columns, predictor=None):
+        """One cache key per row of a dict of column arrays."""
+        predictor = predictor or self.predictor
+        transform = predictor.transform
+        codes = transform.encode_categories(columns)
+        normalized = np.empty((transform.n_rows(columns), len(transform.num_features) + len(transform.cat_features)))
+        for j in range(len(transform.num_features)):
+            normalized[:, j] = transform.numerical_column(columns, j)
+        for k, feature in enumerate(transform.cat_features):
+            normalized[:, len(transform.num_features) + k] = codes[feature]
+        normalized += 0.0  # -0.0 -> 0.0
+        version = str(predictor.model_version).encode()
+        return [hashlib.blake2b(row.tobytes(), digest_size=16, key=version).digest() for row in normalized]
+
+    def _cached(self, data):
+        """Per-row scores (assessment) or probabilities (material), computing only the cache misses."""
+        self._maybe_reload()
+        predictor = self.predictor
+        columns = as_columns(data, predictor.feature_columns)
+        keys = self.row_keys(columns, predictor)
+        values = self.cache.get_many(keys)
+        missing = np.array([i for i, value in enumerate(values) if value is None], dtype=np.int64)
+        if len(missing):
+            subset = {name: column[missing] for name, column in columns.items()}
+            if predictor.spec['kind'] == 'material_level':
+                computed = predictor.predict_batch(subset)[1]
+            else:
+                computed = predictor.predict_batch(subset)
+            self.cache.put_many([keys[i] for i in missing], list(computed))
+            for i, value in zip(missing, computed):
+                values[i] = value
+        return predictor, values
+
+    def predict_batch(self, data, chunk_size=None):
+        """Same results as the wrapped predictor's predict_batch (chunk_size is accepted for compatibility)."""
+        predictor, values = self._cached(data)
+        if predictor.spec['kind'] == 'material_level':
+            probabilities = np.array(values).reshape(len(values), len(predictor.classes))
+            return predictor.classes[probabilities.argmax(axis=1)], probabilities
+        return np.array(values, dtype=np.float32)
+
+    def predict(self, data):
+        result = self.predict_batch(data)
+        return result[0] if isinstance(result, tuple) else result
+
+    def predict_proba(self, data):
+        return self.predict_batch(data)[1]
+
+    def metrics(self):
+        return {**self.cache.stats(), 'model_version': self.predictor.model_version}
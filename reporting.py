@@ -0,0 +1,116 @@
+# ___________________________________________ Interactive or headless figure reporting ____________________________________________________
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def use_headless_backend():
+    """Switches matplotlib to the non-interactive Agg backend (no windows, plt.show() never blocks)."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def stratified_sample(df, max_rows, by=None, seed=0):
+    """
+    Returns at most ~max_rows rows of df.
+
+    With `by`, every group keeps the same fraction of its rows, so the class
+    mix of the plot matches the full dataset.
+    """
+    if len(df) <= max_rows:
+        return df
+    frac = max_rows / len(df)
+    if by is None:
+        return df.sample(frac=frac, random_state=seed)
+    return df.groupby(by, observed=True, group_keys=False).sample(frac=frac, random_state=seed)
+
+
+def render_plot(kind, data, title, path=None, figsize=(8, 6), xlabel=None, ylabel=None,
+                xticks=None, yticks=None, tight_layout=False, **plot_kwargs):
+    """
+    Draws one seaborn figure (sns.<kind>(data=data, **plot_kwargs)).
+
+    Shows it when `path` is None, otherwise saves it to `path` and closes it.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=figsize)
+    getattr(sns, kind)(data=data, **plot_kwargs)
+    plt.title(title)
+    if xlabel is not None:
+        plt.xlabel(xlabel)
+    if ylabel is not None:
+        plt.ylabel(ylabel)
+    if xticks is not None:
+        plt.xticks(**xticks)
+    if yticks is not None:
+        plt.yticks(**yticks)
+    if tight_layout:
+        plt.tight_layout()
+    if path is None:
+        plt.show()
+    else:
+        plt.savefig(path)
+        plt.close()
+    return path
+
+
+class Report:
+    """
+    Collects the figures of a script.
+
+    Without output_dir every figure is shown as soon as it is added (the
+    original interactive behaviour). With output_dir the figures are written
+    there as PNG files through the Agg backend; with workers > 0 they are
+    rendered by a process pool while the script carries on. Figures added
+    with sample=True (scatter/KDE plots) are drawn from a stratified sample
+    of at most sample_rows rows.
+    """
+
+    def __init__(self, output_dir=None, workers=0, sample_rows=None, seed=0):
+        self.output_dir = output_dir
+        self.sample_rows = sample_rows
+        self.seed = seed
+        self.paths = []
+        self.futures = []
+        self.executor = None
+        if output_dir is not None:
+            use_headless_backend()
+            os.makedirs(output_dir, exist_ok=True)
+            if workers > 0:
+                self.executor = ProcessPoolExecutor(max_workers=workers, initializer=use_headless_backend)
+
+    def add(self, name, kind, data, title, sample=False, sample_by=None, **plot_kwargs):
+        if sample and self.sample_rows is not None:
+            data = stratified_sample(data, self.sample_rows, by=sample_by, seed=self.seed)
+        path = None if self.output_dir is None else os.path.join(self.output_dir, f"{name}.png")
+        if self.executor is not None:
+            self.futures.append(self.executor.submit(render_plot, kind, data, title, path, **plot_kwargs))
+        elif render_plot(kind, data, title, path, **plot_kwargs) is not None:
+            self.paths.append(path)
+
+    def close(self):
+        """Waits for pending figures and returns the paths written."""
+        self.paths += [future.result() for future in self.futures]
+        self.futures = []
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.paths:
+            print(f"Wrote {len(self.paths)} figures to {self.output_dir}")
+        return self.paths
+
+
+def add_report_arguments(parser):
+    """Adds the shared --report-dir/--plot-workers/--plot-sample-rows options to a script's parser."""
+    parser.add_argument('--report-dir', default=None,
+                        help="Write figures as PNG files to this directory instead of showing them (headless).")
+    parser.add_argument('--plot-workers', type=int, default=2,
+                        help="Processes rendering figures in the background in headless mode (0 renders inline).")
+    parser.add_argument('--plot-sample-rows', type=int, default=50_000,
+                        help="Scatter/KDE plots above this many rows are drawn from a stratified sample.")
+
+
+def report_from_args(args):
+    return Report(args.report_dir, args.plot_workers, args.plot_sample_rows)
@@ -0,0 +1,349 @@
+# ___________________________________________ Local online scoring service _______________________________________________________________
+#
+# Loads the saved assessment score and material level models once and serves them over HTTP on localhost.
+# Concurrent requests are micro-batched: a worker thread per model waits a few milliseconds for more
+# requests and then scores them with a single XGBoost call.
+#
+#   python scoring_server.py --assessment-model models/assessment_score --material-model models/material_level
+#   curl -s localhost:8080/predict/material_level -d '{"Age": 14, "IQ": 115.0, ...}'
+#   curl -s localhost:8080/metrics
+#   curl -s localhost:8080/drift
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from drift_monitor import DriftMonitor
+from inference import load_predictor
+from prediction_cache import CachedPredictor
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Request counters plus a ring buffer of recent latencies for p50/p99."""
+
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+
+    def record(self, seconds, rows):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def snapshot(self):
+        with self.lock:
+            latencies = np.array(self.latencies)
+            requests, rows, errors = self.requests, self.rows, self.errors
+        uptime = time.perf_counter() - self.started
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e3 if len(latencies) else (None, None)
+        return {
+            'requests': requests,
+            'rows': rows,
+            'errors': errors,
+            'latency_p50_ms': p50,
+            'latency_p99_ms': p99,
+            'requests_per_sec': requests / uptime,
+            'rows_per_sec': rows / uptime,
+        }
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests for one predictor into batches.
+
+    The first queued request opens a window of `window` seconds (or until
+    `max_batch` rows are waiting); everything collected is then scored by a
+    single predict_batch call and the results are handed back per request.
+    When the batch call fails, every request is scored on its own so only
+    the bad one gets the error. With drift_window set, every scored batch
+    is also counted by the model's DriftMonitor (when a drift reference was
+    saved with it) once its requests are answered; the monitor is reloaded
+    whenever the predictor's model version changes, and its failures are
+    logged and counted in monitor_errors without affecting the answers.
+    """
+
+    def __init__(self, predictor, window=0.002, max_batch=4096, drift_window=None):
+        self.predictor = predictor
+        self.window = window
+        self.max_batch = max_batch
+        self.drift_window = drift_window
+        self.monitor = self.monitored_version = None
+        self._load_monitor()
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.batched_rows = 0
+        self.monitor_errors = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _load_monitor(self):
+        if self.drift_window is not None and self.predictor.model_dir is not None:
+            self.monitor = DriftMonitor.load(self.predictor.model_dir, self.drift_window)
+        self.monitored_version = self.predictor.model_version
+
+    def submit(self, columns, n_rows):
+        future = Future()
+        self.queue.put((columns, n_rows, future))
+        return future
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            rows = first[1]
+            deadline = time.perf_counter() + self.window
+            stopping = False
+            while rows < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                rows += item[1]
+            self._score(batch)
+            if stopping:
+                return
+
+    def _predict(self, columns):
+        if self.predictor.spec['kind'] == 'material_level':
+            labels, probabilities = self.predictor.predict_batch(columns)
+            return {'predictions': labels, 'probabilities': probabilities}
+        return {'predictions': self.predictor.predict_batch(columns)}
+
+    def _score(self, batch):
+        try:
+            columns = {name: np.concatenate([np.asarray(request[0][name]) for request in batch])
+                       for name in self.predictor.feature_columns}
+            results = self._predict(columns)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][2].set_exception(e)
+            else:
+                for request in batch:
+                    self._score([request])
+            return
+        self.batches += 1
+        self.batched_rows += sum(request[1] for request in batch)
+        offset = 0
+        for _, n_rows, future in batch:
+            future.set_result({key: values[offset:offset + n_rows].tolist() for key, values in results.items()})
+            offset += n_rows
+        try:
+            if self.predictor.model_version != self.monitored_version:
+                self._load_monitor()
+            if self.monitor is not None:
+                self.monitor.observe(columns)
+        except Exception:
+            self.monitor_errors += 1
+            logger.exception("Drift monitoring failed for a batch of %d rows", len(next(iter(columns.values()))))
+
+
+def parse_rows(payload, feature_columns, numerical_features=()):
+    """
+    Accepts one student ({"Age": 14, ...}), a list of students, {"rows": [...]}
+    or a dict of equal-length lists. Returns (dict of arrays, number of rows).
+    Numerical features are cast to float (null is missing) and categorical
+    ones must be scalars, so a malformed request fails here with ValueError
+    instead of failing the micro-batch it would join.
+    """
+    if isinstance(payload, dict) and 'rows' in payload:
+        payload = payload['rows']
+    if isinstance(payload, list):
+        columns = {name: [row[name] for row in payload] for name in feature_columns}
+    elif all(isinstance(payload.get(name), list) for name in feature_columns):
+        columns = {name: payload[name] for name in feature_columns}
+    else:
+        columns = {name: [payload[name]] for name in feature_columns}
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError("All feature columns must have the same number of rows.")
+    for name in feature_columns:
+        if name in numerical_features:
+            try:
+                columns[name] = np.asarray(columns[name], dtype=np.float64)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be numeric or null.") from None
+            if columns[name].ndim != 1:
+                raise ValueError(f"{name} must be numeric or null.")
+        else:
+            if any(isinstance(value, (list, dict)) for value in columns[name]):
+                raise ValueError(f"{name} must be a string or null.")
+            columns[name] = np.asarray(columns[name], dtype=object)
+    return columns, lengths.pop()
+
+
+class ScoringService:
+    """
+    The loaded models, their micro-batchers and latency statistics.
+
+    With cache_size > 0 every model sits behind a CachedPredictor (results
+    for repeated students are served from memory); with reload_interval the
+    model directories are also watched for newly saved artifacts. With
+    drift_window, traffic is compared with the drift reference saved with
+    each model (see drift_monitor.py).
+    """
+
+    def __init__(self, model_dirs, window=0.002, max_batch=4096, cache_size=0, cache_ttl=None, reload_interval=None,
+                 drift_window=None):
+        self.batchers = {}
+        self.stats = {}
+        for model_dir in model_dirs:
+            predictor = load_predictor(model_dir)
+            if cache_size > 0:
+                predictor = CachedPredictor(predictor, cache_size, cache_ttl, reload_interval)
+            kind = predictor.spec['kind']
+            self.batchers[kind] = MicroBatcher(predictor, window, max_batch, drift_window)
+            self.stats[kind] = LatencyStats()
+
+    def predict(self, kind, payload, timeout=30.0):
+        batcher = self.batchers[kind]
+        start = time.perf_counter()
+        try:
+            columns, n_rows = parse_rows(payload, batcher.predictor.feature_columns,
+                                         batcher.predictor.spec['numerical']['features'])
+            result = batcher.submit(columns, n_rows).result(timeout)
+        except Exception:
+            self.stats[kind].record_error()
+            raise
+        self.stats[kind].record(time.perf_counter() - start, n_rows)
+        result['model_version'] = batcher.predictor.model_version
+        return result
+
+    def metrics(self):
+        metrics = {}
+        for kind, batcher in self.batchers.items():
+            metrics[kind] = self.stats[kind].snapshot()
+            metrics[kind]['model_version'] = batcher.predictor.model_version
+            metrics[kind]['batches'] = batcher.batches
+            metrics[kind]['mean_batch_rows'] = batcher.batched_rows / batcher.batches if batcher.batches else None
+            metrics[kind]['monitor_errors'] = batcher.monitor_errors
+            if isinstance(batcher.predictor, CachedPredictor):
+                metrics[kind]['cache'] = batcher.predictor.cache.stats()
+            if batcher.monitor is not None:
+                drift = batcher.monitor.report()
+                del drift['features']
+                metrics[kind]['drift'] = drift
+        return metrics
+
+    def drift(self):
+        """Full drift report (per feature) of every model that has a drift monitor."""
+        return {kind: batcher.monitor.report() for kind, batcher in self.batchers.items()
+                if batcher.monitor is not None}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.stop()
+
+
+def make_handler(service):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/metrics':
+                self._send(200, service.metrics())
+            elif self.path == '/drift':
+                self._send(200, service.drift())
+            elif self.path == '/health':
+                self._send(200, {'status': 'ok', 'models': sorted(service.batchers)})
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            kind = self.path.rsplit('/', 1)[-1]
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if not self.path.startswith('/predict/') or kind not in service.batchers:
+                self._send(404, {'error': f"No model loaded for {self.path}"})
+                return
+            try:
+                self._send(200, service.predict(kind, json.loads(body)))
+            except (KeyError, ValueError, TypeError) as e:
+                self._send(400, {'error': f"Invalid input: {e}"})
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+def serve(model_dirs, host='127.0.0.1', port=8080, window=0.002, max_batch=4096, cache_size=0, cache_ttl=None,
+          reload_interval=None, drift_window=None):
+    """Creates the HTTP server (not yet serving); returns (server, service)."""
+    service = ScoringService(model_dirs, window, max_batch, cache_size, cache_ttl, reload_interval, drift_window)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server, service
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the saved models over HTTP with micro-batching.")
+    parser.add_argument('--assessment-model', default=None, metavar='DIR')
+    parser.add_argument('--material-model', default=None, metavar='DIR')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="How long the first request of a batch waits for more requests.")
+    parser.add_argument('--max-batch', type=int, default=4096, help="Rows that close a batch early.")
+    parser.add_argument('--cache-size', type=int, default=100_000, help="Cached predictions per model (0 disables the cache).")
+    parser.add_argument('--cache-ttl', type=float, default=None, help="Seconds a cached prediction stays valid.")
+    parser.add_argument('--reload-interval', type=float, default=None,
+                        help="Check the model directories this often (seconds) and load newly saved models.")
+    parser.add_argument('--drift-window', type=int, default=100_000,
+                        help="Rows per drift monitoring window; reports cover the last one to two windows "
+                             "(0 disables drift monitoring).")
+    args = parser.parse_args()
+
+    model_dirs = [model_dir for model_dir in (args.assessment_model, args.material_model) if model_dir]
+    if not model_dirs:
+        parser.error("Pass --assessment-model and/or --material-model.")
+    server, service = serve(model_dirs, args.host, args.port, args.batch_window_ms / 1e3, args.max_batch,
+                            args.cache_size, args.cache_ttl, args.reload_interval, args.drift_window or None)
+    print(f"Serving {sorted(service.batchers)} on http://{args.host}:{args.port} "
+          f"(POST /predict/<model>, GET /metrics, GET /drift)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
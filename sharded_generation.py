@@ -0,0 +1,76 @@
+# ___________________________________________ Multi-process sharded dataset generation ___________________________________________________
+
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dataset_io import DatasetWriter, remove_parts
+
+
+def shard_bounds(total_rows, num_shards):
+    """Splits rows [0, total_rows) into num_shards contiguous, near-equal ranges."""
+    edges = np.linspace(0, total_rows, num_shards + 1).round().astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def _shard_csv_path(output_path, shard):
+    return f"{output_path}.shard-{shard:05d}"
+
+
+def _generate_shard(task):
+    """Worker: generates one shard from its own seed stream and writes it to disk."""
+    iter_chunks, shard, start, stop, seed_seq, chunk_size, output_path, output_format = task
+    rng = np.random.default_rng(seed_seq)
+    if output_format == 'csv':
+        writer = DatasetWriter(_shard_csv_path(output_path, shard), 'csv')
+    else:
+        writer = DatasetWriter(output_path, output_format, part_prefix=f"part-{shard:05d}")
+    for chunk in iter_chunks(chunk_size=chunk_size, rng=rng, start_row=start, stop_row=stop):
+        writer.write(chunk)
+    return writer.rows_written, writer.parts_written
+
+
+def generate_sharded(iter_chunks, total_rows, num_shards, workers, seed, output_path, output_format='csv', chunk_size=100_000):
+    """
+    Generates a dataset as num_shards independent shards on a pool of worker processes.
+
+    `iter_chunks` is a picklable callable (e.g. a functools.partial of
+    iter_student_chunks) accepting chunk_size, rng, start_row and stop_row.
+    Shard k always covers the same rows and draws from the k-th stream
+    spawned from SeedSequence(seed), so the combined output only depends on
+    (seed, num_shards), never on the number of workers.
+
+    Parquet/Arrow shards are written as part-<shard>-<chunk> partitions;
+    CSV shards are written to temporary files and concatenated in shard order.
+    Returns the SeedSequence used, so an unseeded run can be reproduced from its entropy.
+    """
+    seed_seq = np.random.SeedSequence(seed)
+    shard_seeds = seed_seq.spawn(num_shards)
+    if output_format != 'csv':
+        os.makedirs(output_path, exist_ok=True)
+        remove_parts(output_path, output_format)
+
+    tasks = [(iter_chunks, shard, start, stop, shard_seeds[shard], chunk_size, output_path, output_format)
+             for shard, (start, stop) in enumerate(shard_bounds(total_rows, num_shards))]
+    if workers <= 1:
+        results = [_generate_shard(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_generate_shard, tasks))
+
+    if output_format == 'csv':
+        with open(output_path, 'wb') as combined:
+            for shard in range(num_shards):
+                shard_path = _shard_csv_path(output_path, shard)
+                if not os.path.exists(shard_path):
+                    continue
+                with open(shard_path, 'rb') as part:
+                    header = part.readline()
+                    if combined.tell() == 0:
+                        combined.write(header)
+                    shutil.copyfileobj(part, combined)
+                os.remove(shard_path)
+
+    rows = sum(rows for rows, _ in results)
+    parts = sum(parts for _, parts in results)
+    return seed_seq, rows, parts
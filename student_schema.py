@@ -0,0 +1,91 @@
+# ___________________________________________ Declared schema of the student datasets ____________________________________________________
+#
+# One place that says what every column of Assessment_Score.csv and Material_Level.csv is. The generators build
+# their DataFrames with these dtypes and the prediction scripts parse the files straight into them: small
+# integers as int8/int16, measurements as float32 and every text column as a pandas categorical with the fixed
+# category list below (int8 codes instead of one Python string per row). Columns a script does not use are
+# skipped at parse time.
+
+import pandas as pd
+
+# --- Vocabularies ---
+genders = ['Male', 'Female']
+earning_classes = ['Low', 'Middle', 'High']
+parent_occupations = ['Engineer', 'Doctor', 'Teacher', 'Farmer', 'Business Owner', 'Government Employee', 'Artist', 'Unemployed', 'Other']
+levels_map = {'Beginner': 1, 'Intermediate': 2, 'Advanced': 3}
+levels_list = list(levels_map.keys())
+assessment_courses = ['Math', 'Science', 'History', 'Computer Science', 'Physics', 'Chemistry', 'Biology', 'English', 'Art', 'Geography']
+material_courses = ['Math', 'English', 'Science', 'History']
+consistencies_map = {'Regular': 1, 'Irregular': 0}
+consistencies_list = list(consistencies_map.keys())
+health_levels_map = {'Very Poor': 1, 'Poor': 2, 'Average': 3, 'Good': 4, 'Excellent': 5}
+health_levels_list = list(health_levels_map.keys())
+
+# Category codes follow the list order: levels are 0-2 for levels_map values 1-3, Regular is 0
+level_dtype = pd.CategoricalDtype(levels_list)
+consistency_dtype = pd.CategoricalDtype(consistencies_list)
+
+# --- Assessment_Score.csv ---
+assessment_schema = {
+    'Age': 'int8',
+    'Gender': pd.CategoricalDtype(genders),
+    'Parent Occupation': pd.CategoricalDtype(parent_occupations),
+    'Earning Class': pd.CategoricalDtype(earning_classes),
+    'Level of Student': level_dtype,
+    'Level of Course': level_dtype,
+    'Course Name': pd.CategoricalDtype(assessment_courses),
+    'Time per Day (hrs)': 'float32',
+    'Material Level': level_dtype,
+    'IQ': 'int16',
+    'Consistency': consistency_dtype,
+    'Health': 'int8',
+    'Assessment Score': 'int8',
+    'Health Description': pd.CategoricalDtype(health_levels_list),
+    'Country': 'category',
+    'Consistency_Num': 'int8',
+    'Material_Level_Num': 'int8',
+    'Student_Level_Num': 'int8',
+    'Course_Level_Num': 'int8',
+}
+# Written for the correlation plots, never used by the regressor ('Health Description' duplicates 'Health')
+assessment_unused_columns = ['Health Description', 'Consistency_Num', 'Material_Level_Num', 'Student_Level_Num',
+                             'Course_Level_Num']
+
+# --- Material_Level.csv ---
+material_schema = {
+    'Age': 'int8',
+    'IQ': 'float32',
+    'Time per Day (hrs)': 'float32',
+    'Assessment Score': 'int8',
+    'Level of Student': level_dtype,
+    'Level of Course': level_dtype,
+    'Course Name': pd.CategoricalDtype(material_courses),
+    'Consistency': consistency_dtype,
+    'Consistency_Num': 'int8',
+    'Student_Level_Num': 'int8',
+    'Course_Level_Num': 'int8',
+    'Present Material Level': level_dtype,
+    'Relative Performance': 'int16',
+    'Material Level': level_dtype,
+    'Present_Material_Level_Num': 'int8',
+    'Material_Level_Num': 'int8',
+}
+# Numeric copies of categorical columns (and of the label), dropped by the classifier as leakage
+material_unused_columns = ['Consistency_Num', 'Student_Level_Num', 'Course_Level_Num', 'Present_Material_Level_Num',
+                           'Material_Level_Num']
+
+
+def apply_schema(df, schema):
+    """df with every column the schema declares cast to its dtype (text outside a category list becomes NaN)."""
+    return df.astype({column: dtype for column, dtype in schema.items() if column in df.columns})
+
+
+def read_options(schema, skip=()):
+    """read_dataset/iter_dataset keyword arguments parsing a dataset into the schema, without the `skip` columns."""
+    skip = set(skip)
+    return {'columns': lambda column: column not in skip, 'dtype': schema}
+
+
+def bytes_per_row(df):
+    """In-memory size of a DataFrame per row, strings included."""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
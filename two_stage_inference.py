@@ -0,0 +1,146 @@
+# ___________________________________________ Two-stage inference: assessment score -> material level ____________________________________
+#
+# The material level classifier takes 'Assessment Score' and 'Relative Performance' as inputs, which the assessment
+# score regressor can supply. TwoStagePredictor runs both saved models on one raw student batch in one vectorized
+# call: columns are pulled out of the batch once, categorical columns both models encode with the same category
+# list are encoded once, the predicted score is rounded and clipped like the generator's scores, Relative
+# Performance follows material_level_generation.relative_performance, and every stage is timed.
+
+import time
+import numpy as np
+from inference import FeatureTransform, _softmax, as_columns, encode_column, load_predictor
+from material_level_generation import relative_performance
+from student_schema import levels_map
+
+# The assessment dataset's 'Material Level' is the material the student uses now, the classifier's 'Present Material Level'
+default_aliases = {'Present Material Level': 'Material Level'}
+predicted_columns = ('Assessment Score', 'Relative Performance')
+
+
+class TwoStagePredictor:
+    """
+    Predicts the assessment score, then the material level, from one batch.
+
+    `assessment` and `material` are inference.py (or compiled_inference.py)
+    predictors. `aliases` maps a model feature to the batch column holding
+    it; by default the batch is shaped like Assessment_Score.csv, which
+    carries every raw input of both models. predict() returns the score,
+    Relative Performance, material level labels and probabilities, and the
+    seconds spent per stage.
+    """
+
+    stages = ('columns', 'encode', 'assessment', 'relative_performance', 'material')
+
+    def __init__(self, assessment, material, aliases=None):
+        if assessment.spec['kind'] != 'assessment_score' or material.spec['kind'] != 'material_level':
+            raise ValueError("Expected an assessment score model and a material level model")
+        self.assessment = assessment
+        self.material = material
+        self.aliases = dict(default_aliases if aliases is None else aliases)
+        self.classes = material.classes
+        features = list(assessment.feature_columns) + [feature for feature in material.feature_columns
+                                                       if feature not in predicted_columns]
+        self.input_columns = list(dict.fromkeys(self.aliases.get(feature, feature) for feature in features))
+        for level in ('Level of Student', 'Level of Course'):
+            if level not in self.input_columns:
+                self.input_columns.append(level)
+
+        # Categorical inputs, grouped so that a batch column is encoded once per distinct category list
+        self.encodings = {}
+        for stage, predictor in (('assessment', assessment), ('material', material)):
+            transform = predictor.transform
+            needed = set(getattr(transform, 'needed_cat_features', transform.cat_features))
+            for feature, categories in zip(transform.cat_features, transform.categories):
+                if feature in needed:
+                    key = (self.aliases.get(feature, feature), tuple(categories))
+                    self.encodings.setdefault(key, []).append((stage, feature))
+        self.level_numbers = {level: self._level_numbers(level) for level in ('Level of Student', 'Level of Course')}
+        self.lookups = {key: {category: code for code, category in enumerate(key[1])} for key in self.encodings}
+
+    def _level_numbers(self, column):
+        """(encoding key, level number per code with NaN for unknown at index -1) for a level column."""
+        for key in self.encodings:
+            if key[0] == column:
+                break
+        else:
+            key = (column, tuple(levels_map))
+            self.encodings[key] = []
+        return key, np.array([levels_map.get(category, np.nan) for category in key[1]] + [np.nan])
+
+    @classmethod
+    def load(cls, assessment_dir, material_dir, backend='xgboost', aliases=None):
+        assessment, material = load_predictor(assessment_dir), load_predictor(material_dir)
+        if backend == 'compiled':
+            from compiled_inference import compile_predictor
+
+            assessment, material = compile_predictor(assessment), compile_predictor(material)
+        return cls(assessment, material, aliases)
+
+    def predict(self, data):
+        """Score, Relative Performance, material level and class probabilities for every row of `data`."""
+        timings = {}
+        start = time.perf_counter()
+        if hasattr(data, 'iloc'):
+            # pandas columns stay Series, so categorical columns are recoded without going through Python objects
+            columns = {name: data[name] for name in self.input_columns}
+        else:
+            columns = as_columns(data, self.input_columns)
+        mark = time.perf_counter()
+        timings['columns'] = mark - start
+
+        shared = {key: encode_column(columns[key[0]], key[1], lookup, FeatureTransform.small_batch_rows)
+                  for key, lookup in self.lookups.items()}
+        codes = {'assessment': {}, 'material': {}}
+        for key, users in self.encodings.items():
+            for stage, feature in users:
+                codes[stage][feature] = shared[key]
+        timings['encode'] = time.perf_counter() - mark
+        mark = time.perf_counter()
+
+        stage_one = {feature: columns[self.aliases.get(feature, feature)] for feature in self.assessment.feature_columns}
+        raw = self.assessment.predict_raw(stage_one, codes=codes['assessment'])
+        # Whole points in 0-100, like the scores the generators produce
+        score = np.clip(np.rint(raw), 0, 100)
+        timings['assessment'] = time.perf_counter() - mark
+        mark = time.perf_counter()
+
+        (student_key, student_levels), (course_key, course_levels) = (self.level_numbers['Level of Student'],
+                                                                      self.level_numbers['Level of Course'])
+        relative = relative_performance(score, student_levels[shared[student_key]], course_levels[shared[course_key]])
+        timings['relative_performance'] = time.perf_counter() - mark
+        mark = time.perf_counter()
+
+        stage_two = {feature: columns[self.aliases.get(feature, feature)] for feature in self.material.feature_columns
+                     if feature not in predicted_columns}
+        stage_two['Assessment Score'] = score
+        stage_two['Relative Performance'] = relative
+        probabilities = _softmax(self.material.predict_raw(stage_two, predict_type='margin', codes=codes['material']))
+        levels = self.classes[probabilities.argmax(axis=1)]
+        timings['material'] = time.perf_counter() - mark
+        timings['total'] = time.perf_counter() - start
+        return {'assessment_score': score, 'relative_performance': relative, 'material_level': levels,
+                'probabilities': probabilities, 'timings': timings}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Predict assessment scores and then material levels with two saved models.")
+    parser.add_argument('assessment_dir', help="Directory written by --save-model of assessment_score_prediction.py.")
+    parser.add_argument('material_dir', help="Directory written by --save-model of material_level_prediction.py.")
+    parser.add_argument('--data', required=True,
+                        help="CSV file or Parquet/Arrow directory shaped like Assessment_Score.csv (the score is not needed).")
+    parser.add_argument('--backend', choices=['xgboost', 'compiled'], default='xgboost')
+    args = parser.parse_args()
+
+    from dataset_io import read_dataset
+    from student_schema import assessment_schema
+
+    predictor = TwoStagePredictor.load(args.assessment_dir, args.material_dir, args.backend)
+    data = read_dataset(args.data, columns=lambda column: column in predictor.input_columns, dtype=assessment_schema)
+    result = predictor.predict(data)
+    for i, (score, relative, level) in enumerate(zip(result['assessment_score'], result['relative_performance'],
+                                                     result['material_level'])):
+        print(f"  Row {i + 1}: score {score:.0f}, relative performance {relative:+.0f}, material level {level}")
+    print(f"{len(data)} students, per-stage latency: "
+          + ", ".join(f"{stage} {result['timings'][stage] * 1e3:.2f} ms" for stage in predictor.stages + ('total',)))